@@ -10,10 +10,15 @@ from fastapi import FastAPI
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from api.notebook.convert import convert_notebooks
+from utils.rendering.png_render import set_headless
+
+# The API only serves JSON; PNGs are rendered on demand from the JSON payloads
+set_headless()
 
 convert_notebooks()
 
-from api.routers import day_api, forecast_api  # Import your routers
+# Import your routers
+from api.routers import day_api, week_api, month_api, forecast_api, jobs_api
 
 app = FastAPI()
 
@@ -27,7 +32,10 @@ app.add_middleware(
 
 # Include routers
 app.include_router(day_api.router)
+app.include_router(week_api.router)
+app.include_router(month_api.router)
 app.include_router(forecast_api.router)
+app.include_router(jobs_api.router)
 
 
 if __name__ == "__main__":
@@ -5,21 +5,19 @@ import os
 import sys
 import json
 from datetime import datetime
-from fastapi import FastAPI
 from fastapi import APIRouter, HTTPException, Query
 
 # Add project root to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
 from config import JSON_DIR
-from scripts.day import (
-    generate_day_earnings_with_scatter_bundle_plotly,
-    generate_day_earnings_with_scatter_bundle_plotly_x1,
-    generate_day_earnings_with_hourly_bundle_plotly,
-    generate_day_earnings_with_week_bundle_plotly,
-    generate_fare_trends_plotly,
-    generate_fare_trends_plotly_x1,
+from utils.concurrency.single_flight import single_flight
+from utils.eda.plot_rollups import (
+    generate_day_hourly_bundle,
+    generate_day_week_bundle,
+    generate_daily_fare_trends,
 )
+from utils.eda.plot_transactions import generate_day_scatter_bundle
 
 router = APIRouter(prefix="/api/v1/eda/day", tags=["Day Analysis"])
 
@@ -41,21 +39,19 @@ def validate_date(date: str):
 def generate_plot_json(file_path: str, generate_method: callable, *args, **kwargs):
     """Checks if the file exists, and if not, generates it by calling the respective method."""
     if not os.path.exists(file_path):
-        # Call the method to generate the file
-        generate_method(*args, **kwargs)
+        # Call the method to generate the file, once for concurrent requests
+        single_flight(file_path, generate_method, *args, **kwargs)
         print(f"Generated {file_path}")
     with open(file_path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
-app = FastAPI()
-
 """
 Day Analysis Endpoints
 """
 
 
-@app.get("/sc_bundle")
+@router.get("/sc_bundle")
 def get_scatter_eda(
     date: str,
     vehicle_id: str = Query(
@@ -79,19 +75,11 @@ def get_scatter_eda(
             "day",
             f"day_scatter_earnings_{vehicle_id}_{date}.json",
         )
-
-        def generate_day_eda_method():
-            generate_day_earnings_with_scatter_bundle_plotly_x1(
-                date, vehicle_id, f"day_scatter_earnings_{vehicle_id}_{date}"
-            )
-
     else:
         file = os.path.join(JSON_DIR, "all", "day", f"day_scatter_earnings_{date}.json")
 
-        def generate_day_eda_method():
-            generate_day_earnings_with_scatter_bundle_plotly(
-                f"{date}", f"day_scatter_earnings_{date}"
-            )
+    def generate_day_eda_method():
+        generate_day_scatter_bundle(date, file, vehicle_id)
 
     try:
         return generate_plot_json(file, generate_day_eda_method)
@@ -101,7 +89,7 @@ def get_scatter_eda(
         ) from e
 
 
-@app.get("/hr_bundle")
+@router.get("/hr_bundle")
 def get_hour_eda(
     date: str,
     vehicle_id: str = Query(
@@ -121,21 +109,13 @@ def get_hour_eda(
         file = os.path.join(
             JSON_DIR, vehicle_id, "eda", "day", f"day_hour_bundled_earnings_{date}.json"
         )
-
-        def generate_day_eda_method():
-            generate_day_earnings_with_hourly_bundle_plotly(
-                date, f"day_hour_bundled_earnings_{date}"
-            )
-
     else:
         file = os.path.join(
             JSON_DIR, "all", "day", f"day_hour_bundled_earnings_{date}.json"
         )
 
-        def generate_day_eda_method():
-            generate_day_earnings_with_hourly_bundle_plotly(
-                date, f"day_hour_bundled_earnings_{date}"
-            )
+    def generate_day_eda_method():
+        generate_day_hourly_bundle(date, file, vehicle_id)
 
     try:
         return generate_plot_json(file, generate_day_eda_method)
@@ -145,7 +125,7 @@ def get_hour_eda(
         ) from e
 
 
-@app.get("/wk_bundle")
+@router.get("/wk_bundle")
 def get_week_eda(
     date: str,
     vehicle_id: str = Query(
@@ -165,21 +145,13 @@ def get_week_eda(
         file = os.path.join(
             JSON_DIR, vehicle_id, "eda", "day", f"day_week_bundled_earnings_{date}.json"
         )
-
-        def generate_day_eda_method():
-            generate_day_earnings_with_week_bundle_plotly(
-                date, f"day_week_bundled_earnings_{date}"
-            )
-
     else:
         file = os.path.join(
             JSON_DIR, "all", "day", f"day_week_bundled_earnings_{date}.json"
         )
 
-        def generate_day_eda_method():
-            generate_day_earnings_with_week_bundle_plotly(
-                f"{date}", f"day_week_bundled_earnings_{date}"
-            )
+    def generate_day_eda_method():
+        generate_day_week_bundle(date, file, vehicle_id)
 
     try:
         return generate_plot_json(file, generate_day_eda_method)
@@ -189,7 +161,7 @@ def get_week_eda(
         ) from e
 
 
-@app.get("/trend")
+@router.get("/trend")
 def get_trend_eda(
     vehicle_id: str = Query(
         None, description="Vehicle ID to filter results, leave empty for all vehicles"
@@ -205,15 +177,11 @@ def get_trend_eda(
         file = os.path.join(
             JSON_DIR, vehicle_id, "eda", "day", "daily_fare_trends.json"
         )
-
-        def generate_day_eda_method():
-            generate_fare_trends_plotly_x1(vehicle_id, "daily_fare_trends")
-
     else:
         file = os.path.join(JSON_DIR, "all", "day", "daily_fare_trends.json")
 
-        def generate_day_eda_method():
-            generate_fare_trends_plotly("daily_fare_trends")
+    def generate_day_eda_method():
+        generate_daily_fare_trends(file, vehicle_id)
 
     try:
         return generate_plot_json(file, generate_day_eda_method)
@@ -3,45 +3,165 @@
 
 import os
 import sys
-import json
 
-from fastapi import FastAPI
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Path, Query
+from fastapi.responses import FileResponse
 
 # Add project root to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from config import JSON_DIR
+from config import DATA_CSV_FILE
 from prediction import run_prediction
+from utils.concurrency.single_flight import single_flight, single_flight_stats
+from utils.data_preparation.load_transactions import source_version
+from utils.data_preparation.transaction_store import get_transaction_store
+from utils.forecast.plot_forecast import forecast_json_path
+from utils.forecast.result_cache import ResultCache
+from utils.ensemble.ensemble_forecast import MODEL_TYPE_PATTERN
+from utils.model.registry import VEHICLE_ID_PATTERN
+from utils.rendering.figure_json import read_json
+from utils.rendering.png_render import render_figure_png
+from utils.prediction.anytime_prediction import get_anytime_forecast
 
 router = APIRouter(prefix="/api/v1/forecast", tags=["Forecast"])
 
-app = FastAPI()
+# Forecast figures keyed by (vehicle_id, model_type, forecast_days, data version)
+forecast_cache = ResultCache()
 
 """
-Forecast Analysis Endpoint
+Forecast Analysis Endpoints
 """
 
 
-@app.get("/{vehicle_id}/{model_type}")
-def get_forecast(vehicle_id: str, model_type: str):
+@router.get("/cache/stats")
+def get_cache_stats():
     """
-    Serve the forecast figure for a given vehicle and model type.
+    Hit and miss counters of the forecast cache, and the number of
+    concurrent generations coalesced into one.
+    """
+    return {**forecast_cache.stats(), "single_flight": single_flight_stats()}
+
+
+@router.get("/{vehicle_id}")
+def get_anytime(
+    vehicle_id: str = Path(..., pattern=VEHICLE_ID_PATTERN),
+    forecast_days: int = Query(30, ge=1, le=365, description="Days to forecast"),
+):
+    """
+    Serve the best ensemble forecast available now, without waiting for training.
+    - The first response is the stored forecast or a seasonal-naive one.
+    - The models train in the background; poll again to get the upgraded
+      forecast. `tier`, `members`, `complete` and `age_seconds` describe it.
+    """
+    try:
+        return get_anytime_forecast(vehicle_id, forecast_days)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
+def run_and_cache_forecasts(vehicle_id, forecast_days, version):
+    """
+    Runs the prediction pipeline and caches the figure of every model it made.
+
+    The pipeline runs on the transactions of `version` (or newer, if the file
+    changed again meanwhile); figures are cached under the version they were
+    actually computed from.
+
+    Returns:
+    - Dictionary mapping model type to its figure, for the models of this run
+    """
+    store = get_transaction_store(DATA_CSV_FILE, version=version)
+    forecasts = run_prediction(
+        vehicle_id=vehicle_id, forecast_days=forecast_days, store=store
+    )
+
+    figures = {}
+    for model_type, forecast in forecasts.items():
+        path = forecast_json_path(vehicle_id, model_type, forecast_days)
+        if forecast is None or not os.path.exists(path):
+            continue
+        figures[model_type] = read_json(path)
+        forecast_cache.put(
+            (vehicle_id, model_type, forecast_days, store.version),
+            figures[model_type],
+        )
+    return figures
+
+
+def generate_forecast(vehicle_id, model_type, forecast_days=30, version=None):
     """
+    Return the forecast figure of a vehicle and model type, running the
+    prediction pipeline on a cache miss.
 
-    run_prediction(vehicle_id=vehicle_id)
+    Parameters:
+    - vehicle_id: ID of the vehicle
+    - model_type: 'ml', 'arima', 'sarima' or 'prophet'
+    - forecast_days: Number of days to forecast
+    - version: Data version to serve; the current one when omitted
 
-    forecast_path = os.path.join(
-        JSON_DIR,
+    Returns:
+    - Plotly figure JSON
+
+    Raises:
+    - FileNotFoundError: If the pipeline produced no figure for the model
+    """
+    model_type = model_type.lower()
+    version = version or source_version(DATA_CSV_FILE)
+    cached = forecast_cache.get((vehicle_id, model_type, forecast_days, version))
+    if cached is not None:
+        return cached
+
+    # Concurrent misses of a vehicle share one run, which makes every model
+    figures = single_flight(
+        ("forecast", vehicle_id, forecast_days, version),
+        run_and_cache_forecasts,
         vehicle_id,
-        "forecast",
-        f"{model_type.lower()}_forecast.json",
+        forecast_days,
+        version,
     )
 
-    print(f" Path: {forecast_path}")
+    if model_type not in figures:
+        raise FileNotFoundError("Forecast not found")
+    return figures[model_type]
+
+
+@router.get("/{vehicle_id}/{model_type}")
+def get_forecast(
+    vehicle_id: str = Path(..., pattern=VEHICLE_ID_PATTERN),
+    model_type: str = Path(..., pattern=MODEL_TYPE_PATTERN),
+    forecast_days: int = Query(30, ge=1, le=365, description="Days to forecast"),
+):
+    """
+    Serve the forecast figure for a given vehicle and model type.
+    - Figures are cached until the transactions change; the pipeline only
+      runs on a miss, and then caches every model's figure it produced.
+    - To avoid blocking on a miss, submit a job to `/api/v1/jobs/forecast`.
+    """
+    try:
+        return generate_forecast(vehicle_id, model_type, forecast_days)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
 
-    if not os.path.exists(forecast_path):
-        raise HTTPException(status_code=404, detail="Forecast not found")
 
-    with open(forecast_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+@router.get("/{vehicle_id}/{model_type}/png")
+def get_forecast_png(
+    vehicle_id: str = Path(..., pattern=VEHICLE_ID_PATTERN),
+    model_type: str = Path(..., pattern=MODEL_TYPE_PATTERN),
+    forecast_days: int = Query(30, ge=1, le=365, description="Days to forecast"),
+):
+    """
+    Serve the forecast figure for a given vehicle and model type as a PNG.
+    - The PNG is rendered from the figure on first request and cached until
+      the transactions change.
+    """
+    version = source_version(DATA_CSV_FILE)
+    try:
+        figure = generate_forecast(vehicle_id, model_type, forecast_days, version)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+    name = f"{vehicle_id}_{model_type.lower()}_{forecast_days}d"
+    png_path = single_flight(
+        ("png", name, version), render_figure_png, figure, name, version
+    )
+    return FileResponse(png_path, media_type="image/png")
@@ -0,0 +1,96 @@
+# flake8: noqa E501
+"""ignore line limits"""
+
+import os
+import sys
+
+from fastapi import APIRouter, HTTPException, Path, Query
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from api.routers.forecast_api import generate_forecast
+from utils.jobs.job_queue import JobQueue, QueueFullError
+from utils.ensemble.ensemble_forecast import MODEL_TYPE_PATTERN
+from utils.model.registry import VEHICLE_ID_PATTERN
+
+router = APIRouter(prefix="/api/v1/jobs", tags=["Jobs"])
+
+# Forecast jobs, trained by a bounded pool of background workers
+forecast_jobs = JobQueue(generate_forecast)
+
+"""
+Utility Functions
+"""
+
+
+def get_job_or_404(job_id: str):
+    """returns the status of a job, or raises a 404 if it is unknown"""
+    job = forecast_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+"""
+Job Endpoints
+"""
+
+
+@router.post("/forecast/{vehicle_id}/{model_type}", status_code=202)
+def submit_forecast_job(
+    vehicle_id: str = Path(..., pattern=VEHICLE_ID_PATTERN),
+    model_type: str = Path(..., pattern=MODEL_TYPE_PATTERN),
+    forecast_days: int = Query(30, ge=1, le=365, description="Days to forecast"),
+):
+    """
+    Queue a forecast for a vehicle and model type.
+    - Returns at once with the job ID; an identical queued or running job is
+      shared rather than queued twice. Poll `/api/v1/jobs/{job_id}` and fetch
+      the figure from `/api/v1/jobs/{job_id}/result` once it succeeded.
+    """
+    try:
+        job_id = forecast_jobs.submit(
+            vehicle_id=vehicle_id,
+            model_type=model_type.lower(),
+            forecast_days=forecast_days,
+        )
+    except QueueFullError as exc:
+        raise HTTPException(status_code=429, detail=str(exc)) from exc
+    return get_job_or_404(job_id)
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    """
+    Poll the status of a job: queued, running, succeeded, failed or cancelled.
+    """
+    return get_job_or_404(job_id)
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str):
+    """
+    Fetch the forecast figure of a succeeded job.
+    """
+    job = get_job_or_404(job_id)
+    if job["status"] != "succeeded":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job is {job['status']}"
+            + (f": {job['error']}" if job["error"] else ""),
+        )
+    return forecast_jobs.result(job_id)
+
+
+@router.delete("/{job_id}")
+def cancel_job(job_id: str):
+    """
+    Cancel a job. A queued job never runs; a running one finishes in the
+    background but its result is discarded.
+    - Identical submissions share one job; it is cancelled once every
+      submitter cancelled it (see `subscribers`).
+    """
+    get_job_or_404(job_id)
+    forecast_jobs.cancel(job_id)
+    return get_job_or_404(job_id)
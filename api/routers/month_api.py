@@ -4,20 +4,17 @@ import os
 import sys
 import json
 from config import JSON_DIR
-from fastapi import FastAPI
 from fastapi import APIRouter, HTTPException, Query
 
 # Add project root to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from scripts.month import (
-    plot_monthly_fares_line,
-    plot_monthly_fares_line_x1,
-    plot_monthly_fares_bar,
-    plot_monthly_fares_bar_x1,
-    plot_monthly_total_revenue_bar,
-    plot_monthly_total_revenue_line,
-    plot_monthly_breakdown_by_vehicle,
+from utils.concurrency.single_flight import single_flight
+from utils.eda.plot_rollups import (
+    generate_fares_line,
+    generate_fares_bar,
+    generate_total_revenue,
+    generate_breakdown_by_vehicle,
 )
 
 router = APIRouter(prefix="/api/v1/eda/month", tags=["Month Analysis"])
@@ -30,8 +27,8 @@ Utility Functions
 def generate_plot_json(file_path: str, generate_method: callable, *args, **kwargs):
     """Checks if the file exists, and if not, generates it by calling the respective method."""
     if not os.path.exists(file_path):
-        # Call the method to generate the file
-        generate_method(*args, **kwargs)
+        # Call the method to generate the file, once for concurrent requests
+        single_flight(file_path, generate_method, *args, **kwargs)
         print(f"Generated {file_path}")
     with open(file_path, "r", encoding="utf-8") as f:
         return json.load(f)
@@ -41,10 +38,8 @@ def generate_plot_json(file_path: str, generate_method: callable, *args, **kwarg
 Month Analysis Endpoints
 """
 
-app = FastAPI()
 
-
-@app.get("/trend/line")
+@router.get("/trend/line")
 def get_monthly_earnings_line_eda(
     vehicle_id: str = Query(
         None, description="Vehicle ID to filter results, leave empty for all vehicles"
@@ -64,19 +59,13 @@ def get_monthly_earnings_line_eda(
             "month",
             f"monthly_earnings_trend_line_{vehicle_id}.json",
         )
-
-        def generate_week_eda_method():
-            plot_monthly_fares_line_x1(
-                vehicle_id, f"monthly_earnings_trend_line_{vehicle_id}"
-            )
-
     else:
         file = os.path.join(
             JSON_DIR, "all", "month", "monthly_earnings_trend_line.json"
         )
 
-        def generate_week_eda_method():
-            plot_monthly_fares_line("monthly_earnings_trend_line")
+    def generate_week_eda_method():
+        generate_fares_line("monthly", file, vehicle_id)
 
     try:
         return generate_plot_json(file, generate_week_eda_method)
@@ -87,7 +76,7 @@ def get_monthly_earnings_line_eda(
         ) from e
 
 
-@app.get("/trend/bar")
+@router.get("/trend/bar")
 def get_weekly_earnings_bar_eda(
     vehicle_id: str = Query(
         None, description="Vehicle ID to filter results, leave empty for all vehicles"
@@ -107,17 +96,11 @@ def get_weekly_earnings_bar_eda(
             "month",
             f"monthly_earnings_trend_bar_{vehicle_id}.json",
         )
-
-        def generate_week_eda_method():
-            plot_monthly_fares_bar_x1(
-                vehicle_id, f"monthly_earnings_trend_bar_{vehicle_id}"
-            )
-
     else:
         file = os.path.join(JSON_DIR, "all", "month", "monthly_earnings_trend_bar.json")
 
-        def generate_week_eda_method():
-            plot_monthly_fares_bar("monthly_earnings_trend_bar")
+    def generate_week_eda_method():
+        generate_fares_bar("monthly", file, vehicle_id)
 
     try:
         return generate_plot_json(file, generate_week_eda_method)
@@ -128,7 +111,7 @@ def get_weekly_earnings_bar_eda(
         ) from e
 
 
-@app.get("/revenue")
+@router.get("/revenue")
 def get_monthly_total_eda(
     bar: str = Query(None, description="to filter results, leave empty for default"),
 ):
@@ -143,19 +126,15 @@ def get_monthly_total_eda(
             JSON_DIR,
             "all",
             "month",
-            "monthly_total_earnings_line.json",
+            "monthly_total_earnings_bar.json",
         )
-
-        def generate_day_eda_method():
-            plot_monthly_total_revenue_bar("monthly_total_earnings_bar")
-
     else:
         file = os.path.join(
             JSON_DIR, "all", "month", "monthly_total_earnings_line.json"
         )
 
-        def generate_day_eda_method():
-            plot_monthly_total_revenue_line("monthly_total_earnings_line")
+    def generate_day_eda_method():
+        generate_total_revenue("monthly", file, bar=bool(bar))
 
     try:
         return generate_plot_json(file, generate_day_eda_method)
@@ -165,7 +144,7 @@ def get_monthly_total_eda(
         ) from e
 
 
-@app.get("/mt_bundle")
+@router.get("/mt_bundle")
 def get_month_eda():
     """
     Retrieve Combined view showing weekly breakdown by vehicle and total.
@@ -175,7 +154,7 @@ def get_month_eda():
     )
 
     def generate_day_eda_method():
-        plot_monthly_breakdown_by_vehicle("monthly_bundled_earnings")
+        generate_breakdown_by_vehicle("monthly", scatter_file)
 
     try:
         return generate_plot_json(scatter_file, generate_day_eda_method)
@@ -4,20 +4,17 @@ import os
 import sys
 import json
 from config import JSON_DIR
-from fastapi import FastAPI
 from fastapi import APIRouter, HTTPException, Query
 
 # Add project root to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from scripts.week import (
-    plot_weekly_fares_line,
-    plot_weekly_fares_line_x1,
-    plot_weekly_fares_bar,
-    plot_weekly_fares_bar_x1,
-    plot_weekly_total_revenue_bar,
-    plot_weekly_total_revenue_line,
-    plot_weekly_breakdown_by_vehicle,
+from utils.concurrency.single_flight import single_flight
+from utils.eda.plot_rollups import (
+    generate_fares_line,
+    generate_fares_bar,
+    generate_total_revenue,
+    generate_breakdown_by_vehicle,
 )
 
 router = APIRouter(prefix="/api/v1/eda/week", tags=["Week Analysis"])
@@ -30,8 +27,8 @@ Utility Functions
 def generate_plot_json(file_path: str, generate_method: callable, *args, **kwargs):
     """Checks if the file exists, and if not, generates it by calling the respective method."""
     if not os.path.exists(file_path):
-        # Call the method to generate the file
-        generate_method(*args, **kwargs)
+        # Call the method to generate the file, once for concurrent requests
+        single_flight(file_path, generate_method, *args, **kwargs)
         print(f"Generated {file_path}")
     with open(file_path, "r", encoding="utf-8") as f:
         return json.load(f)
@@ -41,10 +38,8 @@ def generate_plot_json(file_path: str, generate_method: callable, *args, **kwarg
 Week Analysis Endpoints
 """
 
-app = FastAPI()
 
-
-@app.get("/trend/line")
+@router.get("/trend/line")
 def get_weekly_earnings_line_eda(
     vehicle_id: str = Query(
         None, description="Vehicle ID to filter results, leave empty for all vehicles"
@@ -64,17 +59,11 @@ def get_weekly_earnings_line_eda(
             "week",
             f"weekly_earnings_trend_line_{vehicle_id}.json",
         )
-
-        def generate_week_eda_method():
-            plot_weekly_fares_line_x1(
-                vehicle_id, f"weekly_earnings_trend_line_{vehicle_id}"
-            )
-
     else:
         file = os.path.join(JSON_DIR, "all", "week", "weekly_earnings_trend_line.json")
 
-        def generate_week_eda_method():
-            plot_weekly_fares_line("weekly_earnings_trend_line")
+    def generate_week_eda_method():
+        generate_fares_line("weekly", file, vehicle_id)
 
     try:
         return generate_plot_json(file, generate_week_eda_method)
@@ -85,7 +74,7 @@ def get_weekly_earnings_line_eda(
         ) from e
 
 
-@app.get("/trend/bar")
+@router.get("/trend/bar")
 def get_weekly_earnings_bar_eda(
     vehicle_id: str = Query(
         None, description="Vehicle ID to filter results, leave empty for all vehicles"
@@ -105,17 +94,11 @@ def get_weekly_earnings_bar_eda(
             "week",
             f"weekly_earnings_trend_bar_{vehicle_id}.json",
         )
-
-        def generate_week_eda_method():
-            plot_weekly_fares_bar_x1(
-                vehicle_id, f"weekly_earnings_trend_bar_{vehicle_id}"
-            )
-
     else:
         file = os.path.join(JSON_DIR, "all", "week", "weekly_earnings_trend_bar.json")
 
-        def generate_week_eda_method():
-            plot_weekly_fares_bar("weekly_earnings_trend_bar")
+    def generate_week_eda_method():
+        generate_fares_bar("weekly", file, vehicle_id)
 
     try:
         return generate_plot_json(file, generate_week_eda_method)
@@ -126,7 +109,7 @@ def get_weekly_earnings_bar_eda(
         ) from e
 
 
-@app.get("/revenue")
+@router.get("/revenue")
 def get_weekly_total_eda(
     bar: str = Query(None, description="to filter results, leave empty for default"),
 ):
@@ -141,17 +124,13 @@ def get_weekly_total_eda(
             JSON_DIR,
             "all",
             "week",
-            "weekly_total_earnings_line.json",
+            "weekly_total_earnings_bar.json",
         )
-
-        def generate_day_eda_method():
-            plot_weekly_total_revenue_bar("weekly_total_earnings_bar")
-
     else:
         file = os.path.join(JSON_DIR, "all", "week", "weekly_total_earnings_line.json")
 
-        def generate_day_eda_method():
-            plot_weekly_total_revenue_line("weekly_total_earnings_line")
+    def generate_day_eda_method():
+        generate_total_revenue("weekly", file, bar=bool(bar))
 
     try:
         return generate_plot_json(file, generate_day_eda_method)
@@ -161,7 +140,7 @@ def get_weekly_total_eda(
         ) from e
 
 
-@app.get("/wk_bundle")
+@router.get("/wk_bundle")
 def get_week_eda():
     """
     Retrieve Combined view showing weekly breakdown by vehicle and total.
@@ -169,7 +148,7 @@ def get_week_eda():
     scatter_file = os.path.join(JSON_DIR, "all", "week", "week_bundled_earnings.json")
 
     def generate_day_eda_method():
-        plot_weekly_breakdown_by_vehicle("_week_bundled_earnings")
+        generate_breakdown_by_vehicle("weekly", scatter_file)
 
     try:
         return generate_plot_json(scatter_file, generate_day_eda_method)
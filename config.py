@@ -15,6 +15,18 @@ NOTEBOOKS_DIR = os.path.join(PROJECT_ROOT, "eda2")
 
 SCRIPTS_DIR = os.path.join(PROJECT_ROOT, "scripts")
 
+CACHE_DIR = os.path.join(PROJECT_ROOT, "cache")
+
+AGGREGATES_DIR = os.path.join(CACHE_DIR, "aggregates")
+
+ROLLUPS_DIR = os.path.join(CACHE_DIR, "rollups")
+
+MODELS_DIR = os.path.join(CACHE_DIR, "models")
+
+FORECASTS_DIR = os.path.join(CACHE_DIR, "forecasts")
+
+JOBS_DB = os.path.join(CACHE_DIR, "jobs.sqlite3")
+
 # Define paths to important files
 DATA_CSV_FILE = os.path.join(DATA_DIR, "last-3-months-transactions.csv")
 
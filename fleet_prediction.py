@@ -0,0 +1,171 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+from utils.data_preparation.transaction_store import get_transaction_store
+from utils.data_preparation.prepare_time_series import prepare_time_series_data
+from utils.ensemble.ensemble_forecast import ensemble_forecast
+from utils.ensemble.ensemble_weights import load_ensemble_weights, active_members
+from utils.prediction.ensemble_prediction import run_prediction_for_vehicle
+
+from config import DATA_CSV_FILE, FILES_DIR
+
+FLEET_OUTPUT_FILE = os.path.join(FILES_DIR, "fleet", "fleet_forecast.csv")
+
+
+def _predict_vehicle(job):
+    """
+    Runs the prediction pipeline of one vehicle inside a fleet worker.
+
+    Parameters:
+    - job: Tuple of (data_path, vehicle_id, forecast_days, ml_strategy)
+
+    Returns:
+    - Dictionary with the vehicle ID, status, elapsed seconds, error message
+      and ensemble forecast DataFrame (None on failure)
+    """
+    data_path, vehicle_id, forecast_days, ml_strategy = job
+    started = time.perf_counter()
+    try:
+        # The fleet pool already uses every core, run the model stages in
+        # turn, each under its STAGE_TIMEOUTS entry
+        weights = load_ensemble_weights(vehicle_id)
+        forecasts = run_prediction_for_vehicle(
+            data_path,
+            vehicle_id,
+            forecast_days,
+            ml_strategy,
+            models=active_members(weights),
+            stage_workers=1,
+        )
+        ts_data = prepare_time_series_data(get_transaction_store(data_path), vehicle_id)
+        forecast = ensemble_forecast(forecasts, weights, ts_data.index[-1])
+        status, error = "ok", None
+    except Exception as e:
+        forecast, status, error = None, "failed", str(e)
+
+    return {
+        "vehicle_id": vehicle_id,
+        "status": status,
+        "seconds": round(time.perf_counter() - started, 3),
+        "error": error,
+        "forecast": forecast,
+    }
+
+
+def run_fleet_prediction(
+    vehicle_ids=None,
+    forecast_days=30,
+    data_path=DATA_CSV_FILE,
+    workers=None,
+    chunksize=1,
+    ml_strategy="recursive",
+    output_path=FLEET_OUTPUT_FILE,
+):
+    """
+    Forecast every vehicle of the fleet, sharding vehicles across processes.
+
+    The transactions are loaded once into the shared store before the pool
+    starts; workers inherit it (or load it once each from the cache).
+
+    Parameters:
+    - vehicle_ids: Vehicles to forecast; all vehicles in the data when omitted
+    - forecast_days: Number of days to forecast
+    - data_path: Path to the CSV file with transaction data
+    - workers: Number of worker processes (defaults to the number of cores)
+    - chunksize: Number of vehicles handed to a worker at a time
+    - ml_strategy: "recursive" or "direct" multi-horizon ML forecasting
+    - output_path: CSV file for the consolidated forecasts; a '.report.csv'
+      file with per-vehicle timing and failures is written next to it
+
+    Returns:
+    - DataFrame of forecasts for all vehicles, with a 'vehicle_id' column
+    - DataFrame report with 'vehicle_id', 'status', 'seconds' and 'error'
+    """
+    store = get_transaction_store(data_path)
+    vehicle_ids = list(vehicle_ids or store.vehicles)
+    workers = min(workers or os.cpu_count() or 1, len(vehicle_ids)) or 1
+    jobs = [
+        (data_path, vehicle_id, forecast_days, ml_strategy)
+        for vehicle_id in vehicle_ids
+    ]
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=get_transaction_store, initargs=(data_path,)
+    ) as pool:
+        results = list(pool.map(_predict_vehicle, jobs, chunksize=chunksize))
+    elapsed = time.perf_counter() - started
+
+    forecasts = [
+        result["forecast"].assign(vehicle_id=result["vehicle_id"])
+        for result in results
+        if result["forecast"] is not None
+    ]
+    fleet_df = pd.concat(forecasts, ignore_index=True) if forecasts else pd.DataFrame()
+    if not fleet_df.empty:
+        fleet_df = fleet_df[["vehicle_id"] + [c for c in fleet_df if c != "vehicle_id"]]
+
+    report = pd.DataFrame(
+        [
+            {key: result[key] for key in ("vehicle_id", "status", "seconds", "error")}
+            for result in results
+        ]
+    )
+
+    if output_path:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        fleet_df.to_csv(output_path, index=False)
+        report.to_csv(f"{os.path.splitext(output_path)[0]}.report.csv", index=False)
+        print(f"Fleet forecast saved at: {output_path}")
+
+    failed = report[report["status"] != "ok"]
+    print(
+        f"Forecasted {len(report) - len(failed)}/{len(report)} vehicles in "
+        f"{elapsed:.1f}s with {workers} workers"
+    )
+    for row in failed.itertuples():
+        print(f"  {row.vehicle_id} failed after {row.seconds}s: {row.error}")
+
+    return fleet_df, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Forecast earnings for the whole fleet."
+    )
+    parser.add_argument(
+        "vehicles", nargs="*", help="Vehicle IDs (default: all vehicles)"
+    )
+    parser.add_argument(
+        "--days", type=int, default=30, help="Number of days to forecast"
+    )
+    parser.add_argument("--data", default=DATA_CSV_FILE, help="Transactions CSV file")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: all cores)",
+    )
+    parser.add_argument(
+        "--chunksize", type=int, default=1, help="Vehicles per worker task"
+    )
+    parser.add_argument(
+        "--ml-strategy", choices=["recursive", "direct"], default="recursive"
+    )
+    parser.add_argument(
+        "--output", default=FLEET_OUTPUT_FILE, help="Consolidated forecast CSV"
+    )
+    args = parser.parse_args()
+
+    run_fleet_prediction(
+        args.vehicles,
+        args.days,
+        args.data,
+        args.workers,
+        args.chunksize,
+        args.ml_strategy,
+        args.output,
+    )
@@ -1,8 +1,8 @@
-import pandas as pd
-
+from utils.data_preparation.transaction_store import get_transaction_store
 from utils.data_preparation.prepare_time_series import prepare_time_series_data
 
 from utils.ensemble.ensemble_forecast import ensemble_forecast
+from utils.ensemble.ensemble_weights import load_ensemble_weights, active_members
 from utils.ensemble.plot_ensemble_forecast import plot_ensemble_forecast
 
 from utils.prediction.ensemble_prediction import run_prediction_for_vehicle
@@ -10,20 +10,46 @@ from utils.prediction.ensemble_prediction import run_prediction_for_vehicle
 from config import DATA_CSV_FILE
 
 
-def run_prediction(vehicle_id="SM191", forecast_days=30):
-    """triggers analysis and prediction of data based on a vehicle"""
+def run_prediction(
+    vehicle_id="SM191", forecast_days=30, ml_strategy="recursive", store=None
+):
+    """
+    Triggers analysis and prediction of data based on a vehicle.
+
+    Parameters:
+    - vehicle_id: ID of the vehicle
+    - forecast_days: Number of days to forecast
+    - ml_strategy: "recursive" or "direct" multi-horizon ML forecasting
+    - store: TransactionStore to predict from; the process-wide store of the
+      transactions file when omitted
+
+    Returns:
+    - Dictionary mapping model to its forecast (None if it failed or was
+      pruned)
+    """
 
     # Path to your data
     data_path = DATA_CSV_FILE
+    store = store or get_transaction_store(data_path)
+
+    # Backtest weights of the ensemble members, if computed
+    weights = load_ensemble_weights(vehicle_id)
 
     # Run prediction for the vehicle
-    forecasts = run_prediction_for_vehicle(data_path, vehicle_id, forecast_days)
+    forecasts = run_prediction_for_vehicle(
+        data_path,
+        vehicle_id,
+        forecast_days,
+        ml_strategy,
+        models=active_members(weights),
+        store=store,
+    )
 
-    # Create ensemble forecast
-    ensemble_df = ensemble_forecast(forecasts)
+    # Create ensemble forecast of the days after the last observation
+    ts_data = prepare_time_series_data(store, vehicle_id)
+    ensemble_df = ensemble_forecast(forecasts, weights, ts_data.index[-1])
 
     # Plot ensemble forecast
-    ts_data = prepare_time_series_data(pd.read_csv(data_path), vehicle_id)
     plot_ensemble_forecast(ts_data, ensemble_df, vehicle_id)
 
     # Display the forecast for the next 7 days
@@ -36,6 +62,8 @@ def run_prediction(vehicle_id="SM191", forecast_days=30):
     print(f"Total predicted earnings for next 7 days: {total_predicted:.2f} KSH")
     print(f"Average daily earnings: {average_daily:.2f} KSH")
 
+    return forecasts
+
 
 if __name__ == "__main__":
     """main function"""
@@ -0,0 +1,48 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.data_preparation import load_transactions, transaction_store  # noqa: E402
+
+
+def write_transactions(path, days, vehicles=("SM001",), amount=100):
+    """Writes a transactions CSV with one CREDIT row per vehicle and day."""
+    rows = [
+        {
+            "vehicle_booked": vehicle,
+            "amount": amount,
+            "payment_status": 2,
+            "transaction_type": "CREDIT",
+            "created_at": f"{day:%Y-%m-%d} 08:00:00",
+        }
+        for day in pd.date_range("2025-01-01", periods=days)
+        for vehicle in vehicles
+    ]
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def transactions_csv(tmp_path, monkeypatch):
+    """
+    A transactions CSV whose caches and stores are private to the test.
+
+    Returns the path of the CSV, written with 30 days of one vehicle.
+    """
+    cache_dir = str(tmp_path / "cache")
+    monkeypatch.setattr(
+        transaction_store,
+        "load_transactions",
+        lambda path: load_transactions.load_transactions(path, cache_dir),
+    )
+    monkeypatch.setattr(
+        transaction_store,
+        "source_version",
+        lambda path: load_transactions.source_version(path, cache_dir),
+    )
+    monkeypatch.setattr(transaction_store, "_stores", {})
+    return write_transactions(tmp_path / "transactions.csv", 30)
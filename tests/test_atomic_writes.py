@@ -0,0 +1,78 @@
+import os
+import json
+import types
+import threading
+
+import joblib
+import pandas as pd
+
+from utils.model import registry
+from utils.prediction import anytime_prediction
+
+WRITERS = 4
+
+
+def _rendezvous(dump):
+    """Wraps a dump so every writer has written its file before any replaces it."""
+    barrier = threading.Barrier(WRITERS, timeout=10)
+
+    def dump_and_wait(obj, *args, **kwargs):
+        dump(obj, *args, **kwargs)
+        barrier.wait()
+
+    return dump_and_wait
+
+
+def _run_writers(write):
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(WRITERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _leftovers(directory):
+    return [
+        name
+        for _, _, names in os.walk(directory)
+        for name in names
+        if name.endswith(".tmp")
+    ]
+
+
+def test_concurrent_model_saves_do_not_collide(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(registry.joblib, "dump", _rendezvous(joblib.dump))
+    data = pd.Series([1.0, 2.0, 3.0])
+
+    _run_writers(
+        lambda i: registry.save_model(
+            "SM001", "ml", {"n": i}, data, {"model": i}, models_dir=str(tmp_path)
+        )
+    )
+
+    assert "Error registering" not in capsys.readouterr().out
+    assert registry.load_entry("SM001", "ml", str(tmp_path))["params"]["n"] in range(
+        WRITERS
+    )
+    assert _leftovers(tmp_path) == []
+
+
+def test_concurrent_forecast_stores_do_not_collide(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(anytime_prediction, "FORECASTS_DIR", str(tmp_path))
+    monkeypatch.setattr(anytime_prediction, "_forecasts", {})
+    monkeypatch.setattr(
+        anytime_prediction,
+        "json",
+        types.SimpleNamespace(dump=_rendezvous(json.dump), load=json.load),
+    )
+
+    _run_writers(
+        lambda i: anytime_prediction._store(
+            {"vehicle_id": "SM001", "forecast_days": 7, "tier": i}
+        )
+    )
+
+    assert "Error storing" not in capsys.readouterr().out
+    with open(anytime_prediction._forecast_path("SM001", 7), encoding="utf-8") as f:
+        assert json.load(f)["tier"] in range(WRITERS)
+    assert _leftovers(tmp_path) == []
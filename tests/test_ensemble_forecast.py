@@ -0,0 +1,51 @@
+import pandas as pd
+
+from utils.ensemble.ensemble_forecast import ensemble_forecast
+
+LAST_DATE = pd.Timestamp("2025-01-31")
+
+
+def _member(value, days=7):
+    dates = pd.date_range(LAST_DATE + pd.Timedelta(days=1), periods=days)
+    return pd.DataFrame({"date": dates, "earnings": float(value)})
+
+
+def _prophet(value, days=7):
+    # Prophet forecasts carry the history rows as well
+    dates = pd.date_range(LAST_DATE - pd.Timedelta(days=29), periods=30 + days)
+    return pd.DataFrame({"ds": dates, "yhat": float(value)})
+
+
+def _forecasts():
+    return {
+        "ml": _member(3000),
+        "arima": _member(2000),
+        "sarima": _member(1000),
+        "prophet": _prophet(-90000),
+    }
+
+
+def test_weightless_ensemble_averages_the_baseline_members():
+    ensemble_df = ensemble_forecast(_forecasts(), None, LAST_DATE)
+
+    assert "prophet_forecast" not in ensemble_df
+    assert len(ensemble_df) == 7
+    assert (ensemble_df["ensemble_forecast"] == 2000).all()
+
+
+def test_prophet_joins_under_a_learned_weight():
+    weights = {"ml": 0.25, "arima": 0.25, "sarima": 0.25, "prophet": 0.25}
+
+    ensemble_df = ensemble_forecast(_forecasts(), weights, LAST_DATE)
+
+    assert len(ensemble_df) == 7
+    assert (ensemble_df["ensemble_forecast"] == -21000).all()
+
+
+def test_weightless_ensemble_skips_failed_members():
+    forecasts = _forecasts()
+    forecasts["arima"] = None
+
+    ensemble_df = ensemble_forecast(forecasts, None, LAST_DATE)
+
+    assert (ensemble_df["ensemble_forecast"] == 2000).all()
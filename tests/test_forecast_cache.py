@@ -0,0 +1,60 @@
+import os
+import json
+import pytest
+from conftest import write_transactions
+from api.routers import forecast_api
+from utils.data_preparation import load_transactions, transaction_store
+from utils.forecast import plot_forecast
+from utils.forecast.result_cache import ResultCache
+
+
+@pytest.fixture
+def forecast_router(transactions_csv, tmp_path, monkeypatch):
+    """The forecast router on the test CSV, with a pipeline that sums the store."""
+    monkeypatch.setattr(forecast_api, "DATA_CSV_FILE", transactions_csv)
+    monkeypatch.setattr(
+        forecast_api, "source_version", transaction_store.source_version
+    )
+    monkeypatch.setattr(
+        forecast_api, "forecast_cache", ResultCache(cache_dir=str(tmp_path / "results"))
+    )
+    monkeypatch.setattr(plot_forecast, "JSON_DIR", str(tmp_path / "json"))
+
+    def run_prediction(vehicle_id, forecast_days, store):
+        path = plot_forecast.forecast_json_path(vehicle_id, "ml", forecast_days)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"total": int(store.data["amount"].sum())}, f)
+        return {"ml": "forecast"}
+
+    monkeypatch.setattr(forecast_api, "run_prediction", run_prediction)
+    return forecast_api
+
+
+def test_figure_is_computed_from_the_keyed_version(forecast_router, transactions_csv):
+    assert forecast_router.generate_forecast("SM001", "ml", 7) == {"total": 3000}
+
+    # The store loaded for the first request must not be reused for new data
+    write_transactions(transactions_csv, 30, amount=2500)
+    assert forecast_router.generate_forecast("SM001", "ml", 7) == {"total": 75000}
+
+    version = transaction_store.source_version(transactions_csv)
+    cached = forecast_router.forecast_cache.get(("SM001", "ml", 7, version))
+    assert cached == {"total": 75000}
+
+
+def test_touched_file_is_hashed_once(transactions_csv, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    version = transaction_store.current_transaction_store(transactions_csv).version
+    os.utime(transactions_csv, (0, 0))
+
+    hashes = []
+    file_hash = load_transactions.file_hash
+    monkeypatch.setattr(
+        load_transactions,
+        "file_hash",
+        lambda path: hashes.append(path) or file_hash(path),
+    )
+    for _ in range(3):
+        assert load_transactions.source_version(transactions_csv, cache_dir) == version
+    assert len(hashes) == 1
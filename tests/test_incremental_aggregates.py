@@ -0,0 +1,24 @@
+import tracemalloc
+
+from conftest import write_transactions
+from utils.data_preparation.incremental_aggregates import stream_aggregates
+
+
+def test_rows_count_the_whole_file_when_filtering(tmp_path):
+    path = str(tmp_path / "transactions.csv")
+    write_transactions(path, 10, vehicles=("SM001", "SM002", "SM003"))
+
+    _, stats = stream_aggregates(path, chunksize=7, vehicle_id="SM002")
+
+    assert stats["rows"] == 30
+    assert stats["chunks"] == 5
+
+
+def test_memory_is_not_traced_by_default(tmp_path):
+    path = str(tmp_path / "transactions.csv")
+    write_transactions(path, 10)
+
+    _, stats = stream_aggregates(path)
+
+    assert stats["peak_memory"] is None
+    assert not tracemalloc.is_tracing()
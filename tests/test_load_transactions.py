@@ -0,0 +1,22 @@
+import os
+
+from conftest import write_transactions
+from utils.data_preparation.load_transactions import load_transactions
+
+
+def test_same_named_files_get_their_own_cache(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    os.makedirs(tmp_path / "a")
+    os.makedirs(tmp_path / "b")
+    first = write_transactions(tmp_path / "a" / "transactions.csv", 10, amount=100)
+    second = write_transactions(tmp_path / "b" / "transactions.csv", 10, amount=250)
+    # Same size and mtime, a cache keyed by name alone would serve either
+    os.utime(first, (0, 0))
+    os.utime(second, (0, 0))
+
+    assert load_transactions(first, cache_dir)["amount"].sum() == 1000
+    assert load_transactions(second, cache_dir)["amount"].sum() == 2500
+    assert load_transactions(first, cache_dir)["amount"].sum() == 1000
+    assert (
+        len([name for name in os.listdir(cache_dir) if name.endswith(".parquet")]) == 2
+    )
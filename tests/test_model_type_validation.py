@@ -0,0 +1,65 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routers import forecast_api, jobs_api
+from utils.jobs.job_queue import JobQueue
+
+
+def echo_forecast(vehicle_id, model_type, forecast_days):
+    return {"vehicle_id": vehicle_id, "model_type": model_type}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """The forecast and job routers, recording the forecasts they generate."""
+    generated = []
+    monkeypatch.setattr(
+        forecast_api,
+        "generate_forecast",
+        lambda *args: generated.append(args) or {"data": []},
+    )
+    jobs = JobQueue(echo_forecast, db_path=str(tmp_path / "jobs.sqlite3"), workers=1)
+    submitted = []
+    submit = jobs.submit
+    monkeypatch.setattr(
+        jobs, "submit", lambda **params: submitted.append(params) or submit(**params)
+    )
+    monkeypatch.setattr(jobs_api, "forecast_jobs", jobs)
+
+    app = FastAPI()
+    app.include_router(forecast_api.router)
+    app.include_router(jobs_api.router)
+    client = TestClient(app)
+    client.generated = generated
+    client.submitted = submitted
+    return client
+
+
+def test_unknown_model_type_is_not_queued(client):
+    response = client.post("/api/v1/jobs/forecast/SM055/bogus")
+
+    assert response.status_code == 422
+    assert client.submitted == []
+
+
+def test_known_model_type_is_queued(client):
+    response = client.post("/api/v1/jobs/forecast/SM055/ARIMA?forecast_days=7")
+
+    assert response.status_code == 202
+    assert response.json()["params"]["model_type"] == "arima"
+
+
+@pytest.mark.parametrize("suffix", ["", "/png"])
+def test_unknown_model_type_is_not_generated(client, suffix):
+    response = client.get(f"/api/v1/forecast/SM055/bogus{suffix}")
+
+    assert response.status_code == 422
+    assert client.generated == []
+
+
+def test_known_model_type_is_generated(client):
+    response = client.get("/api/v1/forecast/SM055/Prophet")
+
+    assert response.status_code == 200
+    assert client.generated == [("SM055", "Prophet", 30)]
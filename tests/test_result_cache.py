@@ -0,0 +1,43 @@
+import os
+import time
+from utils.forecast.result_cache import ResultCache
+
+
+def _files(cache_dir):
+    return [name for name in os.listdir(cache_dir) if name.endswith(".json")]
+
+
+def test_disk_tier_is_capped(tmp_path):
+    cache = ResultCache(maxsize=1, cache_dir=str(tmp_path), disk_maxsize=3)
+    for version in range(5):
+        cache.put(("SM001", "ml", 7, version), {"version": version})
+        time.sleep(0.01)  # distinct mtimes
+
+    assert len(_files(tmp_path)) == 3
+    assert cache.stats()["disk_evictions"] == 2
+    assert cache.get(("SM001", "ml", 7, 4)) == {"version": 4}
+    assert cache.get(("SM001", "ml", 7, 0)) is None
+
+
+def test_expired_disk_entry_is_deleted_on_read(tmp_path):
+    cache = ResultCache(ttl=0, disk_ttl=0.05, cache_dir=str(tmp_path))
+    cache.put(("SM001", "ml", 7, "v1"), {"total": 1})
+    time.sleep(0.1)
+
+    assert cache.get(("SM001", "ml", 7, "v1")) is None
+    assert _files(tmp_path) == []
+
+
+def test_disk_hits_are_kept_over_older_entries(tmp_path):
+    cache = ResultCache(maxsize=1, cache_dir=str(tmp_path), disk_maxsize=2)
+    cache.put(("a",), 1)
+    time.sleep(0.01)
+    cache.put(("b",), 2)
+    time.sleep(0.01)
+    assert ResultCache(cache_dir=str(tmp_path)).get(("a",)) == 1  # from disk
+    time.sleep(0.01)
+    cache.put(("c",), 3)
+
+    fresh = ResultCache(cache_dir=str(tmp_path))
+    assert fresh.get(("a",)) == 1
+    assert fresh.get(("b",)) is None
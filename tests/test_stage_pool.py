@@ -0,0 +1,95 @@
+import os
+import time
+
+import pytest
+
+from utils.prediction import stage_pool
+from utils.prediction.stage_pool import run_stages
+
+
+def constant(value):
+    return value
+
+
+def sleeper(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def crasher():
+    os._exit(1)
+
+
+def failing():
+    raise ValueError("no forecast")
+
+
+@pytest.fixture(autouse=True)
+def all_slots_free():
+    yield
+    # Every stage process was stopped and returned its slot
+    for _ in range(stage_pool.STAGE_WORKERS):
+        assert stage_pool._slots.acquire(blocking=False)
+    for _ in range(stage_pool.STAGE_WORKERS):
+        stage_pool._slots.release()
+
+
+def test_stages_return_their_forecasts():
+    stages = {"a": (constant, 1), "b": (constant, 2)}
+
+    results = dict(run_stages(stages, {"a": 30, "b": 30}))
+
+    assert results == {"a": 1, "b": 2}
+
+
+def test_failed_and_crashed_stages_yield_none():
+    stages = {"ok": (constant, 1), "fails": (failing,), "crashes": (crasher,)}
+
+    results = dict(run_stages(stages, {name: 30 for name in stages}))
+
+    assert results == {"ok": 1, "fails": None, "crashes": None}
+
+
+def test_timed_out_stage_is_terminated():
+    started = time.monotonic()
+
+    results = list(
+        run_stages(
+            {"slow": (sleeper, 60), "fast": (constant, 1)}, {"slow": 2, "fast": 30}
+        )
+    )
+
+    assert dict(results) == {"fast": 1, "slow": None}
+    assert time.monotonic() - started < 30
+
+
+def test_stages_run_again_after_a_timeout():
+    list(run_stages({"slow": (sleeper, 60)}, {"slow": 1}))
+
+    assert dict(run_stages({"a": (constant, 3)}, {"a": 30})) == {"a": 3}
+
+
+def test_closing_early_stops_the_remaining_stages():
+    stage_results = run_stages(
+        {"fast": (constant, 1), "slow": (sleeper, 60)}, {"fast": 30, "slow": 60}
+    )
+
+    assert next(stage_results) == ("fast", 1)
+    stage_results.close()
+
+
+def test_stages_in_turn_each_get_their_own_timeout():
+    stages = {"a": (sleeper, 1), "b": (sleeper, 1)}
+
+    results = dict(run_stages(stages, {"a": 1.8, "b": 1.8}, workers=1))
+
+    assert results == {"a": 1, "b": 1}
+
+
+def test_stages_start_before_the_results_are_read():
+    started = time.monotonic()
+    stage_results = run_stages({"a": (sleeper, 2)}, {"a": 30})
+    time.sleep(2)
+
+    assert dict(stage_results) == {"a": 2}
+    assert time.monotonic() - started < 3.5
@@ -0,0 +1,25 @@
+from conftest import write_transactions
+from utils.data_preparation import transaction_store
+
+
+def test_store_is_reused_while_the_file_is_unchanged(transactions_csv):
+    store = transaction_store.current_transaction_store(transactions_csv)
+    assert transaction_store.current_transaction_store(transactions_csv) is store
+
+
+def test_changed_file_reloads_the_store(transactions_csv):
+    before = transaction_store.current_transaction_store(transactions_csv)
+    write_transactions(transactions_csv, 30, amount=2500)
+
+    after = transaction_store.current_transaction_store(transactions_csv)
+    assert after.version != before.version
+    assert after.data["amount"].eq(2500).all()
+
+
+def test_slice_by_date_serves_the_updated_file(transactions_csv):
+    day = transaction_store.slice_by_date("2025-01-05", data_path=transactions_csv)
+    assert day["amount"].tolist() == [100]
+
+    write_transactions(transactions_csv, 30, amount=2500)
+    day = transaction_store.slice_by_date("2025-01-05", data_path=transactions_csv)
+    assert day["amount"].tolist() == [2500]
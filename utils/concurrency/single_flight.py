@@ -0,0 +1,100 @@
+import threading
+
+
+class _Call:
+    """An in-flight call and the outcome its waiters share."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller of a key runs the function; callers arriving while it
+    runs wait for it and receive the same result (or exception). Once the
+    call returns, the next caller of the key runs it again.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counts = {"calls": 0, "coalesced": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run `fn(*args, **kwargs)` unless a call with the same key is in flight.
+
+        Parameters:
+        - key: Hashable identifying the computation
+        - fn: Callable to run
+        - args, kwargs: Arguments of `fn`
+
+        Returns:
+        - The return value of the (shared) call
+
+        Raises:
+        - Whatever the shared call raised
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counts["calls"] += 1
+            else:
+                self._counts["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        """
+        Counters of the calls run and coalesced.
+
+        Returns:
+        - Dictionary with 'calls' (executions), 'coalesced' (callers that
+          shared another's execution) and 'in_flight'
+        """
+        with self._lock:
+            return {**self._counts, "in_flight": len(self._calls)}
+
+
+# Process-wide instance shared by the API routers
+_flights = SingleFlight()
+
+
+def single_flight(key, fn, *args, **kwargs):
+    """
+    Run `fn(*args, **kwargs)` once for all concurrent callers of `key`.
+
+    Parameters:
+    - key: Hashable identifying the computation (e.g. the output file path)
+    - fn: Callable to run
+    - args, kwargs: Arguments of `fn`
+
+    Returns:
+    - The return value of the shared call
+    """
+    return _flights.do(key, fn, *args, **kwargs)
+
+
+def single_flight_stats():
+    """Returns the counters of the process-wide single-flight group."""
+    return _flights.stats()
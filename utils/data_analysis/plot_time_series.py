@@ -1,9 +1,9 @@
 import os
-import json
 import matplotlib.pyplot as plt
 from config import FILES_DIR, JSON_DIR
 from utils.data_analysis.analyze_time_series import analyze_time_series
-import plotly.graph_objects as go
+from utils.rendering.figure_json import figure_payload, line_trace, write_json
+from utils.rendering.png_render import is_headless
 
 
 def plot_time_series_analysis(ts_data, vehicle_id):
@@ -15,51 +15,54 @@ def plot_time_series_analysis(ts_data, vehicle_id):
     - ts_data: Time series data
     - vehicle_id: Vehicle ID for title
     """
-    # Define directory paths
-    save_dir = os.path.join(FILES_DIR, vehicle_id, "analysis")
-    os.makedirs(save_dir, exist_ok=True)
-
-    """
-    Save PNG time series analysis
-    """
-    plt.figure(figsize=(14, 12))
-
-    # Plot the original time series
-    plt.subplot(2, 1, 1)
-    plt.plot(ts_data.index, ts_data.values)
-    plt.title(f"Time Series Analysis on Daily Earnings for Vehicle {vehicle_id}")
-    plt.ylabel("Amount (KSH)")
-    plt.grid(True)
-
-    # Try to plot the decomposition if we have enough data
+    # Decompose once for both outputs, if we have enough data
     decomposition = analyze_time_series(ts_data)
-    if decomposition:
-        plt.figure(figsize=(16, 12))
-        plt.subplot(4, 1, 1)
-        plt.plot(decomposition.observed)
-        plt.title("Observed")
-        plt.grid(True)
 
-        plt.subplot(4, 1, 2)
-        plt.plot(decomposition.trend)
-        plt.title("Trend")
-        plt.grid(True)
+    if not is_headless():
+        # Define directory paths
+        save_dir = os.path.join(FILES_DIR, vehicle_id, "analysis")
+        os.makedirs(save_dir, exist_ok=True)
 
-        plt.subplot(4, 1, 3)
-        plt.plot(decomposition.seasonal)
-        plt.title("Seasonality")
-        plt.grid(True)
+        # Save PNG time series analysis
+        plt.figure(figsize=(14, 12))
 
-        plt.subplot(4, 1, 4)
-        plt.plot(decomposition.resid)
-        plt.title("Residuals")
+        # Plot the original time series
+        plt.subplot(2, 1, 1)
+        plt.plot(ts_data.index, ts_data.values)
+        plt.title(f"Time Series Analysis on Daily Earnings for Vehicle {vehicle_id}")
+        plt.ylabel("Amount (KSH)")
         plt.grid(True)
 
-        plt.tight_layout()
-        plt.savefig(os.path.join(save_dir, "time_series_decomposition.png"), dpi=300)
+        # Try to plot the decomposition if we have enough data
+        if decomposition:
+            plt.figure(figsize=(16, 12))
+            plt.subplot(4, 1, 1)
+            plt.plot(decomposition.observed)
+            plt.title("Observed")
+            plt.grid(True)
+
+            plt.subplot(4, 1, 2)
+            plt.plot(decomposition.trend)
+            plt.title("Trend")
+            plt.grid(True)
+
+            plt.subplot(4, 1, 3)
+            plt.plot(decomposition.seasonal)
+            plt.title("Seasonality")
+            plt.grid(True)
+
+            plt.subplot(4, 1, 4)
+            plt.plot(decomposition.resid)
+            plt.title("Residuals")
+            plt.grid(True)
+
+            plt.tight_layout()
+            plt.savefig(
+                os.path.join(save_dir, "time_series_decomposition.png"), dpi=300
+            )
 
-    plt.tight_layout()
-    plt.savefig(os.path.join(save_dir, "time_series_analysis.png"), dpi=300)
+        plt.tight_layout()
+        plt.savefig(os.path.join(save_dir, "time_series_analysis.png"), dpi=300)
 
     """
     Save JSON time series analysis
@@ -68,75 +71,38 @@ def plot_time_series_analysis(ts_data, vehicle_id):
     json_save_dir = os.path.join(JSON_DIR, vehicle_id, "analysis")
     os.makedirs(json_save_dir, exist_ok=True)
 
-    # Create a main figure for the original time series
-    fig_main = go.Figure()
-    fig_main.add_trace(
-        go.Scatter(
-            x=ts_data.index, y=ts_data.values, mode="lines", name="Daily Earnings"
+    # Build the figures straight from the arrays, no go.Figure validation
+    json_output = {
+        "time_series_analysis": figure_payload(
+            [line_trace(ts_data.index, ts_data.to_numpy(), "Daily Earnings")],
+            title=f"Time Series Analysis on Daily Earnings for Vehicle {vehicle_id}",
+            xaxis_title="Date",
+            yaxis_title="Amount (KSH)",
+            template="plotly_dark",
         )
-    )
-
-    fig_main.update_layout(
-        title=f"Time Series Analysis on Daily Earnings for Vehicle {vehicle_id}",
-        xaxis_title="Date",
-        yaxis_title="Amount (KSH)",
-        template="plotly_dark",
-    )
-
-    # Initialize JSON output
-    json_output = {"time_series_analysis": json.loads(fig_main.to_json())}
+    }
 
-    # Try to analyze the time series decomposition
-    decomposition = analyze_time_series(ts_data)
+    # Add the time series decomposition
     if decomposition:
-        fig_decomposition = go.Figure()
-
-        # Observed
-        fig_decomposition.add_trace(
-            go.Scatter(
-                x=ts_data.index, y=decomposition.observed, mode="lines", name="Observed"
-            )
-        )
-
-        # Trend
-        fig_decomposition.add_trace(
-            go.Scatter(
-                x=ts_data.index, y=decomposition.trend, mode="lines", name="Trend"
-            )
-        )
-
-        # Seasonality
-        fig_decomposition.add_trace(
-            go.Scatter(
-                x=ts_data.index,
-                y=decomposition.seasonal,
-                mode="lines",
-                name="Seasonality",
-            )
-        )
-
-        # Residuals
-        fig_decomposition.add_trace(
-            go.Scatter(
-                x=ts_data.index, y=decomposition.resid, mode="lines", name="Residuals"
-            )
-        )
-
-        fig_decomposition.update_layout(
+        components = {
+            "Observed": decomposition.observed,
+            "Trend": decomposition.trend,
+            "Seasonality": decomposition.seasonal,
+            "Residuals": decomposition.resid,
+        }
+        json_output["time_series_decomposition.json"] = figure_payload(
+            [
+                line_trace(ts_data.index, values, name)
+                for name, values in components.items()
+            ],
             title="Time Series Decomposition",
             xaxis_title="Date",
             yaxis_title="Value",
             template="plotly_dark",
         )
 
-        # Add decomposition chart to JSON output
-        json_output["time_series_decomposition.json"] = json.loads(
-            fig_decomposition.to_json()
-        )
-
     # Save JSON file
     json_path = os.path.join(json_save_dir, "time_series_analysis.json")
-    with open(json_path, "w") as f:
-        json.dump(json_output, f, indent=4)
+    write_json(json_path, json_output)
 
     print(f"Time series analysis Plotly JSON saved at: {json_path}")
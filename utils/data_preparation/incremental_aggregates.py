@@ -0,0 +1,479 @@
+import os
+import threading
+import json
+import argparse
+import tracemalloc
+import pandas as pd
+from config import AGGREGATES_DIR, DATA_CSV_FILE
+from utils.data_preparation.load_transactions import coerce_transaction_types
+
+# Persisted granularities: resample frequency -> table name
+GRANULARITIES = {"D": "daily", "h": "hourly"}
+
+# Raw rows read per chunk when streaming a transactions file
+DEFAULT_CHUNKSIZE = 100_000
+
+KEY_COLUMNS = ["vehicle_booked", "period"]
+
+
+def _table_path(aggregates_dir, freq):
+    """Returns the parquet path of the aggregate table for `freq`."""
+    return os.path.join(aggregates_dir, f"{GRANULARITIES[freq]}.parquet")
+
+
+def _meta_path(aggregates_dir):
+    """Returns the path of the aggregates metadata file."""
+    return os.path.join(aggregates_dir, "aggregates.meta.json")
+
+
+def _ingested_path(aggregates_dir):
+    """Returns the parquet path of the fingerprints of the aggregated rows."""
+    return os.path.join(aggregates_dir, "ingested.parquet")
+
+
+def _empty_table():
+    """Returns an empty aggregate table."""
+    return pd.DataFrame(
+        {
+            "vehicle_booked": pd.Series([], dtype="category"),
+            "period": pd.Series([], dtype="datetime64[ns]"),
+            "amount": pd.Series([], dtype="int64"),
+            "count": pd.Series([], dtype="int64"),
+        }
+    )
+
+
+def aggregate_transactions(data, freq="D"):
+    """
+    Aggregate CREDIT transactions into per-vehicle, per-period sums and counts.
+
+    Parameters:
+    - data: DataFrame with typed transaction columns
+    - freq: Period length ('D' for daily, 'h' for hourly)
+
+    Returns:
+    - DataFrame with 'vehicle_booked', 'period', 'amount' and 'count' columns
+    """
+    credit_data = data[data["transaction_type"] == "CREDIT"]
+    periods = credit_data["created_at"].dt.floor(freq).rename("period")
+    grouped = credit_data.groupby(
+        [credit_data["vehicle_booked"], periods], observed=True
+    )["amount"]
+    return grouped.agg(amount="sum", count="size").reset_index()
+
+
+def row_fingerprints(data):
+    """
+    Hash transaction rows by their content.
+
+    Columns are normalized first, so the same transaction read from CSV or
+    JSONL gets the same fingerprint.
+
+    Parameters:
+    - data: DataFrame with typed transaction columns
+
+    Returns:
+    - Array of uint64 fingerprints, one per row
+    """
+    keys = pd.DataFrame(
+        {
+            "vehicle_booked": data["vehicle_booked"].astype(str),
+            "amount": data["amount"].astype("float64"),
+            "payment_status": data["payment_status"].astype("int64"),
+            "transaction_type": data["transaction_type"].astype(str),
+            "created_at": data["created_at"].astype("datetime64[ns]"),
+        }
+    )
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+def count_fingerprints(*counts):
+    """Sums fingerprint counts (Series of counts indexed by fingerprint)."""
+    counts = [count for count in counts if len(count)]
+    if not counts:
+        return pd.Series([], dtype="int64", index=pd.Index([], dtype="uint64"))
+    return pd.concat(counts).groupby(level=0).sum()
+
+
+def pivot_by_vehicle(table, value="amount"):
+    """
+    Pivot an aggregate or rollup table into per-vehicle totals by period.
+
+    Parameters:
+    - table: Table with 'period', 'vehicle_booked' and `value` columns
+    - value: 'amount' for summed earnings or 'count' for transaction counts
+
+    Returns:
+    - DataFrame with the sorted periods as index and vehicles as columns
+    """
+    return table.pivot_table(
+        index="period",
+        columns="vehicle_booked",
+        values=value,
+        aggfunc="sum",
+        fill_value=0,
+        observed=True,
+    ).sort_index()
+
+
+def merge_aggregates(*tables):
+    """
+    Combine aggregate tables, summing the rows that share a (vehicle, period) key.
+
+    Parameters:
+    - tables: Aggregate tables as returned by `aggregate_transactions`
+
+    Returns:
+    - Merged aggregate table sorted by vehicle and period
+    """
+    tables = [table.astype({"vehicle_booked": str}) for table in tables if len(table)]
+    if not tables:
+        return _empty_table()
+
+    combined = pd.concat(tables, ignore_index=True)
+
+    merged = combined.groupby(KEY_COLUMNS, sort=True)[["amount", "count"]].sum()
+    return merged.reset_index().astype({"vehicle_booked": "category"})
+
+
+def read_transaction_batch(source, fmt=None):
+    """
+    Read a batch of new transaction rows.
+
+    Parameters:
+    - source: DataFrame, path or file-like object with transaction rows
+    - fmt: 'csv' or 'jsonl'; inferred from the file extension when omitted
+
+    Returns:
+    - DataFrame with typed transaction columns
+    """
+    if isinstance(source, pd.DataFrame):
+        batch = source.copy()
+    else:
+        if fmt is None:
+            name = source if isinstance(source, str) else getattr(source, "name", "")
+            fmt = "jsonl" if str(name).endswith((".jsonl", ".json")) else "csv"
+        if fmt == "jsonl":
+            batch = pd.read_json(source, lines=True, convert_dates=False)
+        else:
+            batch = pd.read_csv(source)
+
+    return coerce_transaction_types(batch)
+
+
+class EarningsAggregates:
+    """
+    Persisted daily and hourly per-vehicle earnings.
+
+    Series are resampled from these tables, so no raw transaction rows are
+    scanned when building a vehicle's earnings.
+    """
+
+    def __init__(self, tables):
+        """
+        Parameters:
+        - tables: Dictionary mapping 'D'/'h' to aggregate tables
+        """
+        self.tables = tables
+
+    def series(self, vehicle_id=None, resample_freq="D"):
+        """
+        Build an earnings series from the aggregates.
+
+        Parameters:
+        - vehicle_id: Optional vehicle ID to filter by
+        - resample_freq: Frequency to resample the data ('D', 'H', 'W', 'M', ...)
+
+        Returns:
+        - Series of summed earnings indexed by period, like `prepare_time_series_data`
+        """
+        # Sub-daily frequencies are resampled from the hourly table
+        offset = pd.tseries.frequencies.to_offset(resample_freq)
+        hourly = isinstance(offset, pd.offsets.Tick) and offset < pd.offsets.Day()
+        table = self.tables["h" if hourly else "D"]
+
+        if vehicle_id:
+            table = table[table["vehicle_booked"] == vehicle_id]
+
+        amounts = table.groupby("period")["amount"].sum()
+        amounts.index = pd.DatetimeIndex(amounts.index, name="created_at")
+        return amounts.rename("amount").resample(resample_freq).sum().fillna(0)
+
+    def pivot(self, resample_freq="D", value="amount"):
+        """
+        Per-vehicle totals for every period, as used by the EDA charts.
+
+        Parameters:
+        - resample_freq: Frequency to resample the data ('h', 'D', 'W', 'M', ...)
+        - value: 'amount' for summed earnings or 'count' for transaction counts
+
+        Returns:
+        - DataFrame with periods as index and vehicles as columns
+        """
+        offset = pd.tseries.frequencies.to_offset(resample_freq)
+        hourly = isinstance(offset, pd.offsets.Tick) and offset < pd.offsets.Day()
+        table = self.tables["h" if hourly else "D"]
+
+        pivot_data = pivot_by_vehicle(table, value)
+        pivot_data.index = pd.DatetimeIndex(pivot_data.index, name="created_at")
+        return pivot_data.resample(resample_freq).sum()
+
+
+def load_aggregates(aggregates_dir=AGGREGATES_DIR):
+    """
+    Load the persisted aggregate tables.
+
+    Parameters:
+    - aggregates_dir: Directory holding the aggregate tables
+
+    Returns:
+    - EarningsAggregates (tables are empty if nothing was persisted yet)
+    """
+    tables = {}
+    for freq in GRANULARITIES:
+        path = _table_path(aggregates_dir, freq)
+        tables[freq] = pd.read_parquet(path) if os.path.exists(path) else _empty_table()
+    return EarningsAggregates(tables)
+
+
+def _write_tables(aggregates_dir, tables, meta, ingested):
+    """Atomically persists the aggregate tables, row fingerprints and metadata."""
+    os.makedirs(aggregates_dir, exist_ok=True)
+    # Writers in other threads and processes use their own temporary files
+    suffix = f"{os.getpid()}.{threading.get_ident()}.tmp"
+    for freq, table in tables.items():
+        path = _table_path(aggregates_dir, freq)
+        table.to_parquet(f"{path}.{suffix}", index=False)
+        os.replace(f"{path}.{suffix}", path)
+
+    path = _ingested_path(aggregates_dir)
+    ingested.rename_axis("fingerprint").rename("count").reset_index().to_parquet(
+        f"{path}.{suffix}", index=False
+    )
+    os.replace(f"{path}.{suffix}", path)
+
+    path = _meta_path(aggregates_dir)
+    with open(f"{path}.{suffix}", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(f"{path}.{suffix}", path)
+
+
+def _read_meta(aggregates_dir):
+    """Reads the aggregates metadata, returning an empty dict if missing."""
+    try:
+        with open(_meta_path(aggregates_dir), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _read_ingested(aggregates_dir):
+    """Reads the fingerprint counts of the aggregated rows (empty if missing)."""
+    path = _ingested_path(aggregates_dir)
+    if not os.path.exists(path):
+        return count_fingerprints()
+    ingested = pd.read_parquet(path)
+    return ingested.set_index("fingerprint")["count"]
+
+
+def append_transactions(source, fmt=None, aggregates_dir=AGGREGATES_DIR):
+    """
+    Fold a batch of new transactions into the persisted aggregates.
+
+    Rows are added to the bucket of their own period, so late rows (older
+    than the newest transaction already aggregated) update past periods
+    correctly instead of being attributed to the current one.
+
+    Appending is idempotent: the fingerprints of the aggregated rows are
+    kept, and rows already aggregated (a retried batch, or a chunk that
+    overlaps an earlier one) are skipped. Identical rows within one batch
+    are separate transactions and all counted.
+
+    Parameters:
+    - source: DataFrame, CSV chunk or JSONL batch with new transaction rows
+    - fmt: 'csv' or 'jsonl'; inferred from the file extension when omitted
+    - aggregates_dir: Directory holding the aggregate tables
+
+    Returns:
+    - Dictionary with the number of rows appended, skipped and late rows and
+      the new watermark
+    """
+    batch = read_transaction_batch(source, fmt)
+    current = load_aggregates(aggregates_dir)
+    meta = _read_meta(aggregates_dir)
+    ingested = _read_ingested(aggregates_dir)
+
+    # The n-th copy of a row in the batch is new if fewer than n were aggregated
+    fingerprints = pd.Series(row_fingerprints(batch))
+    occurrence = fingerprints.groupby(fingerprints).cumcount()
+    seen = fingerprints.map(ingested).fillna(0)
+    new = (occurrence >= seen).to_numpy()
+    skipped_rows = int((~new).sum())
+    batch = batch[new]
+    ingested = count_fingerprints(ingested, fingerprints[new].value_counts())
+
+    watermark = pd.Timestamp(meta["watermark"]) if meta.get("watermark") else None
+    late_rows = int((batch["created_at"] < watermark).sum()) if watermark else 0
+
+    tables = {
+        freq: merge_aggregates(
+            current.tables[freq], aggregate_transactions(batch, freq)
+        )
+        for freq in GRANULARITIES
+    }
+
+    if len(batch):
+        newest = batch["created_at"].max()
+        watermark = max(watermark, newest) if watermark else newest
+
+    meta = {
+        "watermark": watermark.isoformat() if watermark else None,
+        "rows": meta.get("rows", 0) + len(batch),
+        "late_rows": meta.get("late_rows", 0) + late_rows,
+        "skipped_rows": meta.get("skipped_rows", 0) + skipped_rows,
+    }
+    _write_tables(aggregates_dir, tables, meta, ingested)
+
+    print(
+        f"Appended {len(batch)} transactions ({late_rows} late, {skipped_rows} "
+        f"already aggregated) to {aggregates_dir}"
+    )
+    return {
+        "rows": len(batch),
+        "skipped_rows": skipped_rows,
+        "late_rows": late_rows,
+        "watermark": meta["watermark"],
+    }
+
+
+def stream_aggregates(
+    data_path=DATA_CSV_FILE,
+    chunksize=DEFAULT_CHUNKSIZE,
+    track_memory=False,
+    fingerprints=False,
+    vehicle_id=None,
+):
+    """
+    Build daily and hourly aggregates from a transactions file in bounded chunks.
+
+    At most one chunk of raw rows is held at a time; per-chunk partial
+    aggregates are buffered and compacted into the running sums and counts.
+
+    Parameters:
+    - data_path: Path to the CSV file with transaction data
+    - chunksize: Number of raw rows read per chunk
+    - track_memory: Measure peak memory with tracemalloc while streaming
+      (slows the run down, off by default)
+    - fingerprints: Also count the row fingerprints (see `row_fingerprints`),
+      returned as the 'fingerprints' entry of the stats
+    - vehicle_id: Optional vehicle ID; rows of other vehicles are dropped from
+      each chunk as it is read
+
+    Returns:
+    - EarningsAggregates built from the file
+    - Dictionary with rows (read, before the vehicle filter), chunks,
+      watermark and peak memory (bytes, None unless tracked) of the run
+    """
+    tracing = track_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    if track_memory:
+        tracemalloc.reset_peak()
+
+    tables = {freq: _empty_table() for freq in GRANULARITIES}
+    partials = {freq: [] for freq in GRANULARITIES}
+    rows, chunks, watermark = 0, 0, None
+    counts = count_fingerprints()
+
+    try:
+        for chunk in pd.read_csv(data_path, chunksize=chunksize):
+            rows += len(chunk)
+            chunks += 1
+            if vehicle_id:
+                chunk = chunk[chunk["vehicle_booked"] == vehicle_id]
+            chunk = coerce_transaction_types(chunk)
+            if chunk.empty:
+                continue
+            newest = chunk["created_at"].max()
+            watermark = newest if watermark is None else max(watermark, newest)
+            if fingerprints:
+                counts = count_fingerprints(
+                    counts, pd.Series(row_fingerprints(chunk)).value_counts()
+                )
+
+            for freq in GRANULARITIES:
+                partials[freq].append(aggregate_transactions(chunk, freq))
+
+                # Compact once the buffered partials outgrow a chunk
+                if sum(len(partial) for partial in partials[freq]) > chunksize:
+                    tables[freq] = merge_aggregates(tables[freq], *partials[freq])
+                    partials[freq] = []
+            del chunk
+
+        for freq in GRANULARITIES:
+            tables[freq] = merge_aggregates(tables[freq], *partials[freq])
+
+        peak_memory = tracemalloc.get_traced_memory()[1] if track_memory else None
+    finally:
+        if tracing:
+            tracemalloc.stop()
+
+    stats = {
+        "rows": rows,
+        "chunks": chunks,
+        "watermark": watermark.isoformat() if watermark is not None else None,
+        "peak_memory": peak_memory,
+    }
+    if fingerprints:
+        stats["fingerprints"] = counts
+    if peak_memory is not None:
+        print(
+            f"Streamed {rows} transactions in {chunks} chunks of {chunksize}, "
+            f"peak memory {peak_memory / 2**20:.1f} MiB"
+        )
+    return EarningsAggregates(tables), stats
+
+
+def rebuild_aggregates(
+    data_path=DATA_CSV_FILE, aggregates_dir=AGGREGATES_DIR, chunksize=DEFAULT_CHUNKSIZE
+):
+    """
+    Rebuild the persisted aggregates from the full transactions file.
+
+    Parameters:
+    - data_path: Path to the CSV file with transaction data
+    - aggregates_dir: Directory holding the aggregate tables
+    - chunksize: Number of raw rows read per chunk
+
+    Returns:
+    - EarningsAggregates built from the file
+    """
+    aggregates, stats = stream_aggregates(data_path, chunksize, fingerprints=True)
+    meta = {
+        "watermark": stats["watermark"],
+        "rows": stats["rows"],
+        "late_rows": 0,
+        "skipped_rows": 0,
+    }
+    _write_tables(aggregates_dir, aggregates.tables, meta, stats["fingerprints"])
+
+    print(f"Aggregates rebuilt at: {aggregates_dir}")
+    return aggregates
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Append transactions to the persisted daily/hourly aggregates."
+    )
+    parser.add_argument("source", nargs="?", help="CSV chunk or JSONL batch to append")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None)
+    parser.add_argument(
+        "--rebuild", action="store_true", help="Rebuild from the full transactions CSV"
+    )
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild_aggregates(chunksize=args.chunksize)
+    if args.source:
+        append_transactions(args.source, args.format)
@@ -0,0 +1,172 @@
+import os
+import json
+import hashlib
+import threading
+import pandas as pd
+from config import CACHE_DIR, DATA_CSV_FILE
+
+# Column types of the columnar cache
+CATEGORICAL_COLUMNS = ["vehicle_booked", "transaction_type"]
+
+
+def coerce_transaction_types(data):
+    """
+    Convert raw transaction columns to their compact typed representation.
+
+    Parameters:
+    - data: DataFrame with raw transaction columns as read from CSV/JSON
+
+    Returns:
+    - DataFrame with datetime 'created_at', categorical vehicle/transaction type
+      and small-int 'payment_status'
+    """
+    data["created_at"] = pd.to_datetime(data["created_at"])
+    for column in CATEGORICAL_COLUMNS:
+        data[column] = data[column].astype("category")
+    data["payment_status"] = pd.to_numeric(data["payment_status"], downcast="integer")
+    return data
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    Compute the SHA-256 hash of a file, reading it in chunks.
+
+    Parameters:
+    - path: Path to the file
+    - chunk_size: Number of bytes read per chunk
+
+    Returns:
+    - Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(data_path, cache_dir):
+    """
+    Returns the parquet and metadata paths used to cache `data_path`.
+
+    The names carry a hash of the absolute source path, so files of the same
+    name in different directories don't share (and evict) one cache.
+    """
+    name = os.path.splitext(os.path.basename(data_path))[0]
+    source = hashlib.sha256(os.path.abspath(data_path).encode("utf-8")).hexdigest()
+    name = f"{name}.{source[:16]}"
+    return (
+        os.path.join(cache_dir, f"{name}.parquet"),
+        os.path.join(cache_dir, f"{name}.meta.json"),
+    )
+
+
+def _read_meta(meta_path):
+    """Reads cache metadata, returning None if it is missing or unreadable."""
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    """Atomically writes cache metadata."""
+    # Writers in other threads and processes use their own temporary file
+    tmp_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def source_version(data_path=DATA_CSV_FILE, cache_dir=CACHE_DIR):
+    """
+    Return the content hash of the transactions CSV without loading it.
+
+    The hash recorded in the cache metadata is reused while the file's
+    mtime and size are unchanged, so this is normally a single `stat`. A file
+    that was only touched is hashed once, then its new mtime and size are
+    recorded.
+
+    Parameters:
+    - data_path: Path to the CSV file with transaction data
+    - cache_dir: Directory holding the columnar cache
+
+    Returns:
+    - Hex digest identifying the current contents of the file
+    """
+    stat = os.stat(data_path)
+    meta_path = _cache_paths(data_path, cache_dir)[1]
+    meta = _read_meta(meta_path)
+    if meta and meta["mtime"] == stat.st_mtime and meta["size"] == stat.st_size:
+        return meta["sha256"]
+
+    sha256 = file_hash(data_path)
+    if meta and meta["sha256"] == sha256:
+        # Same contents, the cache stays valid; a changed file is recorded
+        # when `load_transactions` rebuilds the cache
+        try:
+            _write_meta(
+                meta_path, {**meta, "mtime": stat.st_mtime, "size": stat.st_size}
+            )
+        except OSError as e:
+            print(f"Error writing transactions cache metadata: {e}")
+    return sha256
+
+
+def load_transactions(data_path=DATA_CSV_FILE, cache_dir=CACHE_DIR):
+    """
+    Load the transactions CSV through a typed Parquet cache.
+
+    The CSV is parsed once and stored as Parquet next to a metadata file with
+    the source's mtime, size and SHA-256. The cache is reused while mtime and
+    size match; if they changed but the hash did not (e.g. the file was only
+    touched) the metadata is refreshed without re-parsing.
+
+    Parameters:
+    - data_path: Path to the CSV file with transaction data
+    - cache_dir: Directory holding the columnar cache
+
+    Returns:
+    - DataFrame with typed transaction columns
+    """
+    parquet_path, meta_path = _cache_paths(data_path, cache_dir)
+    stat = os.stat(data_path)
+    meta = _read_meta(meta_path)
+
+    if meta and os.path.exists(parquet_path):
+        if meta["mtime"] == stat.st_mtime and meta["size"] == stat.st_size:
+            return pd.read_parquet(parquet_path)
+
+        sha256 = file_hash(data_path)
+        if meta["sha256"] == sha256:
+            _write_meta(
+                meta_path, {**meta, "mtime": stat.st_mtime, "size": stat.st_size}
+            )
+            return pd.read_parquet(parquet_path)
+    else:
+        sha256 = file_hash(data_path)
+
+    # (Re)build the cache from the source CSV
+    data = coerce_transaction_types(pd.read_csv(data_path))
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Writers in other threads and processes use their own temporary file
+        tmp_path = f"{parquet_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        data.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, parquet_path)
+        _write_meta(
+            meta_path,
+            {
+                "source": os.path.abspath(data_path),
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "sha256": sha256,
+            },
+        )
+        print(f"Transactions cache rebuilt at: {parquet_path}")
+    except (ImportError, OSError) as e:
+        print(f"Error writing transactions cache: {e}")
+
+    return data
@@ -1,4 +1,41 @@
 import numpy as np
+import pandas as pd
+
+# Number of lagged earnings used as features
+LAGS = 7
+
+# Model input columns, in the order produced by `prepare_features`
+DATE_FEATURES = ["dayofweek", "month", "day", "dayofyear", "week", "is_weekend"]
+LAG_FEATURES = [f"lag_{lag}" for lag in range(1, LAGS + 1)]
+ROLLING_FEATURES = ["rolling_mean_3", "rolling_mean_7", "rolling_std_7"]
+FEATURE_COLUMNS = DATE_FEATURES + LAG_FEATURES + ROLLING_FEATURES
+
+# Version of the feature definitions, part of the registry key of ML models
+FEATURE_VERSION = 2
+
+
+def date_features(dates):
+    """
+    Calendar features of a sequence of dates.
+
+    Parameters:
+    - dates: DatetimeIndex or datetime Series
+
+    Returns:
+    - DataFrame with one column per name in DATE_FEATURES
+    """
+    dates = pd.Series(pd.DatetimeIndex(dates)).dt
+    dayofweek = dates.dayofweek.astype(np.int8)
+    return pd.DataFrame(
+        {
+            "dayofweek": dayofweek,
+            "month": dates.month.astype(np.int8),
+            "day": dates.day.astype(np.int8),
+            "dayofyear": dates.dayofyear.astype(np.int16),
+            "week": dates.isocalendar().week.astype(np.int8),
+            "is_weekend": (dayofweek >= 5).astype(np.int8),
+        }
+    )
 
 
 def prepare_features(ts_data):
@@ -12,23 +49,18 @@ def prepare_features(ts_data):
     df["earnings"] = df["earnings"].astype(float)  # <-- Fix here
 
     # Date features
-    dates = df["date"].dt
-    df["dayofweek"] = dates.dayofweek.astype(np.int8)
-    df["month"] = dates.month.astype(np.int8)
-    df["day"] = dates.day.astype(np.int8)
-    df["dayofyear"] = dates.dayofyear.astype(np.int16)
-    df["week"] = dates.isocalendar().week.astype(np.int8)  # <-- Fix here
-    df["is_weekend"] = (df["dayofweek"] >= 5).astype(np.int8)
+    df = pd.concat([df, date_features(df["date"])], axis=1)
 
     # Lag features with explicit dtype
-    for lag in range(1, 8):
+    for lag in range(1, LAGS + 1):
         df[f"lag_{lag}"] = df["earnings"].shift(lag).astype(np.float32)
 
-    # Rolling features
-    rolling = df["earnings"].rolling(window=3)
-    df["rolling_mean_3"] = rolling.mean().astype(np.float32)
-    df["rolling_mean_7"] = df["earnings"].rolling(window=7).mean().astype(np.float32)
-    df["rolling_std_7"] = df["earnings"].rolling(window=7).std().astype(np.float32)
+    # Rolling features over the previous days only, the current day's earnings
+    # are the target (the same windows LagState computes when forecasting)
+    previous = df["earnings"].shift(1)
+    df["rolling_mean_3"] = previous.rolling(window=3).mean().astype(np.float32)
+    df["rolling_mean_7"] = previous.rolling(window=7).mean().astype(np.float32)
+    df["rolling_std_7"] = previous.rolling(window=7).std().astype(np.float32)
 
     return df.dropna()
 
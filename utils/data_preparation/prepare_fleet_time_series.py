@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
+from utils.data_preparation.transaction_store import TransactionStore
+
+
+class FleetTimeSeries:
+    """
+    Dense vehicles x periods matrix of CREDIT earnings.
+
+    Row `i` of `values` holds the earnings of `vehicles[i]` for every period in
+    `periods`; per-vehicle series are views into that row.
+    """
+
+    def __init__(self, vehicles, periods, values, bounds):
+        """
+        Parameters:
+        - vehicles: Index of vehicle IDs (matrix rows)
+        - periods: DatetimeIndex of period labels (matrix columns)
+        - values: 2D array of summed earnings, shape (len(vehicles), len(periods))
+        - bounds: 2D int array with each vehicle's first and last active period
+        """
+        self.vehicles = vehicles
+        self.periods = periods
+        self.values = values
+        self.bounds = bounds
+
+    def series(self, vehicle_id):
+        """
+        Return a vehicle's earnings as a view into the matrix.
+
+        The series spans the vehicle's first to last active period, matching
+        `prepare_time_series_data(data, vehicle_id, resample_freq)`.
+
+        Parameters:
+        - vehicle_id: ID of the vehicle
+
+        Returns:
+        - Series of earnings indexed by period
+        """
+        if vehicle_id not in self.vehicles:
+            return pd.Series(
+                [],
+                index=pd.DatetimeIndex([], name="created_at"),
+                dtype=self.values.dtype,
+                name="amount",
+            )
+
+        row = self.vehicles.get_loc(vehicle_id)
+        first, last = self.bounds[row]
+        return pd.Series(
+            self.values[row, first : last + 1],
+            index=self.periods[first : last + 1],
+            name="amount",
+            copy=False,
+        )
+
+    def to_frame(self):
+        """Returns the matrix as a DataFrame with vehicles as rows and periods as columns."""
+        return pd.DataFrame(
+            self.values, index=self.vehicles, columns=self.periods, copy=False
+        )
+
+
+def prepare_fleet_time_series(data, resample_freq="D"):
+    """
+    Resample the CREDIT earnings of every vehicle in a single pass.
+
+    Parameters:
+    - data: DataFrame containing the transaction data, or a TransactionStore
+    - resample_freq: Frequency to resample the data ('D', 'H', 'W' or 'M')
+
+    Returns:
+    - FleetTimeSeries with one row per vehicle and one column per period
+    """
+    if isinstance(data, TransactionStore):
+        data = data.data
+    elif not is_datetime64_any_dtype(data["created_at"]):
+        data = data.assign(created_at=pd.to_datetime(data["created_at"]))
+
+    # One groupby over all credit transactions
+    credit_data = data.loc[
+        data["transaction_type"] == "CREDIT", ["vehicle_booked", "created_at", "amount"]
+    ]
+    sums = credit_data.groupby(
+        ["vehicle_booked", pd.Grouper(key="created_at", freq=resample_freq)],
+        observed=True,
+    )["amount"].sum()
+
+    vehicle_labels = sums.index.get_level_values(0)
+    period_labels = sums.index.get_level_values(1)
+
+    vehicles = pd.Index(vehicle_labels.unique(), name="vehicle_booked")
+    if len(sums):
+        periods = pd.date_range(
+            period_labels.min(),
+            period_labels.max(),
+            freq=resample_freq,
+            name="created_at",
+        )
+    else:
+        periods = pd.DatetimeIndex([], name="created_at")
+
+    # Scatter the sums into a dense matrix
+    rows = vehicles.get_indexer(vehicle_labels)
+    cols = periods.get_indexer(period_labels)
+    values = np.zeros((len(vehicles), len(periods)), dtype=sums.dtype)
+    values[rows, cols] = sums.to_numpy()
+
+    # Active period range of each vehicle
+    active = pd.Series(cols).groupby(rows)
+    bounds = np.column_stack([active.min().to_numpy(), active.max().to_numpy()])
+
+    return FleetTimeSeries(vehicles, periods, values, bounds)
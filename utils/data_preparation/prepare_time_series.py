@@ -1,68 +1,104 @@
 import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
+from utils.data_preparation.transaction_store import TransactionStore
+from utils.data_preparation.incremental_aggregates import (
+    DEFAULT_CHUNKSIZE,
+    EarningsAggregates,
+    stream_aggregates,
+)
 
 
-def prepare_time_series_data(data, vehicle_id=None, resample_freq="D"):
+def _credit_earnings(data, vehicle_id=None, resample_freq="D"):
     """
-    Prepare data for time series analysis by resampling and aggregating by date.
+    Resample the CREDIT transaction amounts of one vehicle (or all vehicles).
 
     Parameters:
-    - data: DataFrame containing the transaction data
+    - data: DataFrame with transaction data, a TransactionStore or EarningsAggregates
     - vehicle_id: Optional vehicle ID to filter by
     - resample_freq: Frequency to resample the data ('D' for daily, 'H' for hourly, etc.)
 
     Returns:
-    - Resampled DataFrame with date as index and aggregate earnings
+    - Series of summed earnings indexed by period
     """
-    # Convert created_at to datetime if not already
-    data["created_at"] = pd.to_datetime(data["created_at"])
+    if isinstance(data, EarningsAggregates):
+        # Persisted daily/hourly sums, no raw rows to scan
+        return data.series(vehicle_id, resample_freq)
 
-    # Filter for the specified vehicle if provided
-    if vehicle_id:
-        df = data[data["vehicle_booked"] == vehicle_id].copy()
+    if isinstance(data, TransactionStore):
+        # Contiguous slice of the shared, pre-typed table
+        df = data.vehicle(vehicle_id) if vehicle_id else data.data
     else:
-        df = data.copy()
+        # Convert created_at to datetime without touching the caller's frame
+        if not is_datetime64_any_dtype(data["created_at"]):
+            data = data.assign(created_at=pd.to_datetime(data["created_at"]))
+        df = data[data["vehicle_booked"] == vehicle_id] if vehicle_id else data
 
     # Filter for credit transactions only (passenger payments)
-    credit_data = df[df["transaction_type"] == "CREDIT"].copy()
-
-    # Set the datetime as index
-    credit_data.set_index("created_at", inplace=True)
+    credit_data = df[df["transaction_type"] == "CREDIT"]
 
     # Resample and sum the amounts for each period
-    earnings = credit_data.resample(resample_freq)["amount"].sum().fillna(0)
+    amounts = pd.Series(
+        credit_data["amount"].to_numpy(),
+        index=pd.DatetimeIndex(credit_data["created_at"]),
+        name="amount",
+    )
+    amounts.index.name = "created_at"
+    return amounts.resample(resample_freq).sum().fillna(0)
 
-    return earnings
 
-
-def prepare_prophet_time_series_data(data, vehicle_id=None, resample_freq="D"):
+def prepare_time_series_data(data, vehicle_id=None, resample_freq="D"):
     """
     Prepare data for time series analysis by resampling and aggregating by date.
 
     Parameters:
-    - data: DataFrame containing the transaction data
+    - data: DataFrame containing the transaction data, a TransactionStore or
+      EarningsAggregates
     - vehicle_id: Optional vehicle ID to filter by
     - resample_freq: Frequency to resample the data ('D' for daily, 'H' for hourly, etc.)
 
     Returns:
     - Resampled DataFrame with date as index and aggregate earnings
     """
-    # Convert created_at to datetime if not already
-    data["created_at"] = pd.to_datetime(data["created_at"])
+    return _credit_earnings(data, vehicle_id, resample_freq)
 
-    # Filter for the specified vehicle if provided
-    if vehicle_id:
-        df = data[data["vehicle_booked"] == vehicle_id].copy()
-    else:
-        df = data.copy()
 
-    # Filter for credit transactions only (passenger payments)
-    credit_data = df[df["transaction_type"] == "CREDIT"].copy()
+def prepare_time_series_data_streaming(
+    data_path, vehicle_id=None, resample_freq="D", chunksize=DEFAULT_CHUNKSIZE
+):
+    """
+    Prepare time series data from a transactions file too large to load at once.
 
-    # Set the datetime as index
-    credit_data.set_index("created_at", inplace=True)
+    The file is read in chunks of `chunksize` rows into running per-vehicle
+    daily/hourly sums, which are then resampled to `resample_freq`. Rows of
+    other vehicles are dropped from each chunk as it is read.
 
-    # Resample and sum the amounts for each period
-    earnings = credit_data.resample(resample_freq)["amount"].sum().fillna(0)
+    Parameters:
+    - data_path: Path to the CSV file with transaction data
+    - vehicle_id: Optional vehicle ID to filter by
+    - resample_freq: Frequency to resample the data ('D' for daily, 'H' for hourly, etc.)
+    - chunksize: Number of raw rows read per chunk
+
+    Returns:
+    - Resampled DataFrame with date as index and aggregate earnings
+    """
+    aggregates, _ = stream_aggregates(data_path, chunksize, vehicle_id=vehicle_id)
+    return aggregates.series(vehicle_id, resample_freq)
+
+
+def prepare_prophet_time_series_data(data, vehicle_id=None, resample_freq="D"):
+    """
+    Prepare data for time series analysis by resampling and aggregating by date.
+
+    Parameters:
+    - data: DataFrame containing the transaction data, a TransactionStore or
+      EarningsAggregates
+    - vehicle_id: Optional vehicle ID to filter by
+    - resample_freq: Frequency to resample the data ('D' for daily, 'H' for hourly, etc.)
+
+    Returns:
+    - Resampled DataFrame with date as index and aggregate earnings
+    """
+    earnings = _credit_earnings(data, vehicle_id, resample_freq)
 
     # Convert to DataFrame for easier manipulation
     earnings_df = earnings.reset_index()
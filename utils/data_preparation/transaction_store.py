@@ -0,0 +1,170 @@
+import threading
+import numpy as np
+import pandas as pd
+from config import DATA_CSV_FILE
+from utils.data_preparation.load_transactions import load_transactions, source_version
+
+
+class TransactionStore:
+    """
+    In-memory transaction table sorted by (vehicle_booked, created_at).
+
+    Each vehicle occupies one contiguous row range, so a vehicle's
+    transactions are returned as a positional slice of the shared frame
+    instead of a boolean-mask scan plus copy.
+    """
+
+    def __init__(self, data, version=None):
+        """
+        Parameters:
+        - data: DataFrame with typed transaction columns (see `load_transactions`)
+        - version: Optional content hash of the source the data was loaded from
+        """
+        self.version = version
+        if data["vehicle_booked"].dtype != "category":
+            data = data.astype({"vehicle_booked": "category"})
+
+        self.data = data.sort_values(
+            ["vehicle_booked", "created_at"], kind="stable", ignore_index=True
+        )
+
+        # Row offsets of each vehicle's contiguous block
+        codes = self.data["vehicle_booked"].cat.codes.to_numpy()
+        boundaries = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.r_[0, boundaries]
+        stops = np.r_[boundaries, len(codes)]
+        categories = self.data["vehicle_booked"].cat.categories
+        self.offsets = {
+            categories[codes[start]]: (int(start), int(stop))
+            for start, stop in zip(starts, stops)
+            if stop > start and codes[start] >= 0  # missing vehicle IDs sort last
+        }
+
+        # Sorted 'created_at' index over the whole table for date range lookups
+        self._created_at = self.data["created_at"].to_numpy()
+        self._time_order = np.argsort(self._created_at, kind="stable")
+        self._sorted_created_at = self._created_at[self._time_order]
+
+    @property
+    def vehicles(self):
+        """List of vehicle IDs present in the store."""
+        return list(self.offsets)
+
+    def vehicle(self, vehicle_id):
+        """
+        Return a vehicle's transactions as a slice of the shared frame.
+
+        Parameters:
+        - vehicle_id: ID of the vehicle
+
+        Returns:
+        - DataFrame slice ordered by 'created_at' (empty if the vehicle is unknown)
+        """
+        start, stop = self.offsets.get(vehicle_id, (0, 0))
+        return self.data.iloc[start:stop]
+
+    def slice_by_range(self, start, end, vehicle_id=None):
+        """
+        Return the transactions with start <= created_at < end.
+
+        Uses binary search over the sorted 'created_at' index, so the cost is
+        O(log N + k) for k matching rows.
+
+        Parameters:
+        - start: Inclusive lower bound (anything accepted by `pd.Timestamp`)
+        - end: Exclusive upper bound
+        - vehicle_id: Optional vehicle ID to filter by
+
+        Returns:
+        - DataFrame of matching transactions ordered by 'created_at'
+        """
+        bounds = np.array(
+            [pd.Timestamp(start), pd.Timestamp(end)], dtype=self._created_at.dtype
+        )
+
+        if vehicle_id:
+            # Each vehicle block is already sorted by created_at
+            block_start, block_stop = self.offsets.get(vehicle_id, (0, 0))
+            lo, hi = self._created_at[block_start:block_stop].searchsorted(bounds)
+            return self.data.iloc[block_start + lo : block_start + hi]
+
+        lo, hi = self._sorted_created_at.searchsorted(bounds)
+        return self.data.take(self._time_order[lo:hi])
+
+    def slice_by_date(self, date, vehicle_id=None):
+        """
+        Return the transactions of a single day.
+
+        Parameters:
+        - date: The day to select (YYYY-MM-DD or date-like)
+        - vehicle_id: Optional vehicle ID to filter by
+
+        Returns:
+        - DataFrame of the day's transactions ordered by 'created_at'
+        """
+        day_start = pd.Timestamp(date).normalize()
+        return self.slice_by_range(
+            day_start, day_start + pd.Timedelta(days=1), vehicle_id
+        )
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_transaction_store(data_path=DATA_CSV_FILE, reload=False, version=None):
+    """
+    Return the process-wide transaction store for `data_path`.
+
+    The store is built on first use and shared by every caller in the
+    process (API routers, EDA scripts and the prediction pipeline).
+
+    Parameters:
+    - data_path: Path to the CSV file with transaction data
+    - reload: Rebuild the store from the (possibly updated) source
+    - version: Content hash the store should be loaded from (see
+      `source_version`); a store of another version is rebuilt
+
+    Returns:
+    - TransactionStore; its `version` is the one actually loaded, which can
+      be newer than `version` if the file changed again meanwhile
+    """
+    with _stores_lock:
+        store = _stores.get(data_path)
+        if reload or store is None or (version and store.version != version):
+            data = load_transactions(data_path)
+            _stores[data_path] = TransactionStore(data, source_version(data_path))
+        return _stores[data_path]
+
+
+def current_transaction_store(data_path=DATA_CSV_FILE):
+    """
+    Return the transaction store of the current contents of `data_path`.
+
+    Long-running processes use this instead of `get_transaction_store`, so a
+    changed transactions file is picked up; it costs a `stat` while the file
+    is unchanged.
+
+    Parameters:
+    - data_path: Path to the CSV file with transaction data
+
+    Returns:
+    - TransactionStore
+    """
+    return get_transaction_store(data_path, version=source_version(data_path))
+
+
+def slice_by_date(date, vehicle_id=None, data_path=DATA_CSV_FILE):
+    """
+    Return one day's transactions from the process-wide store, reloaded if
+    the transactions file changed.
+
+    Parameters:
+    - date: The day to select (YYYY-MM-DD or date-like)
+    - vehicle_id: Optional vehicle ID to filter by
+    - data_path: Path to the CSV file with transaction data
+
+    Returns:
+    - DataFrame of the day's transactions ordered by 'created_at'
+    """
+    return current_transaction_store(data_path).slice_by_date(date, vehicle_id)
@@ -0,0 +1,388 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from utils.eda.rollups import UNKNOWN_VEHICLE, get_rollup
+from utils.data_preparation.incremental_aggregates import pivot_by_vehicle
+
+# Unique colors for each vehicle, plus "Unknown" and "Failed Transactions"
+VEHICLE_COLORS = {
+    "SM191": "blue",
+    "SM192": "green",
+    "SM944": "yellow",
+    "SM055": "purple",
+    "SM024": "orange",
+    "Unknown": "gray",
+    "Failed": "red",
+}
+
+# Axis title and title adjective of each granularity
+PERIOD_TITLES = {
+    "daily": ("Date", "Daily"),
+    "weekly": ("Week", "Weekly"),
+    "monthly": ("Month", "Monthly"),
+}
+
+
+def _save_figure(fig, json_path):
+    """Saves a Plotly figure as JSON, creating the parent directory."""
+    os.makedirs(os.path.dirname(json_path), exist_ok=True)
+    # Write then rename, so readers never see a partial file; writers in other
+    # threads and processes use their own temporary file
+    tmp_path = f"{json_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(fig.to_json())
+    os.replace(tmp_path, json_path)
+    print(f"Saved JSON Plotly data: {json_path}")
+
+
+def _period_labels(periods, granularity):
+    """Formats period start timestamps as EDA axis labels."""
+    periods = pd.DatetimeIndex(periods)
+    if granularity == "weekly":
+        ends = periods + pd.Timedelta(days=6)
+        return [f"{s:%Y-%m-%d}/{e:%Y-%m-%d}" for s, e in zip(periods, ends)]
+    if granularity == "monthly":
+        return [f"{p:%Y-%m}" for p in periods]
+    return [f"{p:%Y-%m-%d}" for p in periods]
+
+
+def _vehicle_pivot(table, vehicle_id=None):
+    """
+    Pivot a rollup table into periods x vehicles earnings.
+
+    Parameters:
+    - table: Rollup table
+    - vehicle_id: Optional vehicle ID to keep
+
+    Returns:
+    - DataFrame with period starts as index and vehicles as columns
+    """
+    table = table[~table["vehicle_booked"].isin(["Failed", UNKNOWN_VEHICLE])]
+    if vehicle_id:
+        table = table[table["vehicle_booked"] == vehicle_id]
+
+    return pivot_by_vehicle(table)
+
+
+def _period_slice(table, start, end):
+    """Returns the rows of a rollup table with start <= period < end."""
+    # Rollup tables are sorted by period, so binary search the bounds
+    lo, hi = table["period"].searchsorted([start, end])
+    return table.iloc[lo:hi]
+
+
+"""
+Day Analysis
+"""
+
+
+def generate_day_hourly_bundle(date, json_path, vehicle_id=None):
+    """
+    Hourly earnings per vehicle for one day, with unknown and failed transactions.
+
+    Parameters:
+    - date: The specific date to visualize (YYYY-MM-DD)
+    - json_path: Path of the JSON file to write
+    - vehicle_id: Optional vehicle ID to filter by
+    """
+    day_start = pd.Timestamp(date).normalize()
+    day_data = _period_slice(
+        get_rollup("hourly"), day_start, day_start + pd.Timedelta(days=1)
+    )
+    if vehicle_id:
+        day_data = day_data[day_data["vehicle_booked"] == vehicle_id]
+
+    all_hours = np.arange(24)
+    hours = day_data["period"].dt.hour
+    is_unknown = day_data["vehicle_booked"] == UNKNOWN_VEHICLE
+
+    pivot_data = (
+        day_data[~is_unknown]
+        .assign(hours=hours)
+        .pivot_table(
+            index="vehicle_booked",
+            columns="hours",
+            values="amount",
+            aggfunc="sum",
+            fill_value=0,
+            observed=True,
+        )
+        .reindex(columns=all_hours, fill_value=0)
+    )
+    pivot_data.index = pivot_data.index.astype(object)
+
+    unknown = day_data[is_unknown]
+    if not unknown.empty:
+        pivot_data.loc[UNKNOWN_VEHICLE] = (
+            unknown.groupby(hours[unknown.index])["amount"]
+            .sum()
+            .reindex(all_hours, fill_value=0)
+        )
+
+    failed = day_data[day_data["payment_status"] == 3]
+    if not failed.empty:
+        pivot_data.loc["Failed"] = (
+            failed.groupby(hours[failed.index])["amount"]
+            .sum()
+            .reindex(all_hours, fill_value=0)
+        )
+
+    fig = go.Figure()
+    bar_width = 0.8 / max(len(pivot_data.index), 1)
+    for i, vehicle in enumerate(pivot_data.index):
+        offset = -0.4 + i * bar_width  # Ensuring bars are side by side
+        fig.add_trace(
+            go.Bar(
+                x=all_hours + offset,
+                y=pivot_data.loc[vehicle].to_numpy(),
+                name=vehicle,
+                marker=dict(color=VEHICLE_COLORS.get(vehicle, "gray")),
+                width=bar_width,
+            )
+        )
+
+    # Add dotted vertical lines to separate hours
+    y_max = pivot_data.to_numpy().max() if pivot_data.size else 0
+    for hour in all_hours:
+        fig.add_trace(
+            go.Scatter(
+                x=[hour, hour],
+                y=[0, y_max],
+                mode="lines",
+                line=dict(dash="dot", color="gray"),
+                showlegend=False,
+            )
+        )
+
+    fig.update_layout(
+        title=f"Total Transaction Amount per Hour of the Day ({date})",
+        xaxis=dict(
+            title="Time of Day",
+            tickmode="array",
+            tickvals=all_hours,
+            ticktext=[f"{h}:00" for h in all_hours],
+            showgrid=False,
+        ),
+        yaxis=dict(title="Total Transaction Amount (KSH)"),
+        barmode="group",
+        legend_title="Vehicle",
+    )
+    _save_figure(fig, json_path)
+
+
+def generate_day_week_bundle(date, json_path, vehicle_id=None):
+    """
+    Daily revenue per vehicle for the week (Monday to Sunday) containing `date`.
+
+    Parameters:
+    - date: Any date within the week to visualize (YYYY-MM-DD)
+    - json_path: Path of the JSON file to write
+    - vehicle_id: Optional vehicle ID to filter by
+    """
+    specific_date = pd.Timestamp(date).normalize()
+    start_of_week = specific_date - pd.Timedelta(days=specific_date.weekday())
+    end_of_week = start_of_week + pd.Timedelta(days=6)
+
+    weekly_data = _period_slice(
+        get_rollup("daily"), start_of_week, end_of_week + pd.Timedelta(days=1)
+    )
+    pivot_data = _vehicle_pivot(weekly_data, vehicle_id)
+    date_labels = [d.strftime("%a\n%m/%d") for d in pivot_data.index]
+
+    fig = go.Figure()
+    for vehicle in pivot_data.columns:
+        fig.add_trace(
+            go.Bar(
+                x=date_labels,
+                y=pivot_data[vehicle].to_numpy(),
+                name=vehicle,
+                text=pivot_data[vehicle].astype(int).to_numpy(),
+                textposition="outside",
+            )
+        )
+
+    fig.update_layout(
+        title=f"Weekly Revenue by Vehicle ({start_of_week.date()} to {end_of_week.date()})",
+        xaxis_title="Day of the Week",
+        yaxis_title="Total Revenue Amount (KSH)",
+        barmode="group",
+    )
+    _save_figure(fig, json_path)
+
+
+def generate_daily_fare_trends(json_path, vehicle_id=None):
+    """
+    Daily fare trend lines for all vehicles or a single vehicle.
+
+    Parameters:
+    - json_path: Path of the JSON file to write
+    - vehicle_id: Optional vehicle ID to filter by
+    """
+    generate_fares_line("daily", json_path, vehicle_id)
+
+
+"""
+Week / Month Analysis
+"""
+
+
+def generate_fares_line(granularity, json_path, vehicle_id=None):
+    """
+    Fare trend lines per vehicle.
+
+    Parameters:
+    - granularity: 'daily', 'weekly' or 'monthly'
+    - json_path: Path of the JSON file to write
+    - vehicle_id: Optional vehicle ID to filter by
+    """
+    pivot_data = _vehicle_pivot(get_rollup(granularity), vehicle_id)
+    labels = _period_labels(pivot_data.index, granularity)
+    axis_title, adjective = PERIOD_TITLES[granularity]
+
+    fig = go.Figure()
+    for vehicle in pivot_data.columns:
+        fig.add_trace(
+            go.Scatter(
+                x=labels,
+                y=pivot_data[vehicle].to_numpy(),
+                mode="lines+markers",
+                name=vehicle,
+                line=dict(color=VEHICLE_COLORS.get(vehicle, "gray"), width=2),
+            )
+        )
+
+    title = f"{adjective} Fare Trends"
+    fig.update_layout(
+        title=f"{title} - {vehicle_id}" if vehicle_id else f"{title} by Vehicle",
+        xaxis_title=axis_title,
+        yaxis_title="Total Earnings (KSH)",
+        xaxis_tickangle=-45,
+        legend_title="Vehicle",
+        template="plotly_white",
+    )
+    _save_figure(fig, json_path)
+
+
+def generate_fares_bar(granularity, json_path, vehicle_id=None):
+    """
+    Grouped fare bars per vehicle.
+
+    Parameters:
+    - granularity: 'daily', 'weekly' or 'monthly'
+    - json_path: Path of the JSON file to write
+    - vehicle_id: Optional vehicle ID to filter by
+    """
+    pivot_data = _vehicle_pivot(get_rollup(granularity), vehicle_id)
+    labels = _period_labels(pivot_data.index, granularity)
+    axis_title, adjective = PERIOD_TITLES[granularity]
+    title = f"{adjective} Earnings by Vehicle"
+
+    fig = go.Figure()
+    for vehicle in pivot_data.columns:
+        fig.add_trace(
+            go.Bar(
+                x=labels,
+                y=pivot_data[vehicle].to_numpy(),
+                name=vehicle,
+                marker=dict(color=VEHICLE_COLORS.get(vehicle, "gray")),
+            )
+        )
+
+    fig.update_layout(
+        title=f"{title} - {vehicle_id}" if vehicle_id else title,
+        xaxis_title=axis_title,
+        yaxis_title="Total Earnings (KSH)",
+        barmode="group",
+        xaxis_tickangle=-45,
+        legend_title="Vehicles",
+        template="plotly_white",
+    )
+    _save_figure(fig, json_path)
+
+
+def generate_total_revenue(granularity, json_path, bar=False):
+    """
+    Total earnings of all vehicles per period.
+
+    Parameters:
+    - granularity: 'daily', 'weekly' or 'monthly'
+    - json_path: Path of the JSON file to write
+    - bar: Draw bars instead of a line
+    """
+    totals = get_rollup(granularity).groupby("period")["amount"].sum().sort_index()
+    labels = _period_labels(totals.index, granularity)
+    axis_title, adjective = PERIOD_TITLES[granularity]
+    text = [f"{int(x):,}" for x in totals.to_numpy()]
+
+    fig = go.Figure()
+    if bar:
+        fig.add_trace(
+            go.Bar(
+                x=labels,
+                y=totals.to_numpy(),
+                marker=dict(color="skyblue"),
+                text=text,
+                textposition="auto",
+                name="Total Earnings",
+            )
+        )
+    else:
+        fig.add_trace(
+            go.Scatter(
+                x=labels,
+                y=totals.to_numpy(),
+                mode="lines+markers+text",
+                text=text,
+                textposition="top center",
+                name="Total Earnings",
+            )
+        )
+
+    fig.update_layout(
+        title=f"{adjective} Total Earnings - All Vehicles",
+        xaxis_title=axis_title,
+        yaxis_title="Total Earnings (KSH)",
+        xaxis_tickangle=-45,
+        template="plotly_white",
+    )
+    _save_figure(fig, json_path)
+
+
+def generate_breakdown_by_vehicle(granularity, json_path):
+    """
+    Stacked earnings per vehicle with the period total annotated.
+
+    Parameters:
+    - granularity: 'daily', 'weekly' or 'monthly'
+    - json_path: Path of the JSON file to write
+    """
+    pivot_data = _vehicle_pivot(get_rollup(granularity))
+    labels = _period_labels(pivot_data.index, granularity)
+    axis_title, adjective = PERIOD_TITLES[granularity]
+    totals = pivot_data.sum(axis=1).to_numpy()
+
+    fig = go.Figure()
+    for vehicle in pivot_data.columns:
+        fig.add_trace(go.Bar(x=labels, y=pivot_data[vehicle].to_numpy(), name=vehicle))
+
+    fig.add_trace(
+        go.Scatter(
+            x=labels,
+            y=totals,
+            mode="text",
+            text=[f"Total: {int(total):,}" for total in totals],
+            textposition="top center",
+            showlegend=False,
+        )
+    )
+
+    fig.update_layout(
+        title=f"{adjective} Earnings Breakdown by Vehicle",
+        xaxis_title=axis_title,
+        yaxis_title="Total Earnings (KSH)",
+        barmode="stack",
+        legend_title="Vehicles",
+    )
+    _save_figure(fig, json_path)
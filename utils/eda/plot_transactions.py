@@ -0,0 +1,73 @@
+import pandas as pd
+import plotly.graph_objects as go
+from config import DATA_CSV_FILE
+from utils.data_preparation.transaction_store import slice_by_date
+from utils.eda.plot_rollups import VEHICLE_COLORS, _save_figure
+
+# Minute-of-day ticks, one per hour
+MINUTE_TICKS = list(range(0, 1441, 60))
+MINUTE_LABELS = [f"{h:02d}:00" for h in range(0, 25)]
+
+
+def generate_day_scatter_bundle(
+    date, json_path, vehicle_id=None, data_path=DATA_CSV_FILE
+):
+    """
+    Scatter plot of every credit transaction on one day, failed ones in red.
+
+    The day is looked up through the store's sorted 'created_at' index, so only
+    that day's rows are touched.
+
+    Parameters:
+    - date: The specific date to visualize (YYYY-MM-DD)
+    - json_path: Path of the JSON file to write
+    - vehicle_id: Optional vehicle ID to filter by
+    - data_path: Path to the CSV file with transaction data
+    """
+    day_data = slice_by_date(date, vehicle_id, data_path)
+    # Earnings only, debits are not plotted
+    day_data = day_data[day_data["transaction_type"] == "CREDIT"]
+    if day_data.empty:
+        raise ValueError(f"No transactions found for {date}.")
+
+    created_at = day_data["created_at"].dt
+    minutes = (created_at.hour * 60 + created_at.minute).to_numpy()
+    amounts = day_data["amount"].to_numpy()
+    vehicles = day_data["vehicle_booked"].astype(object).to_numpy()
+    failed = (day_data["payment_status"] == 3).to_numpy()
+
+    fig = go.Figure()
+
+    # Plot each vehicle separately for clear legend
+    for vehicle in pd.unique(vehicles[pd.notna(vehicles)]):
+        mask = vehicles == vehicle
+        fig.add_trace(
+            go.Scatter(
+                x=minutes[mask],
+                y=amounts[mask],
+                mode="markers",
+                marker=dict(color=VEHICLE_COLORS.get(vehicle, "gray"), opacity=0.6),
+                name=vehicle,
+            )
+        )
+
+    # Add failed transactions separately
+    if failed.any():
+        fig.add_trace(
+            go.Scatter(
+                x=minutes[failed],
+                y=amounts[failed],
+                mode="markers",
+                marker=dict(color=VEHICLE_COLORS["Failed"], opacity=0.6),
+                name="Failed Transactions",
+            )
+        )
+
+    title = f"Scatter Plot of Transactions ({date})"
+    fig.update_layout(
+        title=f"{title} - {vehicle_id}" if vehicle_id else title,
+        xaxis=dict(title="Time of Day", tickvals=MINUTE_TICKS, ticktext=MINUTE_LABELS),
+        yaxis_title="Transaction Amount (Ksh)",
+        template="plotly_white",
+    )
+    _save_figure(fig, json_path)
@@ -0,0 +1,229 @@
+import os
+import json
+import threading
+import pandas as pd
+from config import DATA_CSV_FILE, ROLLUPS_DIR
+from utils.data_preparation.load_transactions import (
+    coerce_transaction_types,
+    source_version,
+)
+from utils.data_preparation.incremental_aggregates import DEFAULT_CHUNKSIZE
+from utils.data_preparation.transaction_store import get_transaction_store
+
+# Rollup granularities, finest first
+GRANULARITIES = ["hourly", "daily", "weekly", "monthly"]
+
+KEY_COLUMNS = ["period", "vehicle_booked", "payment_status"]
+
+# Rollup label of the transactions without a vehicle
+UNKNOWN_VEHICLE = "Unknown"
+
+# Bumped when the rollup tables change, so persisted ones are rebuilt
+ROLLUP_VERSION = 2
+
+# Transaction files larger than this are streamed in chunks to build the
+# rollups instead of being loaded whole
+STREAMING_MIN_BYTES = 256 * 2**20
+
+
+def _period_start(periods, granularity):
+    """Maps hourly period starts onto the start of their `granularity` period."""
+    if granularity == "daily":
+        return periods.dt.floor("D")
+    if granularity == "weekly":
+        return periods.dt.to_period("W").dt.start_time
+    if granularity == "monthly":
+        return periods.dt.to_period("M").dt.start_time
+    return periods
+
+
+def _hourly_rollup(data):
+    """Sums and counts CREDIT transactions by (hour, vehicle, payment status)."""
+    credit_data = data[data["transaction_type"] == "CREDIT"]
+
+    # Keep transactions without a vehicle as 'Unknown'
+    vehicles = credit_data["vehicle_booked"].astype("category")
+    if UNKNOWN_VEHICLE not in vehicles.cat.categories:
+        vehicles = vehicles.cat.add_categories(UNKNOWN_VEHICLE)
+    vehicles = vehicles.fillna(UNKNOWN_VEHICLE)
+
+    return (
+        credit_data.groupby(
+            [
+                credit_data["created_at"].dt.floor("h").rename("period"),
+                vehicles,
+                "payment_status",
+            ],
+            observed=True,
+            dropna=False,
+        )["amount"]
+        .agg(amount="sum", count="size")
+        .reset_index()
+    )
+
+
+def _merge_hourly(*tables):
+    """Combines hourly rollups, summing the rows that share a key."""
+    tables = [table.astype({"vehicle_booked": object}) for table in tables]
+    merged = (
+        pd.concat(tables, ignore_index=True)
+        .groupby(KEY_COLUMNS, dropna=False)[["amount", "count"]]
+        .sum()
+        .reset_index()
+    )
+    return merged.astype({"vehicle_booked": "category"})
+
+
+def _regroup(hourly):
+    """Builds every granularity from the hourly rollup."""
+    rollups = {"hourly": hourly}
+    for granularity in GRANULARITIES[1:]:
+        rollups[granularity] = (
+            hourly.assign(period=_period_start(hourly["period"], granularity))
+            .groupby(KEY_COLUMNS, observed=True, dropna=False)[["amount", "count"]]
+            .sum()
+            .reset_index()
+        )
+    return rollups
+
+
+def build_rollups(data):
+    """
+    Build hour/day/week/month rollups of CREDIT transactions in one pass.
+
+    Raw rows are scanned once into (hour, vehicle, payment status) sums and
+    counts; coarser granularities are regrouped from that hourly table.
+
+    Parameters:
+    - data: DataFrame with typed transaction columns
+
+    Returns:
+    - Dictionary mapping granularity to a table with 'period', 'vehicle_booked',
+      'payment_status', 'amount' and 'count' columns
+    """
+    return _regroup(_hourly_rollup(data))
+
+
+def stream_rollups(data_path=DATA_CSV_FILE, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Build the rollups from a transactions file too large to load at once.
+
+    At most one chunk of raw rows is held at a time; the hourly partials of
+    the chunks are compacted as they outgrow a chunk.
+
+    Parameters:
+    - data_path: Path to the CSV file with transaction data
+    - chunksize: Number of raw rows read per chunk
+
+    Returns:
+    - Dictionary mapping granularity to its rollup table, as `build_rollups`
+    """
+    partials = []
+    for chunk in pd.read_csv(data_path, chunksize=chunksize):
+        partials.append(_hourly_rollup(coerce_transaction_types(chunk)))
+        if sum(len(partial) for partial in partials) > chunksize:
+            partials = [_merge_hourly(*partials)]
+        del chunk
+
+    return _regroup(_merge_hourly(*partials))
+
+
+def _meta_path(rollups_dir):
+    """Returns the path of the rollups metadata file."""
+    return os.path.join(rollups_dir, "rollups.meta.json")
+
+
+def _read_persisted(rollups_dir, version):
+    """Reads persisted rollups if they were built from `version` of the source."""
+    try:
+        with open(_meta_path(rollups_dir), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get("sha256") != version or meta.get("format") != ROLLUP_VERSION:
+        return None
+
+    try:
+        return {
+            granularity: pd.read_parquet(
+                os.path.join(rollups_dir, f"{granularity}.parquet")
+            )
+            for granularity in GRANULARITIES
+        }
+    except (ImportError, OSError):
+        return None
+
+
+def _write_persisted(rollups_dir, rollups, version):
+    """Persists the rollup tables and the source version they were built from."""
+    try:
+        os.makedirs(rollups_dir, exist_ok=True)
+        # Writers in other processes use their own temporary files
+        suffix = f"{os.getpid()}.{threading.get_ident()}.tmp"
+        for granularity, table in rollups.items():
+            path = os.path.join(rollups_dir, f"{granularity}.parquet")
+            table.to_parquet(f"{path}.{suffix}", index=False)
+            os.replace(f"{path}.{suffix}", path)
+
+        path = _meta_path(rollups_dir)
+        with open(f"{path}.{suffix}", "w", encoding="utf-8") as f:
+            json.dump({"sha256": version, "format": ROLLUP_VERSION}, f)
+        os.replace(f"{path}.{suffix}", path)
+        print(f"Rollups rebuilt at: {rollups_dir}")
+    except (ImportError, OSError) as e:
+        print(f"Error writing rollups: {e}")
+
+
+_rollups = {}
+_rollups_lock = threading.Lock()
+
+
+def get_rollups(data_path=DATA_CSV_FILE, rollups_dir=ROLLUPS_DIR):
+    """
+    Return the materialized rollups for the current version of `data_path`.
+
+    Rollups are kept in memory and on disk; they are rebuilt only when the
+    transactions file changes. Files above STREAMING_MIN_BYTES are rebuilt
+    in chunks, without loading them into the transaction store.
+
+    Parameters:
+    - data_path: Path to the CSV file with transaction data
+    - rollups_dir: Directory holding the persisted rollup tables
+
+    Returns:
+    - Dictionary mapping granularity to its rollup table
+    """
+    version = source_version(data_path)
+
+    with _rollups_lock:
+        cached = _rollups.get(data_path)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        rollups = _read_persisted(rollups_dir, version)
+        if rollups is None:
+            if os.path.getsize(data_path) > STREAMING_MIN_BYTES:
+                rollups = stream_rollups(data_path)
+            else:
+                store = get_transaction_store(data_path, version=version)
+                rollups = build_rollups(store.data)
+            _write_persisted(rollups_dir, rollups, version)
+
+        _rollups[data_path] = (version, rollups)
+        return rollups
+
+
+def get_rollup(granularity, data_path=DATA_CSV_FILE):
+    """
+    Return one rollup table.
+
+    Parameters:
+    - granularity: 'hourly', 'daily', 'weekly' or 'monthly'
+    - data_path: Path to the CSV file with transaction data
+
+    Returns:
+    - Rollup table with 'period', 'vehicle_booked', 'payment_status', 'amount'
+      and 'count' columns
+    """
+    return get_rollups(data_path)[granularity]
@@ -1,27 +1,88 @@
-def ensemble_forecast(forecasts):
+import numpy as np
+import pandas as pd
+
+# Ensemble members, in the order their columns appear
+ENSEMBLE_MODELS = ["ml", "arima", "sarima", "prophet"]
+# Members averaged when no weights have been learned; Prophet only joins the
+# ensemble under a backtested weight
+BASELINE_MODELS = ["ml", "arima", "sarima"]
+
+# Model types a forecast can be requested for, in any case
+MODEL_TYPE_PATTERN = rf"(?i)^({'|'.join(ENSEMBLE_MODELS)})$"
+
+
+def _member_forecast(model, forecast):
+    """Returns a member forecast as 'date' and '<model>_forecast' columns."""
+    if "ds" in forecast:
+        # Prophet-style frame
+        forecast = forecast.rename(columns={"ds": "date", "yhat": "earnings"})
+    member_df = forecast[["date", "earnings"]].rename(
+        columns={"earnings": f"{model}_forecast"}
+    )
+    return member_df.astype({f"{model}_forecast": "float32"})
+
+
+def ensemble_forecast(forecasts, weights=None, last_date=None):
     """
-    Create an ensemble forecast with proper type handling.
+    Create a weighted ensemble forecast with proper type handling.
+
+    Members whose forecast is missing (failed, timed out or pruned) are left
+    out, and on dates a member doesn't cover the weights of the others are
+    renormalized. Every member is trimmed to the dates after the last
+    observation, which drops the history rows of Prophet forecasts.
+
+    Parameters:
+    - forecasts: Dictionary mapping member to its forecast DataFrame
+    - weights: Optional dictionary mapping member to weight (see
+      `ensemble_weights.load_ensemble_weights`); when omitted the baseline
+      members (ml, arima, sarima) are averaged at equal weight
+    - last_date: Last observed date; when omitted it is the day before the
+      first forecast date of the members without history rows
+
+    Returns:
+    - DataFrame with 'date', one '<model>_forecast' column per member and
+      'ensemble_forecast'
     """
-    # Initialize with ML forecast
-    ensemble_df = forecasts["ml"][["date", "earnings"]].copy()
-    ensemble_df = ensemble_df.rename(columns={"earnings": "ml_forecast"})
-    ensemble_df = ensemble_df.astype({"ml_forecast": "float32"})
-
-    # Merge other forecasts with fillna
-    models = ["arima", "sarima"]  # "prophet"
-    for model in models:
-        if forecasts[model] is not None:
-            temp_df = forecasts[model][["date", "earnings"]].copy()
-            temp_df = temp_df.rename(columns={"earnings": f"{model}_forecast"})
-            temp_df = temp_df.astype({f"{model}_forecast": "float32"})
-
-            ensemble_df = ensemble_df.merge(temp_df, on="date", how="left").fillna(
-                {f"{model}_forecast": 0.0}
-            )
-
-    # Calculate ensemble average
-    forecast_cols = [col for col in ensemble_df if "forecast" in col]
-    ensemble_df["ensemble_forecast"] = ensemble_df[forecast_cols].mean(axis=1)
+    candidates = BASELINE_MODELS if weights is None else ENSEMBLE_MODELS
+    available = [
+        model
+        for model in candidates
+        if forecasts.get(model) is not None
+        and (weights is None or weights.get(model, 0) > 0)
+    ]
+    if not available:
+        raise ValueError("No model produced a forecast")
+
+    members = {model: _member_forecast(model, forecasts[model]) for model in available}
+
+    if last_date is None:
+        horizon_members = [model for model in available if model != "prophet"]
+        if not horizon_members:
+            raise ValueError("last_date is required to trim the Prophet history")
+        first_dates = [members[model]["date"].min() for model in horizon_members]
+        last_date = min(first_dates) - pd.Timedelta(days=1)
+
+    # Keep the forecast dates only, then align the members on them
+    last_date = pd.Timestamp(last_date)
+    for model in available:
+        member_df = members[model]
+        members[model] = member_df[member_df["date"] > last_date]
+    dates = pd.concat([members[model]["date"] for model in available])
+    ensemble_df = pd.DataFrame({"date": np.sort(dates.unique())})
+    for model in available:
+        ensemble_df = ensemble_df.merge(members[model], on="date", how="left")
+
+    # Weighted average of the members available on each date
+    forecast_cols = [f"{model}_forecast" for model in available]
+    values = ensemble_df[forecast_cols].to_numpy(dtype=float)
+    member_weights = np.array(
+        [1.0 if weights is None else weights[model] for model in available]
+    )
+    present = ~np.isnan(values)
+    total = (present * member_weights).sum(axis=1)
+    weighted = (np.nan_to_num(values) * member_weights).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ensemble_df["ensemble_forecast"] = np.where(total > 0, weighted / total, np.nan)
 
     return ensemble_df.astype("float32", errors="ignore")
 
@@ -0,0 +1,151 @@
+import os
+import threading
+import json
+import pandas as pd
+from utils.model.backtest import BACKTEST_MODELS, backtest
+from utils.model.registry import vehicle_path
+from config import DATA_CSV_FILE, MODELS_DIR
+
+# Most recent backtest origins the weights are computed from
+RECENT_FOLDS = 4
+
+# Members whose normalized weight falls below this are pruned: they get no
+# weight and are not trained until the weights are recomputed
+PRUNE_THRESHOLD = 0.1
+
+
+def _weights_path(vehicle_id, models_dir):
+    """Returns the path of a vehicle's ensemble weights."""
+    return vehicle_path(models_dir, vehicle_id, "ensemble_weights.json")
+
+
+def compute_weights(predictions, recent_folds=RECENT_FOLDS, threshold=PRUNE_THRESHOLD):
+    """
+    Inverse-error ensemble weights of one vehicle from its backtest.
+
+    Parameters:
+    - predictions: Backtest predictions of the vehicle, with 'model',
+      'origin', 'actual' and 'forecast' columns
+    - recent_folds: Number of most recent origins to score the members on
+    - threshold: Weight below which a member is pruned
+
+    Returns:
+    - Dictionary mapping every backtested member to its weight; the weights
+      of the kept members sum to 1, pruned members have weight 0
+    """
+    origins = sorted(predictions["origin"].unique())[-recent_folds:]
+    recent = predictions[predictions["origin"].isin(origins)]
+    errors = (recent["actual"] - recent["forecast"]).abs().groupby(recent["model"])
+    mae = errors.mean().dropna()
+    if mae.empty:
+        return {}
+
+    # A perfect member takes all the weight
+    if (mae == 0).any():
+        weights = (mae == 0).astype(float)
+    else:
+        weights = 1 / mae
+    weights = weights / weights.sum()
+
+    # The best member is always kept
+    weights[weights < min(threshold, weights.max())] = 0.0
+    weights = weights / weights.sum()
+    return {model: round(float(weight), 6) for model, weight in weights.items()}
+
+
+def save_ensemble_weights(vehicle_id, weights, models_dir=MODELS_DIR):
+    """
+    Persist the ensemble weights of a vehicle.
+
+    Parameters:
+    - vehicle_id: ID of the vehicle
+    - weights: Dictionary mapping member to weight
+    - models_dir: Directory holding the weights
+    """
+    path = _weights_path(vehicle_id, models_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Writers in other threads and processes use their own temporary file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"weights": weights, "computed_at": pd.Timestamp.now().isoformat()}, f
+        )
+    os.replace(tmp_path, path)
+
+
+def load_ensemble_weights(vehicle_id, models_dir=MODELS_DIR):
+    """
+    Read the persisted ensemble weights of a vehicle.
+
+    Parameters:
+    - vehicle_id: ID of the vehicle
+    - models_dir: Directory holding the weights
+
+    Returns:
+    - Dictionary mapping member to weight, or None if none were computed
+    """
+    try:
+        with open(_weights_path(vehicle_id, models_dir), "r", encoding="utf-8") as f:
+            return json.load(f)["weights"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def active_members(weights):
+    """
+    Members worth training under the given weights.
+
+    Parameters:
+    - weights: Dictionary mapping member to weight, or None
+
+    Returns:
+    - List of members with a non-zero weight, or None (all members) when
+      there are no weights
+    """
+    if not weights:
+        return None
+    return [model for model in BACKTEST_MODELS if weights.get(model, 0) > 0]
+
+
+def update_ensemble_weights(
+    vehicle_ids=None,
+    data_path=DATA_CSV_FILE,
+    threshold=PRUNE_THRESHOLD,
+    prophet_engine="prophet",
+    n_jobs=-1,
+    models_dir=MODELS_DIR,
+):
+    """
+    Backtest every member and persist each vehicle's ensemble weights.
+
+    All members are backtested, so a pruned member is weighted again as soon
+    as it becomes competitive.
+
+    Parameters:
+    - vehicle_ids: Vehicles to weigh; all vehicles in the data when omitted
+    - data_path: Path to the CSV file with transaction data
+    - threshold: Weight below which a member is pruned
+    - prophet_engine: "prophet", or "fourier" for the Fourier regression
+    - n_jobs: Number of parallel jobs (-1 uses all cores)
+    - models_dir: Directory holding the weights
+
+    Returns:
+    - Dictionary mapping vehicle ID to its weights
+    """
+    _, predictions = backtest(
+        vehicle_ids, data_path, n_jobs=n_jobs, prophet_engine=prophet_engine
+    )
+
+    weights_by_vehicle = {}
+    for vehicle_id, vehicle_predictions in predictions.groupby("vehicle_id"):
+        weights = compute_weights(vehicle_predictions, threshold=threshold)
+        if weights:
+            save_ensemble_weights(vehicle_id, weights, models_dir)
+            weights_by_vehicle[vehicle_id] = weights
+            print(f"Ensemble weights of {vehicle_id}: {weights}")
+    return weights_by_vehicle
+
+
+if __name__ == "__main__":
+    """main function"""
+    update_ensemble_weights()
@@ -1,6 +1,7 @@
 import os
 from config import FILES_DIR
 import matplotlib.pyplot as plt
+from utils.rendering.png_render import is_headless
 
 
 def plot_ensemble_forecast(historical_data, ensemble_df, vehicle_id):
@@ -12,6 +13,10 @@ def plot_ensemble_forecast(historical_data, ensemble_df, vehicle_id):
     - ensemble_df: DataFrame with ensemble forecast
     - vehicle_id: Vehicle ID for title
     """
+    # The plot is only saved as PNG
+    if is_headless():
+        return
+
     plt.figure(figsize=(14, 8))
 
     # Plot historical data
@@ -45,5 +50,6 @@ def plot_ensemble_forecast(historical_data, ensemble_df, vehicle_id):
 
     plt.tight_layout()
     f1 = os.path.join(FILES_DIR, f"{vehicle_id}/forecast/ensemble_forecast.png")
+    os.makedirs(os.path.dirname(f1), exist_ok=True)
     plt.savefig(f1, dpi=300)
     plt.show()
@@ -1,68 +1,270 @@
-import pandas as pd
+import warnings
 import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.multioutput import MultiOutputRegressor
+from utils.data_preparation.prepare_features import (
+    DATE_FEATURES,
+    FEATURE_COLUMNS,
+    LAGS,
+    date_features,
+)
 
 
-def forecast_future_ml(model, features_df, forecast_days=30):
+class LagState:
     """
-    Forecast future values using the trained ML model.
+    Lag and rolling-window state of one or more earnings series.
+
+    The last LAGS values of every series are kept in a preallocated ring
+    buffer; the 3- and 7-day sums (and the 7-day sum of squares) are updated
+    incrementally as values are pushed, so each step is O(1) per series.
+    """
+
+    def __init__(self, history):
+        """
+        Parameters:
+        - history: Array of shape (n_series, LAGS) with the last LAGS known
+          values of each series, oldest first
+        """
+        history = np.asarray(history, dtype=np.float64).reshape(-1, LAGS)
+        self.buffer = history.copy()
+        self.head = 0  # slot of the oldest value, overwritten by the next push
+        self.sum_3 = history[:, -3:].sum(axis=1)
+        self.sum_7 = history.sum(axis=1)
+        self.sumsq_7 = np.square(history).sum(axis=1)
+
+    @classmethod
+    def from_features(cls, *features_dfs):
+        """Initializes one series per `prepare_features` output from its last row."""
+        history = []
+        for features_df in features_dfs:
+            last = features_df.iloc[-1]
+            lags = [last[f"lag_{lag}"] for lag in range(LAGS - 1, 0, -1)]
+            history.append(lags + [last["earnings"]])
+        return cls(history)
+
+    def features(self):
+        """
+        Lag and rolling features for the next step.
+
+        Returns:
+        - Array of shape (n_series, LAGS + 3): lag_1..lag_7, rolling_mean_3,
+          rolling_mean_7 and rolling_std_7 over the last known values
+        """
+        lags = self.buffer[:, (self.head - np.arange(1, LAGS + 1)) % LAGS]
+        mean_7 = self.sum_7 / LAGS
+        var_7 = (self.sumsq_7 - LAGS * np.square(mean_7)) / (LAGS - 1)
+        return np.column_stack(
+            [lags, self.sum_3 / 3, mean_7, np.sqrt(np.maximum(var_7, 0))]
+        )
+
+    def push(self, values):
+        """
+        Appends the next value of every series.
+
+        Parameters:
+        - values: Array of shape (n_series,)
+        """
+        values = np.asarray(values, dtype=np.float64)
+        oldest_3 = self.buffer[:, (self.head - 3) % LAGS]
+        oldest_7 = self.buffer[:, self.head]
+
+        self.sum_3 += values - oldest_3
+        self.sum_7 += values - oldest_7
+        self.sumsq_7 += np.square(values) - np.square(oldest_7)
+
+        self.buffer[:, self.head] = values
+        self.head = (self.head + 1) % LAGS
+
+
+def _predictor(model):
+    """
+    Returns a predict function taking a float32 feature matrix.
+
+    Forests are averaged over their fitted trees directly, skipping the per-call
+    input validation and thread pool setup of `model.predict` that dominate single-row calls.
+    Direct multi-horizon models predict one column per horizon day.
     """
-    # Initialize with proper types
-    last_date = features_df["date"].max()
+    if isinstance(model, MultiOutputRegressor):
+        predictors = [_predictor(estimator) for estimator in model.estimators_]
+
+        def predict(X):
+            return np.column_stack([predict_day(X) for predict_day in predictors])
+
+        return predict
+
+    if isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+
+        def predict(X):
+            total = trees[0].predict(X).ravel()
+            for tree in trees[1:]:
+                total += tree.predict(X).ravel()
+            return total / len(trees)
+
+        return predict
+
+    def predict(X):
+        with warnings.catch_warnings():
+            # Fitted on a DataFrame, predicting on the equivalent array
+            warnings.filterwarnings(
+                "ignore", message="X does not have valid feature names"
+            )
+            return model.predict(X)
+
+    return predict
+
+
+def _feature_order(model):
+    """Returns the FEATURE_COLUMNS positions of the model's input columns."""
+    names = getattr(model, "feature_names_in_", FEATURE_COLUMNS)
+    return [FEATURE_COLUMNS.index(name) for name in names]
+
+
+def _forecast_recursive(models, features_dfs, forecast_days):
+    """
+    Recursively forecast several series together.
+
+    At each step the lag/rolling features of all series are updated from a
+    shared LagState and every distinct model predicts its series in one call.
+
+    Parameters:
+    - models: One model per series (the same model object may be repeated)
+    - features_dfs: One `prepare_features` output per series
+    - forecast_days: Number of days to forecast
+
+    Returns:
+    - List of forecast date ranges, one per series
+    - Array of shape (n_series, forecast_days) with the forecasted earnings
+    """
+    future_dates = [
+        pd.date_range(
+            features_df["date"].max() + pd.Timedelta(days=1), periods=forecast_days
+        )
+        for features_df in features_dfs
+    ]
+    state = LagState.from_features(*features_dfs)
+
+    # Series sharing an estimator are predicted together
+    groups = {}
+    for row, model in enumerate(models):
+        groups.setdefault(id(model), (model, []))[1].append(row)
+    groups = [
+        (_predictor(model), _feature_order(model), np.array(rows))
+        for model, rows in groups.values()
+    ]
+
+    # Preallocated model input, date features filled for the whole horizon
+    n_series, n_date = len(features_dfs), len(DATE_FEATURES)
+    X = np.empty((n_series, forecast_days, len(FEATURE_COLUMNS)), dtype=np.float32)
+    for row, dates in enumerate(future_dates):
+        X[row, :, :n_date] = date_features(dates).to_numpy()
+
+    earnings = np.empty((n_series, forecast_days), dtype=np.float32)
+    for i in range(forecast_days):
+        X[:, i, n_date:] = state.features()
+        for predict, order, rows in groups:
+            earnings[rows, i] = predict(X[rows, i][:, order])
+        state.push(earnings[:, i])
+
+    return future_dates, earnings
+
+
+def forecast_direct_ml(model, features_df, forecast_days=30):
+    """
+    Forecast the whole horizon at once with a direct multi-horizon model.
+
+    Parameters:
+    - model: Model trained with `train_ml_model(..., strategy="direct")`
+    - features_df: DataFrame with features, as returned by `prepare_features`
+    - forecast_days: Number of days to forecast
+
+    Returns:
+    - DataFrame with 'date' and forecasted 'earnings'
+    """
+    horizon = len(model.estimators_)
+    if forecast_days > horizon:
+        raise ValueError(
+            f"Direct model was trained for {horizon} days, cannot forecast {forecast_days}"
+        )
+
+    # Every horizon is predicted from the last known row, in one call
+    last_row = features_df[FEATURE_COLUMNS].iloc[-1:].to_numpy(np.float32)
+    earnings = _predictor(model)(last_row[:, _feature_order(model)])[0]
+    earnings = earnings[:forecast_days]
+
     future_dates = pd.date_range(
-        last_date + pd.Timedelta(days=1), periods=forecast_days
+        features_df["date"].max() + pd.Timedelta(days=1), periods=forecast_days
     )
-
-    future_df = pd.DataFrame(
-        {"date": future_dates, "earnings": 0.0}  # Initialize as float
-    ).astype({"earnings": "float32"})
-
-    # Feature engineering with explicit types
-    dt = future_df["date"].dt
-    future_df = future_df.assign(
-        dayofweek=dt.dayofweek.astype(np.int8),
-        month=dt.month.astype(np.int8),
-        day=dt.day.astype(np.int8),
-        dayofyear=dt.dayofyear.astype(np.int16),
-        week=dt.isocalendar().week.astype(np.int8),
-        is_weekend=(dt.dayofweek >= 5).astype(np.int8),
+    return pd.DataFrame({"date": future_dates, "earnings": earnings}).astype(
+        {"date": "datetime64[ns]", "earnings": "float32"}
     )
 
-    # Initialize lag features with proper dtype
-    for lag in range(1, 8):
-        future_df[f"lag_{lag}"] = np.nan
-        future_df[f"lag_{lag}"] = future_df[f"lag_{lag}"].astype("float32")
 
-    # Feature calculations
-    for i in range(forecast_days):
-        # Lag feature handling
-        if i < 7:
-            lag_data = features_df["earnings"].iloc[-7:].values.astype("float32")
-            for lag in range(1, 8):
-                if lag <= i:
-                    future_df.loc[i, f"lag_{lag}"] = future_df["earnings"].iloc[i - lag]
-                else:
-                    future_df.loc[i, f"lag_{lag}"] = lag_data[-(lag - i)]
-        else:
-            for lag in range(1, 8):
-                future_df.loc[i, f"lag_{lag}"] = future_df["earnings"].iloc[i - lag]
-
-        # Rolling features with float32
-        window_3 = future_df["earnings"].iloc[max(0, i - 3) : i + 1]
-        future_df.loc[i, "rolling_mean_3"] = window_3.mean().astype("float32")
-
-        window_7 = future_df["earnings"].iloc[max(0, i - 7) : i + 1]
-        future_df.loc[i, "rolling_mean_7"] = window_7.mean().astype("float32")
-        future_df.loc[i, "rolling_std_7"] = window_7.std().astype("float32")
-
-        # Prediction
-        X_future = future_df.iloc[i : i + 1].drop(["date", "earnings"], axis=1)
-        future_df.loc[i, "earnings"] = float(model.predict(X_future)[0])
-
-    return future_df[["date", "earnings"]].astype(
+def forecast_future_ml(model, features_df, forecast_days=30):
+    """
+    Forecast future values using the trained ML model.
+
+    Each day is predicted from the previous predictions (recursive strategy).
+    Lag and rolling features are computed over the last known values, held
+    in a LagState, and calendar features for the whole horizon are computed
+    up front. Direct multi-horizon models are forwarded to `forecast_direct_ml`.
+
+    Parameters:
+    - model: Trained model
+    - features_df: DataFrame with features, as returned by `prepare_features`
+    - forecast_days: Number of days to forecast
+
+    Returns:
+    - DataFrame with 'date' and forecasted 'earnings'
+    """
+    if isinstance(model, MultiOutputRegressor):
+        return forecast_direct_ml(model, features_df, forecast_days)
+
+    future_dates, earnings = _forecast_recursive([model], [features_df], forecast_days)
+
+    return pd.DataFrame({"date": future_dates[0], "earnings": earnings[0]}).astype(
         {"date": "datetime64[ns]", "earnings": "float32"}
     )
 
 
+def forecast_fleet_ml(models, features_by_vehicle, forecast_days=30):
+    """
+    Forecast several vehicles at once, advancing all of them step by step.
+
+    Each horizon step builds one (vehicles x features) matrix and calls
+    predict once per distinct model, instead of one `forecast_future_ml`
+    loop per vehicle.
+
+    Parameters:
+    - models: A global model shared by all vehicles (see `train_global_ml_model`),
+      or a dictionary mapping vehicle ID to its model
+    - features_by_vehicle: Dictionary mapping vehicle ID to its `prepare_features`
+      output
+    - forecast_days: Number of days to forecast
+
+    Returns:
+    - Dictionary mapping vehicle ID to a DataFrame with 'date' and forecasted
+      'earnings', as returned by `forecast_future_ml`
+    """
+    vehicles = list(features_by_vehicle)
+    if not isinstance(models, dict):
+        models = dict.fromkeys(vehicles, models)
+
+    future_dates, earnings = _forecast_recursive(
+        [models[vehicle] for vehicle in vehicles],
+        [features_by_vehicle[vehicle] for vehicle in vehicles],
+        forecast_days,
+    )
+
+    return {
+        vehicle: pd.DataFrame(
+            {"date": future_dates[row], "earnings": earnings[row]}
+        ).astype({"date": "datetime64[ns]", "earnings": "float32"})
+        for row, vehicle in enumerate(vehicles)
+    }
+
+
 # def forecast_future_ml(model, features_df, forecast_days=30):
 #     """
 #     Forecast future values using the trained ML model.
@@ -5,60 +5,75 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import plotly.graph_objects as go
 from config import FILES_DIR, JSON_DIR
+from utils.rendering.figure_json import (
+    date_strings,
+    figure_payload,
+    line_trace,
+    values_array,
+    write_json,
+)
+from utils.rendering.png_render import is_headless
+from utils.model.registry import vehicle_path
+
+
+def forecast_json_path(vehicle_id, model_type, forecast_days=None):
+    """
+    Path of a model's forecast figure.
+
+    Parameters:
+    - vehicle_id: ID of the vehicle
+    - model_type: Type of model used (ML, ARIMA etc.)
+    - forecast_days: Forecast horizon, part of the file name when given
+
+    Returns:
+    - Path of the JSON file
+    """
+    suffix = f"_{forecast_days}d" if forecast_days else ""
+    return vehicle_path(
+        JSON_DIR, vehicle_id, "forecast", f"{model_type.lower()}_forecast{suffix}.json"
+    )
 
 
-def plot_forecast(historical_data, forecast_df, vehicle_id, model_type):
+def plot_forecast(
+    historical_data, forecast_df, vehicle_id, model_type, forecast_days=None
+):
     """
     Plot the historical data and forecast.
     Save as a JSON file for Angular consumption.
-    """
-    # Ensure save directory exists
-    forecast_json_save_dir = os.path.join("json", vehicle_id, "forecast")
-    os.makedirs(forecast_json_save_dir, exist_ok=True)
-
-    # Create Plotly figure
-    fig = go.Figure()
 
-    # Convert historical data to Python-native types
-    historical_x = historical_data.index.tolist()
-    historical_y = [
-        float(y) if isinstance(y, (np.float64, np.float32, int)) else y
-        for y in historical_data.values.tolist()
-    ]
+    Parameters:
+    - historical_data: Time series data
+    - forecast_df: DataFrame with 'date' and 'earnings' columns
+    - vehicle_id: Vehicle ID for the title
+    - model_type: Type of model used (ML, ARIMA etc.)
+    - forecast_days: Forecast horizon, part of the file name when given
 
-    # Add historical data
-    fig.add_trace(
-        go.Scatter(
-            x=historical_x,
-            y=historical_y,
-            mode="lines",
-            name="Historical Data",
-            line=dict(color="blue"),
+    Returns:
+    - Plotly figure dictionary
+    """
+    # Build the figure straight from the arrays, no go.Figure validation
+    traces = [
+        line_trace(
+            historical_data.index,
+            historical_data.to_numpy(),
+            "Historical Data",
+            color="blue",
         )
-    )
+    ]
 
-    # Add forecast data (with type handling)
+    # Add forecast data
     if isinstance(forecast_df, pd.DataFrame) and "date" in forecast_df.columns:
-        forecast_x = [
-            str(date) if isinstance(date, np.datetime64) else date
-            for date in forecast_df["date"].tolist()
-        ]
-        forecast_y = [
-            float(y) if isinstance(y, (np.float64, np.float32, int)) else y
-            for y in forecast_df["earnings"].tolist()
-        ]
-        fig.add_trace(
-            go.Scatter(
-                x=forecast_x,
-                y=forecast_y,
-                mode="lines",
-                name="Forecast",
-                line=dict(color="red"),
+        traces.append(
+            line_trace(
+                forecast_df["date"],
+                forecast_df["earnings"].to_numpy(),
+                "Forecast",
+                color="red",
             )
         )
 
-    # Update layout
-    fig.update_layout(
+    fig_json = figure_payload(
+        traces,
         title=f"{model_type} Forecast for Vehicle {vehicle_id}",
         xaxis_title="Date",
         yaxis_title="Earnings (KSH)",
@@ -67,26 +82,17 @@ def plot_forecast(historical_data, forecast_df, vehicle_id, model_type):
         margin=dict(l=50, r=50, b=100, t=100),
     )
 
-    # Convert dates to ISO strings before saving
-    def convert_dates(obj):
-        if isinstance(obj, pd.Timestamp):
-            return obj.isoformat()
-        return obj
-
-    fig_json = json.loads(json.dumps(fig.to_plotly_json(), default=convert_dates))
-
     # Save JSON file
-    json_file_path = os.path.join(
-        forecast_json_save_dir, f"{model_type.lower()}_forecast.json"
-    )
-    with open(json_file_path, "w") as json_file:
-        json.dump(fig_json, json_file, indent=4)
+    json_file_path = forecast_json_path(vehicle_id, model_type, forecast_days)
+    write_json(json_file_path, fig_json)
 
     print(f"Plotly JSON saved at: {json_file_path}")
     return fig_json
 
 
-def plot_prophet_forecast(historical_data, model, forecast, vehicle_id, model_type):
+def plot_prophet_forecast(
+    historical_data, model, forecast, vehicle_id, model_type, forecast_days=None
+):
     """
     Plot the Prophet forecast.
     Generate a Plotly figure for the historical data and forecast.
@@ -96,46 +102,48 @@ def plot_prophet_forecast(historical_data, model, forecast, vehicle_id, model_ty
     - forecast: Forecast DataFrame from Prophet
     - vehicle_id: Vehicle ID for the title
     - model_type: Type of model used (Prophet etc.)
+    - forecast_days: Forecast horizon, part of the file name when given
     """
-    # Define directory paths
-    analysis_save_dir = os.path.join(FILES_DIR, vehicle_id, "analysis")
-    forecast_save_dir = os.path.join(FILES_DIR, vehicle_id, "forecast")
-
-    # Ensure directories exist
-    os.makedirs(analysis_save_dir, exist_ok=True)
-    os.makedirs(forecast_save_dir, exist_ok=True)
-
-    """
-    saving PNG forecast
-    """
-
-    plt.figure(figsize=(16, 12))
-
-    # Plot the forecast
-    model.plot(forecast)
-    plt.title(f"{model_type} Forecast for Vehicle {vehicle_id}")
-    plt.xlabel("Date")
-    plt.ylabel("Earnings (KSH)")
-    plt.legend()
-    plt.grid(True)
-
-    plt.tight_layout()
-    plt.savefig(
-        os.path.join(forecast_save_dir, f"{model_type.lower()}_forecast.png"), dpi=300
-    )
-    plt.show()
-
-    # Plot the components of the forecast
-    model.plot_components(forecast)
-    plt.title(f"{model_type} Forecast Components for Vehicle {vehicle_id}")
-    plt.xlabel("Date")
-    plt.ylabel("Earnings (KSH)")
-    plt.legend()
-    plt.grid(True)
-
-    plt.tight_layout()
-    plt.savefig(os.path.join(analysis_save_dir, "time_series_components.png"), dpi=300)
-    plt.show()
+    if not is_headless():
+        # Define directory paths
+        analysis_save_dir = os.path.join(FILES_DIR, vehicle_id, "analysis")
+        forecast_save_dir = os.path.join(FILES_DIR, vehicle_id, "forecast")
+
+        # Ensure directories exist
+        os.makedirs(analysis_save_dir, exist_ok=True)
+        os.makedirs(forecast_save_dir, exist_ok=True)
+
+        # Saving PNG forecast
+        plt.figure(figsize=(16, 12))
+
+        # Plot the forecast
+        model.plot(forecast)
+        plt.title(f"{model_type} Forecast for Vehicle {vehicle_id}")
+        plt.xlabel("Date")
+        plt.ylabel("Earnings (KSH)")
+        plt.legend()
+        plt.grid(True)
+
+        plt.tight_layout()
+        plt.savefig(
+            os.path.join(forecast_save_dir, f"{model_type.lower()}_forecast.png"),
+            dpi=300,
+        )
+        plt.show()
+
+        # Plot the components of the forecast
+        model.plot_components(forecast)
+        plt.title(f"{model_type} Forecast Components for Vehicle {vehicle_id}")
+        plt.xlabel("Date")
+        plt.ylabel("Earnings (KSH)")
+        plt.legend()
+        plt.grid(True)
+
+        plt.tight_layout()
+        plt.savefig(
+            os.path.join(analysis_save_dir, "time_series_components.png"), dpi=300
+        )
+        plt.show()
 
     """
     Saving JSON forecast
@@ -149,17 +157,19 @@ def plot_prophet_forecast(historical_data, model, forecast, vehicle_id, model_ty
     os.makedirs(analysis_json_save_dir, exist_ok=True)
     os.makedirs(forecast_json_save_dir, exist_ok=True)
 
-    # Convert forecast DataFrame to JSON
-    forecast_json = forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].to_json(
-        orient="records", date_format="iso"
-    )
+    # Convert forecast DataFrame to records, column-wise
+    columns = {
+        "ds": date_strings(forecast["ds"]),
+        **{
+            column: values_array(forecast[column]).tolist()
+            for column in ["yhat", "yhat_lower", "yhat_upper"]
+        },
+    }
+    records = [dict(zip(columns, row)) for row in zip(*columns.values())]
 
     # Save JSON to file
-    json_file_path = os.path.join(
-        forecast_json_save_dir, f"{model_type.lower()}_forecast.json"
-    )
-    with open(json_file_path, "w") as json_file:
-        json.dump(json.loads(forecast_json), json_file, indent=4)
+    json_file_path = forecast_json_path(vehicle_id, model_type, forecast_days)
+    forecast_json = write_json(json_file_path, records).decode("utf-8")
 
     print(f"Forecast saved to {json_file_path}")
 
@@ -204,7 +214,7 @@ def create_dummy_plotly_json():
         return obj
 
     # Save directory setup
-    save_dir = os.path.join("json", "dummy")
+    save_dir = os.path.join(JSON_DIR, "dummy")
     os.makedirs(save_dir, exist_ok=True)
 
     # Convert and save JSON
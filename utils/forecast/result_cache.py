@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from config import FORECASTS_DIR
+
+# Entries kept in memory and on disk, and how long they stay valid there
+MEMORY_SIZE = 256
+MEMORY_TTL = 15 * 60
+DISK_SIZE = 4096
+DISK_TTL = 24 * 60 * 60
+
+RESULTS_DIR = os.path.join(FORECASTS_DIR, "results")
+
+
+class ResultCache:
+    """
+    Two-tier cache of JSON-serializable results.
+
+    An in-memory LRU with a TTL sits in front of a directory of JSON files
+    with a longer TTL; disk hits are promoted to memory. Keys are tuples of
+    strings and numbers.
+
+    The disk tier is bounded too: expired files are deleted when read, and
+    every put removes the files past their TTL and the least recently used
+    ones beyond `disk_maxsize` (results of superseded data versions age out
+    this way).
+    """
+
+    def __init__(
+        self,
+        maxsize=MEMORY_SIZE,
+        ttl=MEMORY_TTL,
+        disk_ttl=DISK_TTL,
+        cache_dir=RESULTS_DIR,
+        disk_maxsize=DISK_SIZE,
+    ):
+        """
+        Parameters:
+        - maxsize: Number of entries kept in memory
+        - ttl: Seconds an entry stays valid in memory
+        - disk_ttl: Seconds an entry stays valid on disk (None disables the
+          disk tier)
+        - cache_dir: Directory of the disk tier
+        - disk_maxsize: Number of entries kept on disk
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_ttl = disk_ttl
+        self.cache_dir = cache_dir
+        self.disk_maxsize = disk_maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(
+            [
+                "memory_hits",
+                "disk_hits",
+                "misses",
+                "evictions",
+                "expirations",
+                "disk_evictions",
+            ],
+            0,
+        )
+
+    def _path(self, key):
+        """Returns the disk tier file of a key."""
+        digest = hashlib.sha256(json.dumps(list(key)).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _remember(self, key, value):
+        """Stores an entry in memory, evicting the least recently used."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._counts["evictions"] += 1
+
+    def get(self, key):
+        """
+        Look up a result.
+
+        Parameters:
+        - key: Tuple identifying the result
+
+        Returns:
+        - The cached value, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if time.monotonic() < expires:
+                    self._entries.move_to_end(key)
+                    self._counts["memory_hits"] += 1
+                    return value
+                del self._entries[key]
+                self._counts["expirations"] += 1
+
+        if self.disk_ttl is not None:
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                if time.time() - stored["stored_at"] < self.disk_ttl:
+                    os.utime(path)  # most recently used, see `_prune_disk`
+                    self._remember(key, stored["value"])
+                    self._count("disk_hits")
+                    return stored["value"]
+                self._count("expirations")
+                os.remove(path)
+            except (OSError, ValueError, KeyError):
+                pass
+
+        self._count("misses")
+        return None
+
+    def put(self, key, value):
+        """
+        Store a result in memory and on disk.
+
+        Parameters:
+        - key: Tuple identifying the result
+        - value: JSON-serializable value
+        """
+        self._remember(key, value)
+        if self.disk_ttl is None:
+            return
+
+        path = self._path(key)
+        # Writers in other threads and processes use their own temporary file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"key": list(key), "stored_at": time.time(), "value": value}, f
+                )
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error caching result {key}: {e}")
+            return
+        self._prune_disk()
+
+    def _prune_disk(self):
+        """Deletes expired disk entries and the least recently used over the cap."""
+        try:
+            names = [
+                name for name in os.listdir(self.cache_dir) if name.endswith(".json")
+            ]
+        except OSError:
+            return
+
+        entries = []
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:  # removed by another writer meanwhile
+                pass
+        entries.sort(reverse=True)
+
+        # Files are written (and touched on hits) at or after their 'stored_at'
+        oldest = time.time() - self.disk_ttl
+        for i, (mtime, path) in enumerate(entries):
+            if i < self.disk_maxsize and mtime >= oldest:
+                continue
+            try:
+                os.remove(path)
+                self._count("disk_evictions")
+            except OSError:
+                pass
+
+    def stats(self):
+        """
+        Hit and miss counters of the cache.
+
+        Returns:
+        - Dictionary with 'memory_hits', 'disk_hits', 'misses', 'evictions',
+          'expirations', 'disk_evictions', 'hit_rate' and 'size' (entries in
+          memory)
+        """
+        with self._lock:
+            counts = dict(self._counts)
+            size = len(self._entries)
+        lookups = counts["memory_hits"] + counts["disk_hits"] + counts["misses"]
+        hits = counts["memory_hits"] + counts["disk_hits"]
+        return {
+            **counts,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "size": size,
+        }
@@ -0,0 +1,305 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import JOBS_DB
+
+# Jobs running at the same time, and jobs allowed to wait for a worker
+MAX_WORKERS = 2
+MAX_QUEUED = 32
+
+# Finished jobs are deleted after this many seconds, or once there are more
+# than MAX_FINISHED of them (oldest first)
+RETENTION_SECONDS = 24 * 60 * 60
+MAX_FINISHED = 500
+
+# Job states; the last three are final
+JOB_STATES = ["queued", "running", "succeeded", "failed", "cancelled"]
+FINAL_STATES = JOB_STATES[2:]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    subscribers INTEGER NOT NULL DEFAULT 1,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while MAX_QUEUED jobs are waiting."""
+
+
+class JobQueue:
+    """
+    SQLite-backed job queue served by a bounded pool of worker processes.
+
+    Jobs are dictionaries of parameters handed to `handler`, whose return
+    value (JSON-serializable) becomes the job result. Submitting the
+    parameters of a queued or running job subscribes to it instead of queueing
+    another; the job is cancelled once all its subscribers cancelled it.
+    Handlers run in worker
+    processes, so training never holds the GIL or the global matplotlib state
+    of the serving process; `handler` must be a module-level function. Job
+    records survive a restart; jobs that were waiting or running are queued
+    again.
+    """
+
+    def __init__(
+        self,
+        handler,
+        db_path=JOBS_DB,
+        workers=MAX_WORKERS,
+        max_queued=MAX_QUEUED,
+        retention_seconds=RETENTION_SECONDS,
+        max_finished=MAX_FINISHED,
+    ):
+        """
+        Parameters:
+        - handler: Module-level function taking the job parameters as keyword
+          arguments
+        - db_path: SQLite database file
+        - workers: Number of jobs running at the same time
+        - max_queued: Number of jobs allowed to wait for a worker
+        - retention_seconds: Age after which finished jobs are deleted
+        - max_finished: Number of finished jobs kept
+        """
+        self.handler = handler
+        self.db_path = db_path
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self.max_finished = max_finished
+        # One thread per worker process tracks its job in the database
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="job-worker"
+        )
+        self.workers = workers
+        self._processes = ProcessPoolExecutor(max_workers=workers)
+        self._processes_lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "subscribers" not in columns:  # database of an older version
+                conn.execute(
+                    "ALTER TABLE jobs ADD COLUMN subscribers INTEGER NOT NULL DEFAULT 1"
+                )
+            # Jobs interrupted by a restart start over
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL "
+                "WHERE status = 'running'"
+            )
+            pending = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at"
+            ).fetchall()
+        for (job_id,) in pending:
+            self._executor.submit(self._run, job_id)
+
+    @contextmanager
+    def _connect(self):
+        """Opens a connection for one transaction; each thread uses its own."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def submit(self, **params):
+        """
+        Queue a job, or subscribe to an identical one that is queued or running.
+
+        Parameters:
+        - params: JSON-serializable keyword arguments of the handler
+
+        Returns:
+        - The job ID
+
+        Raises:
+        - QueueFullError: If MAX_QUEUED jobs are already waiting
+        """
+        job_id = uuid.uuid4().hex
+        params_json = json.dumps(params, sort_keys=True)
+        with self._submit_lock:
+            self.purge()
+            with self._connect() as conn:
+                # Identical jobs share one run
+                pending = conn.execute(
+                    "SELECT id FROM jobs WHERE params = ? AND cancel_requested = 0 "
+                    "AND status IN ('queued', 'running') ORDER BY created_at LIMIT 1",
+                    (params_json,),
+                ).fetchone()
+                if pending:
+                    conn.execute(
+                        "UPDATE jobs SET subscribers = subscribers + 1 WHERE id = ?",
+                        pending,
+                    )
+                    return pending[0]
+
+                (queued,) = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued'"
+                ).fetchone()
+                if queued >= self.max_queued:
+                    raise QueueFullError(f"{queued} jobs are already queued")
+                conn.execute(
+                    "INSERT INTO jobs (id, params, status, created_at) "
+                    "VALUES (?, ?, 'queued', ?)",
+                    (job_id, params_json, time.time()),
+                )
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def _run(self, job_id):
+        """Runs a queued job in a worker thread."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT params FROM jobs WHERE id = ? AND status = 'queued'",
+                (job_id,),
+            ).fetchone()
+            if row is None:  # cancelled or purged while waiting
+                return
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                (time.time(), job_id),
+            )
+
+        processes = self._processes
+        try:
+            job = processes.submit(self.handler, **json.loads(row[0]))
+            result, error = json.dumps(job.result()), None
+        except BrokenProcessPool as e:
+            # A worker died (out of memory, crash); later jobs get a new pool
+            result, error = None, f"{type(e).__name__}: {e}"
+            self._replace_processes(processes)
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {e}"
+
+        with self._connect() as conn:
+            # A job cancelled while running is finished, but its result dropped
+            conn.execute(
+                "UPDATE jobs SET "
+                "status = CASE WHEN cancel_requested THEN 'cancelled' "
+                "WHEN ? IS NULL THEN 'succeeded' ELSE 'failed' END, "
+                "result = CASE WHEN cancel_requested THEN NULL ELSE ? END, "
+                "error = ?, finished_at = ? WHERE id = ?",
+                (error, result, error, time.time(), job_id),
+            )
+
+    def _replace_processes(self, broken):
+        """Replaces a broken worker pool, once for all the jobs that saw it."""
+        with self._processes_lock:
+            if self._processes is broken:
+                print("Job worker pool broken, starting a new one")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._processes = ProcessPoolExecutor(max_workers=self.workers)
+
+    def status(self, job_id):
+        """
+        Describe a job.
+
+        Parameters:
+        - job_id: ID of the job
+
+        Returns:
+        - Dictionary with 'job_id', 'params', 'status', 'cancel_requested',
+          'subscribers', 'error', 'created_at', 'started_at' and
+          'finished_at' (epoch seconds), or None if the job is unknown
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, params, status, cancel_requested, subscribers, error, "
+                "created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+
+        job_id, params, status, cancel_requested, subscribers = row[:5]
+        error, created_at, started_at, finished_at = row[5:]
+        return {
+            "job_id": job_id,
+            "params": json.loads(params),
+            "status": status,
+            "cancel_requested": bool(cancel_requested),
+            "subscribers": subscribers,
+            "error": error,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+        }
+
+    def result(self, job_id):
+        """
+        Return the result of a succeeded job.
+
+        Parameters:
+        - job_id: ID of the job
+
+        Returns:
+        - The handler's return value, or None if the job has no result
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result FROM jobs WHERE id = ? AND status = 'succeeded'",
+                (job_id,),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def cancel(self, job_id):
+        """
+        Unsubscribe from a job, cancelling it once no subscriber is left: a
+        queued job never runs, a running one has its result discarded when it
+        finishes.
+
+        Parameters:
+        - job_id: ID of the job
+
+        Returns:
+        - The job's status after the request, or None if the job is unknown
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET subscribers = subscribers - 1 WHERE id = ? "
+                "AND status IN ('queued', 'running') AND subscribers > 0",
+                (job_id,),
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status = 'queued' AND subscribers = 0",
+                (time.time(), job_id),
+            )
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 "
+                "WHERE id = ? AND status = 'running' AND subscribers = 0",
+                (job_id,),
+            )
+        job = self.status(job_id)
+        return job["status"] if job else None
+
+    def purge(self):
+        """Deletes finished jobs past the retention age or count."""
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+                (*FINAL_STATES, time.time() - self.retention_seconds),
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE id IN (SELECT id FROM jobs "
+                "WHERE status IN (?, ?, ?) ORDER BY finished_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (*FINAL_STATES, self.max_finished),
+            )
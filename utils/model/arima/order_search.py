@@ -0,0 +1,221 @@
+import os
+import threading
+import json
+import itertools
+import warnings
+import multiprocessing
+import numpy as np
+from joblib import Parallel, delayed
+from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+from config import MODELS_DIR
+from utils.model.registry import vehicle_path
+
+# Candidate (p, d, q) orders of the ARIMA search; d is fixed so that the
+# information criteria of all candidates are comparable
+ARIMA_GRID = [(p, 1, q) for p, q in itertools.product(range(6), range(3))]
+
+# Candidate ((p, d, q), (P, D, Q, s)) orders of the weekly SARIMA search; d and
+# the seasonal D are fixed for the same reason
+SARIMA_GRID = [
+    ((p, 1, q), (P, 1, Q, 7)) for p, q, P, Q in itertools.product(*[range(2)] * 4)
+]
+
+# Optimizer iterations of the screening fits
+SCREEN_MAXITER = 10
+
+# Candidates kept after screening and fitted to convergence
+TOP_K = 3
+
+# A cached order is searched again once the series grows by this fraction,
+# or its mean or standard deviation moves by this fraction of the cached one
+RESEARCH_TOLERANCE = 0.25
+
+
+def _default_n_jobs():
+    """
+    All cores in the main process, one inside the stage and fleet pool workers,
+    which already run one process per core.
+    """
+    return -1 if multiprocessing.parent_process() is None else 1
+
+
+def _build_model(ts_data, candidate):
+    """Builds the ARIMA or SARIMA model of a candidate order."""
+    order, seasonal_order = candidate
+    if seasonal_order is None:
+        return ARIMA(ts_data, order=order)
+    return SARIMAX(ts_data, order=order, seasonal_order=seasonal_order)
+
+
+def _score_candidate(ts_data, candidate, criterion, maxiter=None):
+    """
+    Fits one candidate order and returns its information criterion.
+
+    Parameters:
+    - ts_data: Time series data
+    - candidate: Tuple of (order, seasonal_order or None)
+    - criterion: 'aic' or 'bic'
+    - maxiter: Optimizer iterations; None fits to convergence
+
+    Returns:
+    - The criterion value (inf if the fit failed)
+    """
+    try:
+        with warnings.catch_warnings():
+            # Screening fits stop early on purpose
+            warnings.simplefilter("ignore")
+            model = _build_model(ts_data, candidate)
+            if candidate[1] is None:
+                fit_kwargs = {"method_kwargs": {"maxiter": maxiter}} if maxiter else {}
+            else:
+                fit_kwargs = {"maxiter": maxiter or 50, "disp": False}
+            value = getattr(model.fit(**fit_kwargs), criterion)
+        return value if np.isfinite(value) else np.inf
+    except Exception:
+        return np.inf
+
+
+def search_order(ts_data, candidates, criterion="aic", top_k=TOP_K, n_jobs=None):
+    """
+    Select the order with the best information criterion from a candidate grid.
+
+    Every candidate is first screened with a short, low-iteration fit; only
+    the `top_k` best by `criterion` are fitted to convergence. Both rounds
+    run in parallel.
+
+    Parameters:
+    - ts_data: Time series data
+    - candidates: List of (order, seasonal_order or None) tuples
+    - criterion: 'aic' or 'bic'
+    - top_k: Number of candidates fitted to convergence
+    - n_jobs: Number of parallel jobs (-1 uses all cores); by default all
+      cores, or one inside a pool worker process
+
+    Returns:
+    - The best (order, seasonal_order) tuple and its criterion value, or
+      (None, inf) if no candidate could be fitted
+    """
+    if n_jobs is None:
+        n_jobs = _default_n_jobs()
+
+    with Parallel(n_jobs=n_jobs) as parallel:
+        screened = parallel(
+            delayed(_score_candidate)(ts_data, candidate, criterion, SCREEN_MAXITER)
+            for candidate in candidates
+        )
+
+        # Prune to the most promising candidates
+        ranked = sorted(zip(screened, range(len(candidates))))
+        finalists = [candidates[i] for score, i in ranked[:top_k] if np.isfinite(score)]
+        if not finalists:
+            return None, np.inf
+
+        scores = parallel(
+            delayed(_score_candidate)(ts_data, candidate, criterion)
+            for candidate in finalists
+        )
+
+    best = int(np.argmin(scores))
+    return finalists[best], scores[best]
+
+
+def _cache_path(vehicle_id, model_type, models_dir):
+    """Returns the path of a vehicle's cached order."""
+    return vehicle_path(models_dir, vehicle_id, f"{model_type}_order.json")
+
+
+def _series_stats(ts_data):
+    """Summary statistics used to decide whether a series changed materially."""
+    return {
+        "nobs": len(ts_data),
+        "mean": float(np.mean(ts_data)),
+        "std": float(np.std(ts_data)),
+    }
+
+
+def _changed_materially(cached, stats):
+    """Returns True if the series drifted away from the one the order was chosen on."""
+    if stats["nobs"] < cached["nobs"]:
+        return True
+    if stats["nobs"] >= cached["nobs"] * (1 + RESEARCH_TOLERANCE):
+        return True
+    for key in ("mean", "std"):
+        tolerance = RESEARCH_TOLERANCE * max(abs(cached[key]), 1)
+        if abs(stats[key] - cached[key]) > tolerance:
+            return True
+    return False
+
+
+def _as_tuple(value):
+    """Converts nested lists read from JSON back into tuples."""
+    if isinstance(value, list):
+        return tuple(_as_tuple(item) for item in value)
+    return value
+
+
+def select_order(
+    ts_data,
+    vehicle_id=None,
+    model_type="arima",
+    criterion="aic",
+    n_jobs=None,
+    models_dir=MODELS_DIR,
+):
+    """
+    Return the ARIMA or SARIMA order to use for a series, searching if needed.
+
+    The chosen order is cached per vehicle and reused until the series
+    changes materially (see RESEARCH_TOLERANCE).
+
+    Parameters:
+    - ts_data: Time series data
+    - vehicle_id: Optional vehicle ID to cache the chosen order under
+    - model_type: 'arima' or 'sarima'
+    - criterion: 'aic' or 'bic'
+    - n_jobs: Number of parallel jobs, see `search_order`
+    - models_dir: Directory holding the cached orders
+
+    Returns:
+    - For 'arima' the (p, d, q) order, for 'sarima' the (order, seasonal_order)
+      pair; None if no candidate could be fitted
+    """
+    stats = _series_stats(ts_data)
+    path = _cache_path(vehicle_id, model_type, models_dir) if vehicle_id else None
+
+    if model_type == "arima":
+        candidates = [(order, None) for order in ARIMA_GRID]
+        grid = ARIMA_GRID
+    else:
+        candidates = grid = SARIMA_GRID
+
+    if path and os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            order = _as_tuple(cached["order"])
+            changed = _changed_materially(cached, stats)
+            # Orders chosen from an earlier grid are searched again
+            if cached["criterion"] == criterion and not changed and order in grid:
+                return order
+        except (OSError, ValueError, KeyError):
+            pass
+
+    best, score = search_order(ts_data, candidates, criterion, n_jobs=n_jobs)
+    if best is None:
+        return None
+
+    order = best[0] if model_type == "arima" else best
+    print(
+        f"Selected {model_type.upper()} order {order} ({criterion.upper()} {score:.1f})"
+    )
+
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Writers in other threads and processes use their own temporary file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"order": order, "criterion": criterion, **stats}, f)
+        os.replace(tmp_path, path)
+
+    return order
@@ -1,28 +1,100 @@
 from statsmodels.tsa.arima.model import ARIMA
+from utils.model.registry import (
+    load_model,
+    load_previous_model,
+    refit_due,
+    save_model,
+)
+from utils.model.arima.order_search import select_order
 
+# Default ARIMA order and the simpler order tried if it fails
+ARIMA_ORDER = (5, 1, 0)
+FALLBACK_ORDER = (1, 1, 0)
 
-def train_arima_model(ts_data):
+
+def train_arima_model(ts_data, vehicle_id=None, refit=True, order=ARIMA_ORDER):
     """
     Train an ARIMA model for time series forecasting.
 
     Parameters:
     - ts_data: Time series data
+    - vehicle_id: Optional vehicle ID; when given, a model already trained on
+      the same series is loaded from the registry instead of refitted, and a
+      series that extends the registered one is updated incrementally
+    - refit: On an incremental update, re-estimate the parameters starting from
+      the previous fit (True) or only extend the filter with the new days
+      (False, until `registry.refit_due` says the parameters are too stale)
+    - order: The (p, d, q) order, or "auto" to select it by AIC (the choice is
+      cached per vehicle, see `order_search.select_order`)
 
     Returns:
     - model: Trained ARIMA model
     """
+    if order == "auto":
+        order = select_order(ts_data, vehicle_id, "arima") or ARIMA_ORDER
+
+    params = {"order": order, "fallback_order": FALLBACK_ORDER}
+    model_fit, estimated = None, None
+    if vehicle_id:
+        model_fit = load_model(vehicle_id, "arima", params, ts_data)
+        if model_fit is not None:
+            return model_fit
+
+        previous = load_previous_model(vehicle_id, "arima", params, ts_data)
+        if previous is not None:
+            previous_fit, new_data, estimated = previous
+            if refit or refit_due(estimated, len(ts_data)):
+                estimated = None
+            model_fit = _update_arima_model(
+                previous_fit, new_data, ts_data, estimated is None
+            )
+
+    if model_fit is None:
+        model_fit, estimated = _fit_arima_model(ts_data, order), None
+    if vehicle_id and model_fit is not None:
+        save_model(vehicle_id, "arima", params, ts_data, model_fit, estimated=estimated)
+    return model_fit
+
+
+def _fit_arima_model(ts_data, order=ARIMA_ORDER):
+    """Fits an ARIMA model of `order`, falling back to a simpler order."""
     # Simple ARIMA model with default parameters
     try:
-        model = ARIMA(ts_data, order=(5, 1, 0))
+        model = ARIMA(ts_data, order=order)
         model_fit = model.fit()
         return model_fit
     except Exception as e:
         print(f"Error training ARIMA model: {e}")
         try:
             # Try a simpler model if the first one fails
-            model = ARIMA(ts_data, order=(1, 1, 0))
+            model = ARIMA(ts_data, order=FALLBACK_ORDER)
             model_fit = model.fit()
             return model_fit
         except Exception as e:
             print(f"Error training simpler ARIMA model: {e}")
             return None
+
+
+def _update_arima_model(previous, new_data, ts_data, refit):
+    """
+    Updates a previous ARIMA fit with the days appended to its series.
+
+    Parameters:
+    - previous: ARIMA results fitted on the start of `ts_data`
+    - new_data: The days of `ts_data` after the previous training series
+    - ts_data: Full time series data
+    - refit: Re-estimate warm-started parameters instead of only filtering
+
+    Returns:
+    - model: Updated ARIMA model, or None if the update failed
+    """
+    try:
+        if not refit:
+            return previous.append(new_data, refit=False)
+
+        # Same order as the previous fit (the fallback one if it was used)
+        model = ARIMA(ts_data, order=previous.model.order)
+        return model.fit(start_params=previous.params)
+    except Exception as e:
+        print(f"Error updating ARIMA model, refitting: {e}")
+        return None
@@ -0,0 +1,256 @@
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from utils.data_preparation.transaction_store import get_transaction_store
+from utils.data_preparation.prepare_time_series import prepare_time_series_data
+from utils.data_preparation.prepare_features import prepare_features
+from utils.model.evaluate_model import forecast_metrics
+from utils.model.ml.train import train_ml_model
+from utils.model.arima.train import train_arima_model
+from utils.model.sarima.train import train_sarima_model
+from utils.forecast.create_forecast_ml import forecast_future_ml
+
+from config import DATA_CSV_FILE
+
+# Ensemble members evaluated by default
+BACKTEST_MODELS = ["ml", "arima", "sarima", "prophet"]
+
+# Days forecast from every origin
+BACKTEST_HORIZON = 7
+
+# Days of history before the first origin, and days between origins
+INITIAL_DAYS = 56
+STEP_DAYS = 7
+
+# Columns of the metrics table returned by `backtest`
+METRIC_COLUMNS = ["MAE", "RMSE", "R2", "MAPE"]
+
+
+def rolling_origins(
+    dates, horizon=BACKTEST_HORIZON, initial=INITIAL_DAYS, step=STEP_DAYS
+):
+    """
+    Forecast origins of a rolling-origin backtest.
+
+    Parameters:
+    - dates: Sorted dates of the series
+    - horizon: Number of days forecast from every origin
+    - initial: Number of days of history before the first origin
+    - step: Number of days between origins
+
+    Returns:
+    - List of origin dates; each fold trains on the days before its origin
+      and is scored on the `horizon` days from it
+    """
+    dates = pd.DatetimeIndex(dates)
+    return list(dates[initial : len(dates) - horizon + 1 : step])
+
+
+def _fold_id(vehicle_id, origin):
+    """Registry ID under which the models of a fold are cached."""
+    return f"{vehicle_id}/backtest/{origin:%Y-%m-%d}"
+
+
+def _forecast_member(
+    model_type, train_ts, train_features, horizon, registry_id, prophet_engine
+):
+    """
+    Trains one ensemble member on a fold and forecasts its horizon.
+
+    Parameters:
+    - model_type: 'ml', 'arima', 'sarima' or 'prophet'
+    - train_ts: Time series before the origin
+    - train_features: ML features of the days before the origin
+    - horizon: Number of days to forecast
+    - registry_id: Registry ID to cache the fitted model under, or None
+    - prophet_engine: "prophet", or "fourier" for the Fourier regression
+
+    Returns:
+    - Array of `horizon` forecasts
+    """
+    if model_type == "ml":
+        model = train_ml_model(train_features, horizon, "recursive", registry_id)[0]
+        return forecast_future_ml(model, train_features, horizon)["earnings"].to_numpy()
+
+    if model_type in ("arima", "sarima"):
+        train_model = train_arima_model if model_type == "arima" else train_sarima_model
+        model = train_model(train_ts, registry_id)
+        if not model:
+            raise ValueError(f"{model_type.upper()} training failed")
+        return np.asarray(model.forecast(steps=horizon))
+
+    if model_type == "prophet":
+        if prophet_engine == "fourier":
+            from utils.model.fourier.train import train_fourier_model as train_model
+        else:
+            from utils.model.prophet.train import train_prophet_model as train_model
+
+        prophet_data = train_ts.reset_index()
+        prophet_data.columns = ["ds", "y"]
+        forecast = train_model(prophet_data, horizon, registry_id, False)[1]
+        return forecast["yhat"].to_numpy()
+
+    raise ValueError(f"Unknown model type: {model_type}")
+
+
+def _backtest_fold(
+    vehicle_id, ts_data, features_df, origin, horizon, models, cache, prophet_engine
+):
+    """
+    Forecasts one fold of a vehicle with every model.
+
+    Parameters:
+    - vehicle_id: ID of the vehicle
+    - ts_data: Full time series of the vehicle
+    - features_df: ML features of the full series
+    - origin: First forecast date of the fold
+    - horizon: Number of days to forecast
+    - models: Model types to evaluate
+    - cache: Cache the fitted models of the fold in the model registry
+    - prophet_engine: "prophet", or "fourier" for the Fourier regression
+
+    Returns:
+    - List of dictionaries, one per model and horizon day, with the actual
+      and forecast earnings
+    """
+    train_ts = ts_data[ts_data.index < origin]
+    actual = ts_data[ts_data.index >= origin].iloc[:horizon]
+
+    # Lag and rolling features only look back, so the features of the
+    # truncated series are the rows of the full ones before the origin
+    train_features = features_df[features_df["date"] < origin]
+
+    registry_id = _fold_id(vehicle_id, origin) if cache else None
+    rows = []
+    for model_type in models:
+        try:
+            forecast = _forecast_member(
+                model_type,
+                train_ts,
+                train_features,
+                horizon,
+                registry_id,
+                prophet_engine,
+            )
+        except Exception as e:
+            print(f"Error backtesting {model_type} of {vehicle_id} at {origin}: {e}")
+            continue
+
+        for step, (date, value) in enumerate(zip(actual.index, actual.to_numpy())):
+            rows.append(
+                {
+                    "vehicle_id": vehicle_id,
+                    "model": model_type,
+                    "origin": origin,
+                    "horizon": step + 1,
+                    "date": date,
+                    "actual": value,
+                    "forecast": forecast[step],
+                }
+            )
+    return rows
+
+
+def backtest_metrics(predictions):
+    """
+    Score backtest forecasts per vehicle, model and horizon day.
+
+    Parameters:
+    - predictions: DataFrame with 'vehicle_id', 'model', 'horizon', 'actual'
+      and 'forecast' columns
+
+    Returns:
+    - DataFrame with 'vehicle_id', 'model', 'horizon', 'folds' and one column
+      per name in METRIC_COLUMNS
+    """
+    columns = ["vehicle_id", "model", "horizon", "folds"] + METRIC_COLUMNS
+    records = []
+    for (vehicle_id, model_type, horizon), group in predictions.groupby(
+        ["vehicle_id", "model", "horizon"], sort=True
+    ):
+        metrics = forecast_metrics(group["actual"], group["forecast"])
+        records.append(
+            {
+                "vehicle_id": vehicle_id,
+                "model": model_type,
+                "horizon": horizon,
+                "folds": len(group),
+                **metrics,
+            }
+        )
+    return pd.DataFrame(records, columns=columns)
+
+
+def backtest(
+    vehicle_ids=None,
+    data_path=DATA_CSV_FILE,
+    models=BACKTEST_MODELS,
+    horizon=BACKTEST_HORIZON,
+    initial=INITIAL_DAYS,
+    step=STEP_DAYS,
+    n_jobs=-1,
+    cache=True,
+    prophet_engine="prophet",
+):
+    """
+    Rolling-origin backtest of the ensemble members.
+
+    Every fold trains each model on the days before its origin and forecasts
+    the next `horizon` days. Folds of all vehicles run in parallel; the
+    fitted models of a fold are cached in the model registry, so running
+    the backtest again on unchanged data only scores the forecasts.
+
+    Parameters:
+    - vehicle_ids: Vehicles to backtest; all vehicles in the data when omitted
+    - data_path: Path to the CSV file with transaction data
+    - models: Model types to evaluate ('ml', 'arima', 'sarima', 'prophet')
+    - horizon: Number of days forecast from every origin
+    - initial: Number of days of history before the first origin
+    - step: Number of days between origins
+    - n_jobs: Number of parallel jobs (-1 uses all cores)
+    - cache: Cache the fitted models of every fold in the model registry
+    - prophet_engine: "prophet", or "fourier" for the Fourier regression
+
+    Returns:
+    - metrics: DataFrame with 'vehicle_id', 'model', 'horizon', 'folds',
+      'MAE', 'RMSE', 'R2' and 'MAPE' columns
+    - predictions: DataFrame with the actual and forecast earnings of every
+      vehicle, model, origin and horizon day
+    """
+    store = get_transaction_store(data_path)
+    vehicle_ids = list(vehicle_ids or store.vehicles)
+
+    tasks = []
+    for vehicle_id in vehicle_ids:
+        ts_data = prepare_time_series_data(store, vehicle_id)
+        features_df = prepare_features(ts_data)
+        for origin in rolling_origins(ts_data.index, horizon, initial, step):
+            tasks.append((vehicle_id, ts_data, features_df, origin))
+
+    print(f"Backtesting {len(models)} models on {len(tasks)} folds")
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_backtest_fold)(*task, horizon, models, cache, prophet_engine)
+        for task in tasks
+    )
+
+    predictions = pd.DataFrame(
+        [row for rows in results for row in rows],
+        columns=[
+            "vehicle_id",
+            "model",
+            "origin",
+            "horizon",
+            "date",
+            "actual",
+            "forecast",
+        ],
+    )
+    return backtest_metrics(predictions), predictions
+
+
+if __name__ == "__main__":
+    """main function"""
+    metrics, _ = backtest()
+    summary = metrics.groupby(["vehicle_id", "model"])[METRIC_COLUMNS].mean()
+    print(summary.round(2).to_string())
@@ -39,3 +39,33 @@ def evaluate_prophet_accuracy(actual, predicted):
     r2 = r2_score(actual, predicted)
 
     return {"MAE": mae, "RMSE": rmse, "R2": r2}
+
+
+def forecast_metrics(actual, predicted):
+    """
+    Evaluate forecasts against the observed values.
+
+    Parameters:
+    - actual: Actual values
+    - predicted: Predicted values
+
+    Returns:
+    - Dictionary with MAE, RMSE, R2 and MAPE (in percent, over the non-zero
+      actual values); R2 and MAPE are NaN when they are undefined
+    """
+    actual = np.asarray(actual, dtype=float)
+    predicted = np.asarray(predicted, dtype=float)
+    errors = actual - predicted
+
+    mae = np.abs(errors).mean()
+    rmse = np.sqrt((errors**2).mean())
+    r2 = r2_score(actual, predicted) if len(actual) > 1 else np.nan
+
+    nonzero = actual != 0
+    mape = (
+        np.abs(errors[nonzero] / actual[nonzero]).mean() * 100
+        if nonzero.any()
+        else np.nan
+    )
+
+    return {"MAE": mae, "RMSE": rmse, "R2": r2, "MAPE": mape}
@@ -1,30 +1,131 @@
+import multiprocessing
+
+import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
+from sklearn.multioutput import MultiOutputRegressor
+from utils.data_preparation.prepare_features import FEATURE_VERSION
+from utils.model.registry import load_model, save_model
+
+# Forecasting strategies supported by `train_ml_model`
+ML_STRATEGIES = ["recursive", "direct"]
+
+
+def _default_n_jobs():
+    """
+    All cores in the main process, one inside the stage and fleet pool workers,
+    which already run one process per core.
+    """
+    return -1 if multiprocessing.parent_process() is None else 1
+
+
+def direct_targets(features_df, forecast_days=30):
+    """
+    Build the shifted targets of the direct strategy.
 
+    Parameters:
+    - features_df: DataFrame with features
+    - forecast_days: Number of days to forecast
 
-def train_ml_model(features_df, forecast_days=30):
+    Returns:
+    - DataFrame with one 'earnings_<h>' column per horizon h = 1..forecast_days,
+      holding the earnings h days after each row (NaN past the end of the data)
+    """
+    earnings = features_df["earnings"]
+    return pd.DataFrame(
+        {
+            f"earnings_{horizon}": earnings.shift(-horizon)
+            for horizon in range(1, forecast_days + 1)
+        }
+    )
+
+
+def train_ml_model(
+    features_df, forecast_days=30, strategy="recursive", vehicle_id=None
+):
     """
     Train a machine learning model for forecasting.
 
+    With the "recursive" strategy one model predicts the next day and is fed
+    its own predictions. With the "direct" strategy one estimator per horizon
+    day is trained on shifted targets and the whole horizon is forecast from
+    the last known row in a single predict call.
+
     Parameters:
     - features_df: DataFrame with features
     - forecast_days: Number of days to forecast
+    - strategy: "recursive" or "direct"
+    - vehicle_id: Optional vehicle ID; when given, a model already trained on
+      the same features is loaded from the registry instead of refitted
 
     Returns:
     - model: Trained model
-    - X_train, X_test, y_train, y_test: Train/test split data
+    - X_train, X_test, y_train, y_test: Train/test split data (for the direct
+      strategy the targets have one column per horizon day)
     """
+    if strategy not in ML_STRATEGIES:
+        raise ValueError(f"Unknown ML strategy: {strategy}")
+
     # Define features and target
     X = features_df.drop(["date", "earnings"], axis=1)
     y = features_df["earnings"]
 
+    if strategy == "direct":
+        # Keep the rows whose whole horizon is observed
+        y = direct_targets(features_df, forecast_days)
+        complete = y.notna().all(axis=1)
+        X, y = X[complete], y[complete]
+        if len(X) < 2:
+            raise ValueError(
+                f"Not enough history to train a direct {forecast_days}-day model"
+            )
+
     # Split data for training and testing
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, shuffle=False
     )
 
+    params = {
+        "strategy": strategy,
+        "n_estimators": 100,
+        "random_state": 42,
+        "features": FEATURE_VERSION,
+    }
+    if strategy == "direct":
+        params["forecast_days"] = forecast_days
+    model = load_model(vehicle_id, "ml", params, features_df) if vehicle_id else None
+    if model is not None:
+        return model, X_train, X_test, y_train, y_test
+
     # Train a Random Forest model
     model = RandomForestRegressor(n_estimators=100, random_state=42)
+    if strategy == "direct":
+        # One forest per horizon day, fitted in parallel unless this already
+        # is a pool worker
+        model = MultiOutputRegressor(model, n_jobs=_default_n_jobs())
     model.fit(X_train, y_train)
+    if vehicle_id:
+        save_model(vehicle_id, "ml", params, features_df, model)
 
     return model, X_train, X_test, y_train, y_test
+
+
+def train_global_ml_model(features_by_vehicle, forecast_days=30):
+    """
+    Train one machine learning model on the features of several vehicles.
+
+    The `prepare_features` outputs are stacked and ordered by date, so the
+    train/test split stays chronological across the fleet.
+
+    Parameters:
+    - features_by_vehicle: Dictionary mapping vehicle ID to its features DataFrame
+    - forecast_days: Number of days to forecast
+
+    Returns:
+    - model: Trained model
+    - X_train, X_test, y_train, y_test: Train/test split data
+    """
+    stacked = pd.concat(features_by_vehicle.values(), ignore_index=True)
+    stacked = stacked.sort_values("date", kind="stable", ignore_index=True)
+
+    return train_ml_model(stacked, forecast_days)
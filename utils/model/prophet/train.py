@@ -1,35 +1,113 @@
+import threading
 from prophet import Prophet
+from utils.model.registry import load_latest_model, save_model
 
+# Prophet settings, recorded with registered models
+PROPHET_PARAMS = {
+    "yearly_seasonality": True,
+    "weekly_seasonality": True,
+    "daily_seasonality": True,
+    "seasonality_mode": "multiplicative",
+    "interval_width": 0.95,  # 95% confidence interval
+}
 
-def train_prophet_model(data, forecast_days=30):
+# Compiled Stan model shared by the Prophets fitted in each thread; a backend
+# keeps the state of its last fit, so threads fitting at once need their own
+_stan_backends = threading.local()
+
+
+def get_stan_backend():
+    """
+    Return the Stan backend of this thread, loading the compiled model once.
+
+    Returns:
+    - The Prophet Stan backend
+    """
+    backend = getattr(_stan_backends, "backend", None)
+    if backend is None:
+        backend = _stan_backends.backend = Prophet().stan_backend
+    return backend
+
+
+class SharedBackendProphet(Prophet):
+    """Prophet that reuses the Stan backend of its thread instead of loading its own."""
+
+    def _load_stan_backend(self, stan_backend):
+        self.stan_backend = get_stan_backend()
+
+
+def warm_start_params(model):
+    """
+    Extract the fitted parameters of a Prophet model as Stan initial values.
+
+    Parameters:
+    - model: Fitted Prophet model
+
+    Returns:
+    - Dictionary of initial values for `Prophet.fit(init=...)`
+    """
+    params = {}
+    for name in ["k", "m", "sigma_obs"]:
+        params[name] = model.params[name][0][0]
+    for name in ["delta", "beta"]:
+        params[name] = model.params[name][0]
+    return params
+
+
+def _fit_prophet_model(data, init=None):
+    """Builds and fits a Prophet model, optionally from initial parameter values."""
+    prophet_model = SharedBackendProphet(**PROPHET_PARAMS)
+
+    # Add custom seasonality for weekday vs weekend
+    prophet_model.add_seasonality(name="weekday_weekend", period=7, fourier_order=3)
+
+    if init is None:
+        return prophet_model.fit(data)
+    return prophet_model.fit(data, init=init)
+
+
+def train_prophet_model(data, forecast_days=30, vehicle_id=None, include_history=True):
     """
     Train a Prophet model for forecasting.
 
     Parameters:
     - data: DataFrame with 'ds' (dates) and 'y' (target values) columns
     - forecast_days: Number of days to forecast into the future
+    - vehicle_id: Optional vehicle ID; when given, a model already trained on
+      the same data is loaded from the registry instead of refitted, and a
+      model trained on older data warm-starts the refit
+    - include_history: Predict the history dates too; False predicts only
+      the `forecast_days` horizon
 
     Returns:
     - model: Trained Prophet model
     - forecast: Forecast DataFrame
     """
-    # Initialize and train the model
-    prophet_model = Prophet(
-        yearly_seasonality=True,
-        weekly_seasonality=True,
-        daily_seasonality=True,
-        seasonality_mode="multiplicative",
-        interval_width=0.95,  # 95% confidence interval
-    )
+    prophet_model, previous = None, None
+    if vehicle_id:
+        previous, exact = load_latest_model(vehicle_id, "prophet", PROPHET_PARAMS, data)
+        if exact:
+            print(f"Loaded prophet model of {vehicle_id} from the registry")
+            prophet_model = previous
 
-    # Add custom seasonality for weekday vs weekend
-    prophet_model.add_seasonality(name="weekday_weekend", period=7, fourier_order=3)
+    if prophet_model is None:
+        if previous is not None:
+            # Start the optimizer from the previous fit's parameters; Prophet
+            # falls back to its defaults for any whose shape changed
+            try:
+                prophet_model = _fit_prophet_model(data, warm_start_params(previous))
+            except Exception as e:
+                print(f"Warm start of the prophet model failed, refitting: {e}")
 
-    # Fit the model
-    prophet_model.fit(data)
+        if prophet_model is None:
+            prophet_model = _fit_prophet_model(data)
+        if vehicle_id:
+            save_model(vehicle_id, "prophet", PROPHET_PARAMS, data, prophet_model)
 
     # Create a dataframe for future predictions
-    future = prophet_model.make_future_dataframe(periods=forecast_days)
+    future = prophet_model.make_future_dataframe(
+        periods=forecast_days, include_history=include_history
+    )
 
     # Make predictions
     prophet_forecast = prophet_model.predict(future)
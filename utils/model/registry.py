@@ -0,0 +1,252 @@
+import os
+import re
+import json
+import time
+import pickle
+import threading
+import hashlib
+import joblib
+import pandas as pd
+from config import MODELS_DIR
+
+# Vehicle IDs name cache directories, so only plain names are accepted
+VEHICLE_ID_PATTERN = r"^[A-Za-z0-9][A-Za-z0-9_-]*$"
+
+# Parameters only extended with new days (refit=False) are re-estimated once
+# the series grew by this fraction, or this many days after their estimation
+REFIT_GROWTH = 0.1
+REFIT_MAX_AGE_DAYS = 7
+
+# Errors of a registry entry that is corrupt or was written by other
+# library versions
+UNREADABLE_ERRORS = (
+    OSError,
+    EOFError,
+    KeyError,
+    ValueError,
+    ImportError,
+    AttributeError,
+    pickle.UnpicklingError,
+)
+
+
+def vehicle_path(base_dir, vehicle_id, *parts):
+    """
+    Build a path under a vehicle's cache directory.
+
+    Parameters:
+    - base_dir: Cache root the vehicle directories live in
+    - vehicle_id: ID of the vehicle; may be a '/'-separated registry ID such
+      as '<vehicle>/backtest/<origin>', each part a plain name
+    - parts: Path components below the vehicle directory
+
+    Returns:
+    - The joined path
+
+    Raises:
+    - ValueError: If the ID is not made of plain names (path separators,
+      '..' or other characters that could leave `base_dir`)
+    """
+    names = str(vehicle_id).split("/")
+    if not all(re.fullmatch(VEHICLE_ID_PATTERN, name) for name in names):
+        raise ValueError(f"Invalid vehicle ID: {vehicle_id!r}")
+    return os.path.join(base_dir, *names, *parts)
+
+
+def fingerprint(data):
+    """
+    Hash a training series or frame, including its index.
+
+    Parameters:
+    - data: Series or DataFrame the model is trained on
+
+    Returns:
+    - Hex SHA-256 digest of the values and index
+    """
+    hashes = pd.util.hash_pandas_object(data, index=True).to_numpy()
+    names = data.columns if isinstance(data, pd.DataFrame) else [data.name]
+    columns = ",".join(map(str, names))
+    return hashlib.sha256(hashes.tobytes() + columns.encode("utf-8")).hexdigest()
+
+
+def _model_path(vehicle_id, model_type, models_dir):
+    """Returns the path of the registry entry of a vehicle's model type."""
+    return vehicle_path(models_dir, vehicle_id, f"{model_type}.joblib")
+
+
+def _normalize(params):
+    """Normalizes hyperparameters so tuples and lists compare equal."""
+    return json.loads(json.dumps(params, sort_keys=True))
+
+
+def _dump_model(model_type, model):
+    """Converts a fitted model to its stored form."""
+    if model_type == "prophet":
+        # Prophet models are only portable through their JSON serialization
+        from prophet.serialize import model_to_json
+
+        return model_to_json(model)
+    return model
+
+
+def _load_model(model_type, stored):
+    """Restores a fitted model from its stored form."""
+    if model_type == "prophet":
+        from prophet.serialize import model_from_json
+
+        return model_from_json(stored)
+    return stored
+
+
+def load_entry(vehicle_id, model_type, models_dir=MODELS_DIR):
+    """
+    Read the latest registry entry of a vehicle's model type.
+
+    Parameters:
+    - vehicle_id: ID of the vehicle
+    - model_type: 'ml', 'arima', 'sarima', 'prophet', ...
+    - models_dir: Directory holding the registry
+
+    Returns:
+    - Dictionary with 'vehicle_id', 'model_type', 'params', 'fingerprint' and
+      'model' keys, or None if there is no readable entry
+    """
+    path = _model_path(vehicle_id, model_type, models_dir)
+    try:
+        entry = joblib.load(path)
+        entry["model"] = _load_model(model_type, entry["model"])
+        return entry
+    except FileNotFoundError:
+        return None
+    except UNREADABLE_ERRORS as e:
+        print(f"Ignoring unreadable {model_type} model of {vehicle_id}: {e}")
+        return None
+
+
+def load_latest_model(vehicle_id, model_type, params, data, models_dir=MODELS_DIR):
+    """
+    Return the registered model trained with `params`, whatever its data.
+
+    Parameters:
+    - vehicle_id: ID of the vehicle
+    - model_type: 'ml', 'arima', 'sarima', 'prophet', ...
+    - params: Dictionary of hyperparameters the model was trained with
+    - data: Training series or frame
+    - models_dir: Directory holding the registry
+
+    Returns:
+    - The fitted model (None if there is none) and whether it was trained on
+      exactly `data`
+    """
+    entry = load_entry(vehicle_id, model_type, models_dir)
+    if entry is None or entry["params"] != _normalize(params):
+        return None, False
+    return entry["model"], entry["fingerprint"] == fingerprint(data)
+
+
+def load_model(vehicle_id, model_type, params, data, models_dir=MODELS_DIR):
+    """
+    Return a registered model trained with `params` on exactly `data`.
+
+    Parameters:
+    - vehicle_id: ID of the vehicle
+    - model_type: 'ml', 'arima', 'sarima', 'prophet', ...
+    - params: Dictionary of hyperparameters the model was trained with
+    - data: Training series or frame
+    - models_dir: Directory holding the registry
+
+    Returns:
+    - The fitted model, or None on a registry miss
+    """
+    model, exact = load_latest_model(vehicle_id, model_type, params, data, models_dir)
+    if not exact:
+        return None
+
+    print(f"Loaded {model_type} model of {vehicle_id} from the registry")
+    return model
+
+
+def load_previous_model(vehicle_id, model_type, params, data, models_dir=MODELS_DIR):
+    """
+    Return the registered model if `data` extends the series it was trained on.
+
+    Parameters:
+    - vehicle_id: ID of the vehicle
+    - model_type: 'ml', 'arima', 'sarima', 'prophet', ...
+    - params: Dictionary of hyperparameters the model was trained with
+    - data: Training series or frame, the registered one plus new rows
+    - models_dir: Directory holding the registry
+
+    Returns:
+    - The fitted model, the new rows of `data` and the 'nobs'/'at' of its last
+      parameter estimation (see `refit_due`), or None if `data` does not
+      strictly extend the registered training data
+    """
+    entry = load_entry(vehicle_id, model_type, models_dir)
+    if entry is None or entry["params"] != _normalize(params):
+        return None
+
+    nobs = entry.get("nobs")
+    if nobs is None or len(data) <= nobs:
+        return None
+    if fingerprint(data.iloc[:nobs]) != entry["fingerprint"]:
+        return None
+
+    return entry["model"], data.iloc[nobs:], entry.get("estimated")
+
+
+def refit_due(estimated, nobs):
+    """
+    Tell whether parameters extended without re-estimation are too stale.
+
+    Parameters:
+    - estimated: Dictionary with the 'nobs' and 'at' (epoch seconds) of the
+      last parameter estimation, as returned by `load_previous_model`
+    - nobs: Number of rows of the series the model now covers
+
+    Returns:
+    - True if the parameters should be re-estimated
+    """
+    if not estimated:
+        return True
+    grown = nobs > estimated["nobs"] * (1 + REFIT_GROWTH)
+    aged = time.time() - estimated["at"] > REFIT_MAX_AGE_DAYS * 86400
+    return grown or aged
+
+
+def save_model(
+    vehicle_id, model_type, params, data, model, models_dir=MODELS_DIR, estimated=None
+):
+    """
+    Register a fitted model, replacing the previous one of the same type.
+
+    Parameters:
+    - vehicle_id: ID of the vehicle
+    - model_type: 'ml', 'arima', 'sarima', 'prophet', ...
+    - params: Dictionary of hyperparameters the model was trained with
+    - data: Training series or frame
+    - model: Fitted model
+    - models_dir: Directory holding the registry
+    - estimated: 'nobs'/'at' of the model's last parameter estimation, for a
+      model only extended with new rows; None if its parameters were
+      estimated on `data`
+    """
+    path = _model_path(vehicle_id, model_type, models_dir)
+    entry = {
+        "vehicle_id": vehicle_id,
+        "model_type": model_type,
+        "params": _normalize(params),
+        "fingerprint": fingerprint(data),
+        "nobs": len(data),
+        "estimated": estimated or {"nobs": len(data), "at": time.time()},
+        "model": _dump_model(model_type, model),
+    }
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Writers in other threads and processes use their own temporary file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        joblib.dump(entry, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Error registering {model_type} model of {vehicle_id}: {e}")
@@ -1,28 +1,108 @@
 from statsmodels.tsa.statespace.sarimax import SARIMAX
+from utils.model.registry import (
+    load_model,
+    load_previous_model,
+    refit_due,
+    save_model,
+)
+from utils.model.arima.order_search import select_order
 
+# Default (order, seasonal_order) and the simpler one tried if it fails
+SARIMA_ORDER = ((1, 1, 1), (1, 1, 1, 7))
+FALLBACK_ORDER = ((1, 1, 0), (1, 0, 0, 7))
 
-def train_sarima_model(ts_data):
+
+def train_sarima_model(ts_data, vehicle_id=None, refit=True, order=SARIMA_ORDER):
     """
     Train a SARIMA model for time series forecasting.
 
     Parameters:
     - ts_data: Time series data
+    - vehicle_id: Optional vehicle ID; when given, a model already trained on
+      the same series is loaded from the registry instead of refitted, and a
+      series that extends the registered one is updated incrementally
+    - refit: On an incremental update, re-estimate the parameters starting from
+      the previous fit (True) or only extend the filter with the new days
+      (False, until `registry.refit_due` says the parameters are too stale)
+    - order: The (order, seasonal_order) pair, or "auto" to select it by AIC (the
+      choice is cached per vehicle, see `order_search.select_order`)
 
     Returns:
     - model: Trained SARIMA model
     """
+    if order == "auto":
+        order = select_order(ts_data, vehicle_id, "sarima") or SARIMA_ORDER
+
+    params = {"order": order, "fallback_order": FALLBACK_ORDER}
+    model_fit, estimated = None, None
+    if vehicle_id:
+        model_fit = load_model(vehicle_id, "sarima", params, ts_data)
+        if model_fit is not None:
+            return model_fit
+
+        previous = load_previous_model(vehicle_id, "sarima", params, ts_data)
+        if previous is not None:
+            previous_fit, new_data, estimated = previous
+            if refit or refit_due(estimated, len(ts_data)):
+                estimated = None
+            model_fit = _update_sarima_model(
+                previous_fit, new_data, ts_data, estimated is None
+            )
+
+    if model_fit is None:
+        model_fit, estimated = _fit_sarima_model(ts_data, order), None
+    if vehicle_id and model_fit is not None:
+        save_model(
+            vehicle_id, "sarima", params, ts_data, model_fit, estimated=estimated
+        )
+    return model_fit
+
+
+def _fit_sarima_model(ts_data, orders=SARIMA_ORDER):
+    """Fits a SARIMA model of `orders`, falling back to a simpler one."""
     try:
         # SARIMA model with seasonal component (weekly)
-        model = SARIMAX(ts_data, order=(1, 1, 1), seasonal_order=(1, 1, 1, 7))
+        order, seasonal_order = orders
+        model = SARIMAX(ts_data, order=order, seasonal_order=seasonal_order)
         model_fit = model.fit(disp=False)
         return model_fit
     except Exception as e:
         print(f"Error training SARIMA model: {e}")
         try:
             # Try a simpler model if the first one fails
-            model = SARIMAX(ts_data, order=(1, 1, 0), seasonal_order=(1, 0, 0, 7))
+            order, seasonal_order = FALLBACK_ORDER
+            model = SARIMAX(ts_data, order=order, seasonal_order=seasonal_order)
             model_fit = model.fit(disp=False)
             return model_fit
         except Exception as e:
             print(f"Error training simpler SARIMA model: {e}")
             return None
+
+
+def _update_sarima_model(previous, new_data, ts_data, refit):
+    """
+    Updates a previous SARIMA fit with the days appended to its series.
+
+    Parameters:
+    - previous: SARIMA results fitted on the start of `ts_data`
+    - new_data: The days of `ts_data` after the previous training series
+    - ts_data: Full time series data
+    - refit: Re-estimate warm-started parameters instead of only filtering
+
+    Returns:
+    - model: Updated SARIMA model, or None if the update failed
+    """
+    try:
+        if not refit:
+            return previous.append(new_data, refit=False)
+
+        # Same orders as the previous fit (the fallback ones if they were used)
+        model = SARIMAX(
+            ts_data,
+            order=previous.model.order,
+            seasonal_order=previous.model.seasonal_order,
+        )
+        return model.fit(start_params=previous.params, disp=False)
+    except Exception as e:
+        print(f"Error updating SARIMA model, refitting: {e}")
+        return None
@@ -0,0 +1,260 @@
+import os
+import json
+import threading
+import numpy as np
+import pandas as pd
+
+from utils.data_preparation.transaction_store import current_transaction_store
+from utils.data_preparation.prepare_time_series import prepare_time_series_data
+from utils.ensemble.ensemble_forecast import BASELINE_MODELS, ensemble_forecast
+from utils.ensemble.ensemble_weights import load_ensemble_weights, active_members
+from utils.model.registry import vehicle_path
+from utils.prediction.ensemble_prediction import STAGE_TIMEOUTS, build_stages
+from utils.prediction.stage_pool import run_stages
+
+from config import DATA_CSV_FILE, FORECASTS_DIR
+
+# Season of the seasonal-naive first answer, in days
+SEASON_DAYS = 7
+
+# Latest forecast of every (vehicle ID, forecast days), and the refinements
+# running in this process, by (vehicle ID, forecast days, data version)
+_forecasts = {}
+_refining = set()
+_lock = threading.Lock()
+
+
+def seasonal_naive_forecast(ts_data, forecast_days=30, season=SEASON_DAYS):
+    """
+    Forecast by repeating the last observed season.
+
+    Parameters:
+    - ts_data: Time series data
+    - forecast_days: Number of days to forecast
+    - season: Season length in days
+
+    Returns:
+    - DataFrame with 'date' and 'earnings' columns
+    """
+    if ts_data.empty:
+        raise ValueError("No earnings to forecast from")
+
+    last_season = ts_data.to_numpy(dtype=float)[-season:]
+    future_dates = pd.date_range(
+        start=ts_data.index[-1] + pd.Timedelta(days=1), periods=forecast_days
+    )
+    # Day i after the history repeats day i - season
+    positions = np.arange(forecast_days) % len(last_season)
+
+    return pd.DataFrame({"date": future_dates, "earnings": last_season[positions]})
+
+
+def _forecast_path(vehicle_id, forecast_days):
+    """Returns the path of the stored forecast of a vehicle and horizon."""
+    return vehicle_path(FORECASTS_DIR, vehicle_id, f"anytime_{forecast_days}.json")
+
+
+def _make_record(
+    vehicle_id, forecast_days, version, data_end, tier, members, forecast, done
+):
+    """Builds a stored forecast record from a 'date'/'earnings' DataFrame."""
+    return {
+        "vehicle_id": vehicle_id,
+        "forecast_days": forecast_days,
+        "data_version": version,
+        "tier": tier,
+        "members": members,
+        "complete": done,
+        "data_end": f"{data_end:%Y-%m-%d}",
+        "updated_at": pd.Timestamp.now().isoformat(),
+        "forecast": [
+            {"date": f"{date:%Y-%m-%d}", "earnings": round(float(value), 2)}
+            for date, value in zip(forecast["date"], forecast["earnings"])
+        ],
+    }
+
+
+def _store(record, replaces=None):
+    """
+    Keep a forecast record in memory and on disk.
+
+    Parameters:
+    - record: Forecast record
+    - replaces: Data version the current record must have, if any; the record
+      is dropped when the data changed in the meantime
+
+    Returns:
+    - True if the record was stored
+    """
+    key = (record["vehicle_id"], record["forecast_days"])
+    with _lock:
+        current = _forecasts.get(key)
+        if replaces is not None and (
+            current is None or current.get("data_version") != replaces
+        ):
+            return False
+        _forecasts[key] = record
+
+    path = _forecast_path(*key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Writers in other threads and processes use their own temporary file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error storing the forecast of {key[0]}: {e}")
+    return True
+
+
+def _stored(vehicle_id, forecast_days):
+    """Returns the latest stored forecast record, from memory or disk."""
+    key = (vehicle_id, forecast_days)
+    with _lock:
+        if key in _forecasts:
+            return _forecasts[key]
+
+    try:
+        with open(_forecast_path(*key), "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    with _lock:
+        return _forecasts.setdefault(key, record)
+
+
+def _refine(vehicle_id, forecast_days, store, data_end):
+    """
+    Runs the model stages and upgrades the stored forecast as each finishes.
+
+    Results are dropped once the stored forecast was made from newer data.
+
+    Parameters:
+    - vehicle_id: ID of the vehicle
+    - forecast_days: Number of days to forecast
+    - store: TransactionStore of the data version being refined
+    - data_end: Last observed date the forecast starts after
+    """
+    version = store.version
+    try:
+        weights = load_ensemble_weights(vehicle_id)
+        _, stages = build_stages(
+            store,
+            vehicle_id,
+            forecast_days,
+            prophet_history=False,
+            # Without learned weights only the baseline members are ensembled
+            models=active_members(weights) or BASELINE_MODELS,
+        )
+
+        forecasts = {}
+        stage_results = run_stages(
+            stages, {name: STAGE_TIMEOUTS[name] for name in stages}
+        )
+        for name, forecast in stage_results:
+            forecasts[name] = forecast
+            if forecast is None:
+                continue
+
+            # Upgrade to the ensemble of the members finished so far
+            ensemble_df = ensemble_forecast(forecasts, weights, data_end)
+            members = [
+                column[: -len("_forecast")]
+                for column in ensemble_df
+                if column.endswith("_forecast") and column != "ensemble_forecast"
+            ]
+            tier = "ensemble" if len(members) > 1 else members[0]
+            record = _make_record(
+                vehicle_id,
+                forecast_days,
+                version,
+                data_end,
+                tier,
+                members,
+                ensemble_df.rename(columns={"ensemble_forecast": "earnings"}),
+                len(forecasts) == len(stages),
+            )
+            if not _store(record, replaces=version):
+                print(f"Data of {vehicle_id} changed, dropping its refinement")
+                # Stops the remaining stages
+                stage_results.close()
+                break
+
+        # Mark the forecast final even if some members failed or timed out
+        record = _stored(vehicle_id, forecast_days)
+        if record is not None and not record["complete"]:
+            _store({**record, "complete": True}, replaces=version)
+    except Exception as e:
+        print(f"Error refining the forecast of {vehicle_id}: {e}")
+    finally:
+        with _lock:
+            _refining.discard((vehicle_id, forecast_days, version))
+
+
+def get_anytime_forecast(
+    vehicle_id, forecast_days=30, data_path=DATA_CSV_FILE, refine=True
+):
+    """
+    Return the best forecast available right now, refining it in the background.
+
+    The first answer is the stored forecast of the same data version (the
+    content hash of the transactions file), else a seasonal-naive forecast. A background refinement then runs the model
+    stages and upgrades the stored forecast as each finishes: first the
+    fastest member, then ensembles of the finished members.
+
+    Parameters:
+    - vehicle_id: ID of the vehicle
+    - forecast_days: Number of days to forecast
+    - data_path: Path to the CSV file with transaction data
+    - refine: Start a background refinement if the forecast is not final
+
+    Returns:
+    - Dictionary with 'vehicle_id', 'forecast_days', 'data_version', 'tier'
+      (the member name, 'ensemble' or 'seasonal_naive'), 'members',
+      'complete', 'data_end',
+      'updated_at', 'age_seconds', 'refining' and 'forecast' (list of
+      'date'/'earnings' records)
+    """
+    store = current_transaction_store(data_path)
+
+    ts_data = prepare_time_series_data(store, vehicle_id)
+    if ts_data.empty:
+        raise ValueError(f"No earnings for vehicle {vehicle_id}")
+    data_end = ts_data.index[-1]
+
+    record = _stored(vehicle_id, forecast_days)
+    if record is None or record.get("data_version") != store.version:
+        # Stored forecast missing or made before the latest data
+        record = _make_record(
+            vehicle_id,
+            forecast_days,
+            store.version,
+            data_end,
+            "seasonal_naive",
+            [],
+            seasonal_naive_forecast(ts_data, forecast_days),
+            False,
+        )
+        _store(record)
+
+    key = (vehicle_id, forecast_days, store.version)
+    with _lock:
+        start = refine and not record["complete"] and key not in _refining
+        if start:
+            _refining.add(key)
+        refining = key in _refining
+    if start:
+        threading.Thread(
+            target=_refine,
+            args=(vehicle_id, forecast_days, store, data_end),
+            daemon=True,
+        ).start()
+
+    age = pd.Timestamp.now() - pd.Timestamp(record["updated_at"])
+    return {
+        **record,
+        "age_seconds": round(age.total_seconds(), 3),
+        "refining": refining,
+    }
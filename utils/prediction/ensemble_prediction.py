@@ -1,4 +1,4 @@
-import pandas as pd
+from utils.data_preparation.transaction_store import get_transaction_store
 from utils.data_preparation.prepare_time_series import (
     prepare_time_series_data,
     prepare_prophet_time_series_data,
@@ -12,48 +12,40 @@ from utils.model.evaluate_model import evaluate_model
 from utils.model.arima.train import train_arima_model
 from utils.model.sarima.train import train_sarima_model
 from utils.model.prophet.train import train_prophet_model
+from utils.model.fourier.train import train_fourier_model
 
 from utils.forecast.create_forecast_ml import forecast_future_ml
 from utils.forecast.create_forecast_arima import forecast_future_arima
 from utils.forecast.plot_forecast import plot_forecast, plot_prophet_forecast
+from utils.prediction.stage_pool import STAGE_WORKERS, run_stages
 
+# Seconds each model stage may run before its forecast is dropped
+STAGE_TIMEOUTS = {"ml": 120, "arima": 120, "sarima": 300, "prophet": 600}
 
-def run_prediction_for_vehicle(data_path, vehicle_id, forecast_days=30):
+
+def ml_stage(ts_data, vehicle_id, forecast_days=30, ml_strategy="recursive"):
     """
-    Run the complete prediction pipeline for a specific vehicle.
+    Train, evaluate and forecast with the Random Forest model.
 
     Parameters:
-    - data_path: Path to the CSV file with transaction data
-    - vehicle_id: ID of the vehicle to analyze
+    - ts_data: Time series data
+    - vehicle_id: ID of the vehicle
     - forecast_days: Number of days to forecast
+    - ml_strategy: "recursive" or "direct" multi-horizon ML forecasting
 
     Returns:
-    - Dictionary with forecasts from different models
+    - DataFrame with the ML forecast
     """
-    # Import the data
-    data = pd.read_csv(data_path)
-
-    # Convert 'created_at' column to datetime
-    data["created_at"] = pd.to_datetime(data["created_at"])
-
-    # Prepare time series data
-    ts_data = prepare_time_series_data(data, vehicle_id)
-
-    # Analyze and plot time series
-    plot_time_series_analysis(ts_data, vehicle_id)
-
-    """ 
-    Linear Regression ML Model 
-    """
-
     # Prepare features for ML model
     features_df = prepare_features(ts_data)
     print("\n***** Features *******\n")
-    print(prepare_features(ts_data).dtypes)
+    print(features_df.dtypes)
     print("\n***** Features *******\n")
 
     # Train ML model
-    ml_model, X_train, X_test, y_train, y_test = train_ml_model(features_df)
+    ml_model, X_train, X_test, y_train, y_test = train_ml_model(
+        features_df, forecast_days, ml_strategy, vehicle_id
+    )
 
     # Evaluate ML model
     ml_metrics = evaluate_model(ml_model, X_test, y_test)
@@ -63,51 +55,91 @@ def run_prediction_for_vehicle(data_path, vehicle_id, forecast_days=30):
     ml_forecast = forecast_future_ml(ml_model, features_df, forecast_days)
 
     # Plot ML forecast
-    plot_forecast(ts_data, ml_forecast, vehicle_id, "ML")
+    plot_forecast(ts_data, ml_forecast, vehicle_id, "ML", forecast_days)
+    return ml_forecast
 
+
+def arima_stage(ts_data, vehicle_id, forecast_days=30, order="default"):
     """
-    Arima ML Model
-    """
+    Train and forecast with the ARIMA model.
+
+    Parameters:
+    - ts_data: Time series data
+    - vehicle_id: ID of the vehicle
+    - forecast_days: Number of days to forecast
+    - order: "default" for the fixed order or "auto" to search for one
 
+    Returns:
+    - DataFrame with the ARIMA forecast, or None if training failed
+    """
     # Train ARIMA model
-    arima_model = train_arima_model(ts_data)
+    if order == "auto":
+        arima_model = train_arima_model(ts_data, vehicle_id, order="auto")
+    else:
+        arima_model = train_arima_model(ts_data, vehicle_id)
+    if not arima_model:
+        return None
 
     # Forecast with ARIMA model
-    if arima_model:
-        arima_forecast = forecast_future_arima(arima_model, ts_data, forecast_days)
+    arima_forecast = forecast_future_arima(arima_model, ts_data, forecast_days)
 
-        # Plot ARIMA forecast
-        if arima_forecast is not None:
-            plot_forecast(ts_data, arima_forecast, vehicle_id, "ARIMA")
-    else:
-        arima_forecast = None
+    # Plot ARIMA forecast
+    if arima_forecast is not None:
+        plot_forecast(ts_data, arima_forecast, vehicle_id, "ARIMA", forecast_days)
+    return arima_forecast
 
+
+def sarima_stage(ts_data, vehicle_id, forecast_days=30, order="default"):
     """
-    Sarimax Ml Model
-    """
+    Train and forecast with the SARIMA model.
+
+    Parameters:
+    - ts_data: Time series data
+    - vehicle_id: ID of the vehicle
+    - forecast_days: Number of days to forecast
+    - order: "default" for the fixed orders or "auto" to search for them
 
+    Returns:
+    - DataFrame with the SARIMA forecast, or None if training failed
+    """
     # Train SARIMA model
-    sarima_model = train_sarima_model(ts_data)
+    if order == "auto":
+        sarima_model = train_sarima_model(ts_data, vehicle_id, order="auto")
+    else:
+        sarima_model = train_sarima_model(ts_data, vehicle_id)
+    if not sarima_model:
+        return None
 
     # Forecast with SARIMA model
-    if sarima_model:
-        sarima_forecast = forecast_future_arima(sarima_model, ts_data, forecast_days)
+    sarima_forecast = forecast_future_arima(sarima_model, ts_data, forecast_days)
 
-        # Plot SARIMA forecast
-        if sarima_forecast is not None:
-            plot_forecast(ts_data, sarima_forecast, vehicle_id, "SARIMA")
-    else:
-        sarima_forecast = None
+    # Plot SARIMA forecast
+    if sarima_forecast is not None:
+        plot_forecast(ts_data, sarima_forecast, vehicle_id, "SARIMA", forecast_days)
+    return sarima_forecast
 
+
+def prophet_stage(
+    prophet_data, vehicle_id, forecast_days=30, engine="prophet", include_history=True
+):
     """
-    Prophet ML Model
-    """
+    Train and forecast with the Prophet model.
 
-    # Prepare time series data
-    ts_data = prepare_prophet_time_series_data(data, vehicle_id)
+    Parameters:
+    - prophet_data: DataFrame with 'ds' and 'y' columns
+    - vehicle_id: ID of the vehicle
+    - forecast_days: Number of days to forecast
+    - engine: "prophet", or "fourier" for the in-process Fourier regression
+    - include_history: Predict the history dates too (False: only the horizon)
 
+    Returns:
+    - Prophet forecast DataFrame
+    """
     # Train the model and get forecast
-    prophet_model, prophet_forecast = train_prophet_model(ts_data, forecast_days)
+    train_model = train_fourier_model if engine == "fourier" else train_prophet_model
+    prophet_model, prophet_forecast = train_model(
+        prophet_data, forecast_days, vehicle_id, include_history
+    )
 
     # Evaluate Prophet model
     # ml_metrics = evaluate_prophet_accuracy(ts_data, prophet_forecast)
@@ -115,18 +147,172 @@ def run_prediction_for_vehicle(data_path, vehicle_id, forecast_days=30):
 
     if prophet_model:
         plot_prophet_forecast(
-            ts_data, prophet_model, prophet_forecast, vehicle_id, "PROPHET"
+            prophet_data,
+            prophet_model,
+            prophet_forecast,
+            vehicle_id,
+            # Served as the Prophet member whatever the engine
+            "Prophet",
+            forecast_days,
         )
+    return prophet_forecast
+
+
+def _run_stage(stage, *args):
+    """Runs a model stage, turning its failure into a missing forecast."""
+    try:
+        return stage(*args)
+    except Exception as e:
+        print(f"Error in {stage.__name__}: {e}")
+        return None
+
+
+def build_stages(
+    data,
+    vehicle_id,
+    forecast_days=30,
+    ml_strategy="recursive",
+    arima_order="default",
+    prophet_engine="prophet",
+    prophet_history=True,
+    models=None,
+):
+    """
+    Prepare a vehicle's series and the model stages that forecast it.
+
+    Parameters:
+    - data: Transaction data (DataFrame or TransactionStore)
+    - vehicle_id: ID of the vehicle
+    - forecast_days: Number of days to forecast
+    - ml_strategy, arima_order, prophet_engine, prophet_history: See
+      `run_prediction_for_vehicle`
+    - models: Model stages to keep; all stages when omitted
+
+    Returns:
+    - The vehicle's daily time series
+    - Dictionary mapping stage name to (function, *args)
+    """
+    # Prepare time series data
+    ts_data = prepare_time_series_data(data, vehicle_id)
+    prophet_data = prepare_prophet_time_series_data(data, vehicle_id)
+
+    stages = {
+        "ml": (ml_stage, ts_data, vehicle_id, forecast_days, ml_strategy),
+        "arima": (arima_stage, ts_data, vehicle_id, forecast_days, arima_order),
+        "sarima": (sarima_stage, ts_data, vehicle_id, forecast_days, arima_order),
+        "prophet": (
+            prophet_stage,
+            prophet_data,
+            vehicle_id,
+            forecast_days,
+            prophet_engine,
+            prophet_history,
+        ),
+    }
+
+    if models is not None:
+        # Pruned members are not trained at all
+        stages = {name: stage for name, stage in stages.items() if name in models}
+
+    return ts_data, stages
+
+
+def run_prediction_for_vehicle(
+    data_path,
+    vehicle_id,
+    forecast_days=30,
+    ml_strategy="recursive",
+    parallel=True,
+    timeouts=None,
+    arima_order="default",
+    prophet_engine="prophet",
+    prophet_history=True,
+    models=None,
+    store=None,
+    stage_workers=STAGE_WORKERS,
+):
+    """
+    Run the complete prediction pipeline for a specific vehicle.
+
+    The ML, ARIMA, SARIMA and Prophet stages are independent; by default they
+    run in processes of their own, so the wall time is that of the slowest stage. A
+    stage that fails or exceeds its timeout yields a None forecast without
+    holding up the others.
+
+    Parameters:
+    - data_path: Path to the CSV file with transaction data
+    - vehicle_id: ID of the vehicle to analyze
+    - forecast_days: Number of days to forecast
+    - ml_strategy: "recursive" or "direct" multi-horizon ML forecasting
+    - parallel: Run the model stages in stage processes; False runs them in
+      turn in this process, without timeouts
+    - timeouts: Optional dictionary overriding STAGE_TIMEOUTS (seconds per stage)
+    - arima_order: "default" for the fixed ARIMA/SARIMA orders or "auto" to
+      select them per vehicle by AIC
+    - prophet_engine: "prophet", or "fourier" for the millisecond Fourier
+      regression stand-in (its forecast is returned under "prophet")
+    - prophet_history: Predict the history dates with Prophet too; False
+      predicts only the forecast horizon, which is much cheaper
+    - models: Model stages to run (see `ensemble_weights.active_members`);
+      all stages when omitted
+    - store: TransactionStore to predict from; the process-wide store of
+      `data_path` when omitted
+    - stage_workers: Number of stages running at the same time, 1 runs them
+      in turn (each still under its timeout)
+
+    Returns:
+    - Dictionary with forecasts from different models
+    """
+    # Shared, vehicle-indexed transaction store (loaded once per process)
+    data = store or get_transaction_store(data_path)
+
+    ts_data, stages = build_stages(
+        data,
+        vehicle_id,
+        forecast_days,
+        ml_strategy,
+        arima_order,
+        prophet_engine,
+        prophet_history,
+        models,
+    )
+
+    if not parallel:
+        # Analyze and plot time series
+        plot_time_series_analysis(ts_data, vehicle_id)
+        forecasts = {name: _run_stage(*stage) for name, stage in stages.items()}
     else:
-        prophet_model = None
+        forecasts = _run_stages_in_pool(
+            stages,
+            {**STAGE_TIMEOUTS, **(timeouts or {})},
+            # Analyze and plot time series while the models train
+            lambda: plot_time_series_analysis(ts_data, vehicle_id),
+            stage_workers,
+        )
 
     print(f"Forecast completed for vehicle {vehicle_id}")
     print(f"Forecasted for {forecast_days} days into the future")
 
     # Return forecasts from different models
-    return {
-        "ml": ml_forecast,
-        "arima": arima_forecast,
-        "sarima": sarima_forecast,
-        "prophet": prophet_forecast,
-    }
+    return forecasts
+
+
+def _run_stages_in_pool(stages, timeouts, while_waiting=None, workers=STAGE_WORKERS):
+    """
+    Runs model stages in stage processes and gathers their forecasts.
+
+    Parameters:
+    - stages: Dictionary mapping stage name to (function, *args)
+    - timeouts: Dictionary mapping stage name to its timeout in seconds
+    - while_waiting: Optional callable run in this process after submitting
+    - workers: Number of stages running at the same time
+
+    Returns:
+    - Dictionary mapping stage name to its forecast (None if failed or timed out)
+    """
+    stage_results = run_stages(stages, timeouts, workers)
+    if while_waiting:
+        while_waiting()
+    forecasts = dict(stage_results)
+
+    return {name: forecasts[name] for name in stages}
@@ -0,0 +1,187 @@
+import os
+import time
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+
+# Stage processes running at once across the process; at most one per core,
+# and no more than the four model stages of a prediction
+STAGE_WORKERS = min(os.cpu_count() or 1, 4)
+
+# Seconds a stage process gets to exit after its result arrived, or after it
+# was asked to terminate, before it is killed
+STOP_GRACE = 5
+
+# Seconds between checks for a free slot while stages are queued
+SLOT_POLL = 0.1
+
+# Free stage slots of this process
+_slots = threading.BoundedSemaphore(STAGE_WORKERS)
+
+# Start context of the stage processes, created on first use
+_context = None
+_context_lock = threading.Lock()
+
+
+def _get_context(stages):
+    """
+    Returns the start context of the stage processes.
+
+    Stages never run in a fork of this (threaded) process: forkserver forks
+    them from a single-threaded server that imports the stage modules once,
+    spawn is the fallback where forkserver is not available.
+    """
+    global _context
+    with _context_lock:
+        if _context is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                _context = multiprocessing.get_context("forkserver")
+                _context.set_forkserver_preload(
+                    sorted({stage.__module__ for stage, *_ in stages.values()})
+                )
+            else:
+                _context = multiprocessing.get_context("spawn")
+        return _context
+
+
+def _stage_main(conn, stage, args):
+    """Runs a model stage in its process and sends back the forecast."""
+    try:
+        forecast = stage(*args)
+    except Exception as e:
+        print(f"Error in {stage.__name__}: {e}")
+        forecast = None
+    conn.send(forecast)
+    conn.close()
+
+
+def _start_stage(context, stage, args):
+    """Starts the process of a stage, returns it and its result connection."""
+    reader, writer = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_stage_main, args=(writer, stage, args), daemon=True
+    )
+    process.start()
+    writer.close()
+    return process, reader
+
+
+def _stop_stage(process, reader, finished=False):
+    """
+    Ends the process of a stage and frees its slot.
+
+    A finished stage is given STOP_GRACE seconds to exit; any other is
+    terminated, and killed if it doesn't exit within STOP_GRACE seconds.
+    """
+    try:
+        if finished:
+            process.join(STOP_GRACE)
+        if process.is_alive():
+            process.terminate()
+            process.join(STOP_GRACE)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        reader.close()
+        process.close()
+    finally:
+        _slots.release()
+
+
+def run_stages(stages, timeouts, workers=STAGE_WORKERS):
+    """
+    Run model stages in processes of their own.
+
+    At most STAGE_WORKERS stages run at once in this process, and at most
+    `workers` of these; the others wait for a slot. Every stage gets its own
+    timeout, measured from the start of its process. The process of a stage
+    that exceeds it is terminated, so timed out stages don't keep a core busy
+    or hold up the interpreter at exit, and leave nothing behind for the next
+    stage.
+
+    Parameters:
+    - stages: Dictionary mapping stage name to (function, *args); the
+      functions and arguments must be picklable
+    - timeouts: Dictionary mapping stage name to its timeout in seconds
+    - workers: Number of these stages running at the same time
+
+    Returns:
+    - Iterator of (stage name, forecast) pairs in completion order; the
+      forecast is None if the stage failed, crashed or timed out. Closing it
+      early terminates the stages still running
+    """
+    context = _get_context(stages)
+    queued, running = dict(stages), {}
+    # Start what can run now, the stages train while the caller goes on
+    failed = _start_queued(context, queued, running, timeouts, workers)
+    return _collect(context, queued, running, failed, timeouts, workers)
+
+
+def _start_queued(context, queued, running, timeouts, workers):
+    """
+    Starts the queued stages there are free slots for.
+
+    Started stages move from `queued` to `running`, which maps stage name to
+    its process, result connection and deadline.
+
+    Returns:
+    - Names of the stages that failed to start
+    """
+    failed = []
+    for name in list(queued):
+        if len(running) >= workers or not _slots.acquire(blocking=False):
+            break
+        stage, *args = queued.pop(name)
+        try:
+            process, reader = _start_stage(context, stage, args)
+        except Exception as e:
+            _slots.release()
+            print(f"Error starting {name} stage: {e}")
+            failed.append(name)
+            continue
+        running[name] = (process, reader, time.monotonic() + timeouts[name])
+    return failed
+
+
+def _collect(context, queued, running, failed, timeouts, workers):
+    """Yields the forecasts of the stages, starting the queued ones in turn."""
+    try:
+        for name in failed:
+            yield name, None
+        while queued or running:
+            for name in _start_queued(context, queued, running, timeouts, workers):
+                yield name, None
+
+            if not running:
+                # Every slot is taken by the stages of other predictions
+                time.sleep(SLOT_POLL)
+                continue
+            next_deadline = min(deadline for _, _, deadline in running.values())
+            timeout = max(next_deadline - time.monotonic(), 0)
+            if queued:
+                timeout = min(timeout, SLOT_POLL)
+
+            readers = {reader: name for name, (_, reader, _) in running.items()}
+            for reader in wait(list(readers), timeout):
+                name = readers[reader]
+                try:
+                    forecast = reader.recv()
+                except (EOFError, OSError):
+                    # The process died without sending a forecast
+                    print(f"{name} stage crashed")
+                    forecast = None
+                process, reader, _ = running.pop(name)
+                _stop_stage(process, reader, finished=True)
+                yield name, forecast
+
+            # Drop every stage past its deadline
+            now = time.monotonic()
+            for name in [n for n, (_, _, d) in running.items() if d <= now]:
+                print(f"{name} stage timed out after {timeouts[name]}s, dropping it")
+                process, reader, _ = running.pop(name)
+                _stop_stage(process, reader)
+                yield name, None
+    finally:
+        # The caller stopped early, the remaining stages are not needed
+        for process, reader, _ in running.values():
+            _stop_stage(process, reader)
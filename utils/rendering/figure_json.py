@@ -0,0 +1,191 @@
+import os
+import gzip
+import json
+import threading
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library encoder is the fallback
+    orjson = None
+
+# Decimals kept for plotted values (earnings are in KSH)
+DECIMALS = 2
+
+# Write a precompressed copy ('<path>.gz') next to every payload
+GZIP_PAYLOADS = False
+GZIP_LEVEL = 6
+
+# Plotly templates as JSON, built once per process
+_templates = {}
+
+
+def _default(obj):
+    """Encodes the types the standard library encoder does not know."""
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == "f":
+            # NaN is not valid JSON, Plotly reads null as a gap
+            return [None if np.isnan(v) else v for v in obj.tolist()]
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(obj).isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _orjson_default(obj):
+    """orjson fallback for arrays it cannot serialize natively."""
+    if isinstance(obj, np.ndarray):
+        return _default(obj)
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    raise TypeError
+
+
+def dumps(obj):
+    """
+    Encode an object as compact JSON.
+
+    Uses orjson when installed (NumPy arrays are serialized natively), else
+    the standard library encoder without whitespace.
+
+    Parameters:
+    - obj: Object to encode; may contain NumPy arrays and scalars
+
+    Returns:
+    - UTF-8 encoded JSON bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            obj, default=_orjson_default, option=orjson.OPT_SERIALIZE_NUMPY
+        )
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    """Decodes JSON bytes or text."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def read_json(path):
+    """Reads a JSON file."""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def write_json(path, obj, gzip_copy=GZIP_PAYLOADS):
+    """
+    Write an object as compact JSON, atomically.
+
+    Parameters:
+    - path: Path of the JSON file; its directory is created
+    - obj: Object to encode
+    - gzip_copy: Also write a precompressed '<path>.gz' (a stale one is removed
+      otherwise)
+
+    Returns:
+    - The JSON bytes written
+    """
+    data = dumps(obj)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Writers in other threads and processes use their own temporary file
+    suffix = f"{os.getpid()}.{threading.get_ident()}.tmp"
+
+    with open(f"{path}.{suffix}", "wb") as f:
+        f.write(data)
+    os.replace(f"{path}.{suffix}", path)
+
+    if gzip_copy:
+        with open(f"{path}.gz.{suffix}", "wb") as f:
+            f.write(gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0))
+        os.replace(f"{path}.gz.{suffix}", f"{path}.gz")
+    elif os.path.exists(f"{path}.gz"):
+        os.remove(f"{path}.gz")
+    return data
+
+
+def date_strings(dates):
+    """
+    Format dates as ISO strings, vectorized.
+
+    Parameters:
+    - dates: Array-like of dates
+
+    Returns:
+    - List of 'YYYY-MM-DD' strings, or full timestamps if any has a time
+    """
+    values = pd.DatetimeIndex(dates).to_numpy(dtype="datetime64[ns]")
+    days = values.astype("datetime64[D]")
+    unit = "D" if (days == values).all() else "s"
+    return np.datetime_as_string(values, unit=unit).tolist()
+
+
+def values_array(values, decimals=DECIMALS):
+    """Converts plotted values to a rounded contiguous float array."""
+    return np.ascontiguousarray(np.round(np.asarray(values, dtype=float), decimals))
+
+
+def template_json(name):
+    """Returns a Plotly template as a JSON-ready dictionary, cached per process."""
+    if name not in _templates:
+        _templates[name] = pio.templates[name].to_plotly_json()
+    return _templates[name]
+
+
+def line_trace(x, y, name, color=None):
+    """
+    Build a Plotly line trace straight from arrays.
+
+    Parameters:
+    - x: Dates of the points
+    - y: Values of the points
+    - name: Legend name of the trace
+    - color: Optional line color
+
+    Returns:
+    - Plotly trace dictionary
+    """
+    trace = {
+        "mode": "lines",
+        "name": name,
+        "x": date_strings(x),
+        "y": values_array(y),
+        "type": "scatter",
+    }
+    if color:
+        trace["line"] = {"color": color}
+    return trace
+
+
+def figure_payload(traces, title, xaxis_title, yaxis_title, template, **layout):
+    """
+    Build a Plotly figure dictionary without going through `go.Figure`.
+
+    The layout has the same structure `fig.update_layout(title=...,
+    xaxis_title=..., yaxis_title=..., template=...)` produces.
+
+    Parameters:
+    - traces: List of trace dictionaries
+    - title: Figure title
+    - xaxis_title, yaxis_title: Axis titles
+    - template: Name of the Plotly template
+    - layout: Other layout properties
+
+    Returns:
+    - Plotly figure dictionary
+    """
+    return {
+        "data": traces,
+        "layout": {
+            "title": {"text": title},
+            "xaxis": {"title": {"text": xaxis_title}},
+            "yaxis": {"title": {"text": yaxis_title}},
+            "template": template_json(template),
+            **layout,
+        },
+    }
@@ -0,0 +1,230 @@
+import os
+import sys
+import json
+import base64
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from config import CACHE_DIR, JSON_DIR
+
+# Environment variable switching the pipeline to JSON-only output; it is
+# inherited by the worker processes of the model stages
+HEADLESS_ENV = "PREDICTION_HEADLESS"
+
+# Resolution and cache of the lazily rendered PNGs
+PNG_DPI = 150
+PNG_CACHE_DIR = os.path.join(CACHE_DIR, "png")
+
+
+def set_headless(headless=True):
+    """
+    Switch PNG rendering off (headless) or on for this process and its children.
+
+    Parameters:
+    - headless: Produce only the JSON payloads
+    """
+    os.environ[HEADLESS_ENV] = "1" if headless else "0"
+
+
+def is_headless():
+    """Returns True if the pipeline should skip matplotlib PNGs and `plt.show()`."""
+    return os.environ.get(HEADLESS_ENV, "0") == "1"
+
+
+def _array(values):
+    """Decodes a Plotly array, plain or base64 typed ('bdata')."""
+    if isinstance(values, dict) and "bdata" in values:
+        array = np.frombuffer(base64.b64decode(values["bdata"]), values["dtype"])
+        return array.reshape(values["shape"]) if "shape" in values else array
+    values = np.asarray(values)
+    if values.dtype == object:
+        # Numbers with gaps (null)
+        try:
+            return values.astype(float)
+        except (ValueError, TypeError):
+            pass
+    if values.dtype == object or values.dtype.kind == "U":
+        try:
+            return pd.to_datetime(values).to_numpy()
+        except (ValueError, TypeError):
+            return values
+    return values
+
+
+def _title(item):
+    """Text of a Plotly title, given as a string or a {'text': ...} dict."""
+    if isinstance(item, dict):
+        return item.get("text") or ""
+    return item or ""
+
+
+def _draw_figure(ax, figure):
+    """Draws the traces of a Plotly figure dictionary on an axis."""
+    for trace in figure.get("data", []):
+        if "x" not in trace or "y" not in trace:
+            continue
+        x, y = _array(trace["x"]), _array(trace["y"])
+        if trace.get("type") == "bar":
+            ax.bar(x, y, label=trace.get("name"))
+        else:
+            ax.plot(x, y, label=trace.get("name"))
+
+    layout = figure.get("layout", {})
+    ax.set_title(_title(layout.get("title")))
+    ax.set_xlabel(_title(layout.get("xaxis", {}).get("title")))
+    ax.set_ylabel(_title(layout.get("yaxis", {}).get("title")))
+    if any(trace.get("name") for trace in figure.get("data", [])):
+        ax.legend()
+    ax.grid(True)
+
+
+def _draw_records(ax, records):
+    """Draws a Prophet-style forecast ('ds', 'yhat', 'yhat_lower', 'yhat_upper')."""
+    forecast = pd.DataFrame(records)
+    dates = pd.to_datetime(forecast["ds"])
+    ax.plot(dates, forecast["yhat"], label="Forecast")
+    if {"yhat_lower", "yhat_upper"} <= set(forecast):
+        ax.fill_between(
+            dates, forecast["yhat_lower"], forecast["yhat_upper"], alpha=0.2
+        )
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Earnings (KSH)")
+    ax.legend()
+    ax.grid(True)
+
+
+def _png_path(name, version, dpi, cache_dir):
+    """Cache path of a figure's PNG, keyed by its name, version and dpi."""
+    digest = hashlib.sha256(f"{version}|{dpi}".encode("utf-8")).hexdigest()[:32]
+    return os.path.join(cache_dir, f"{name}-{digest}.png")
+
+
+def _evict_older(png_path):
+    """Deletes the PNGs of older versions of the same figure."""
+    cache_dir, file_name = os.path.split(png_path)
+    prefix = file_name.rsplit("-", 1)[0] + "-"
+    for other in os.listdir(cache_dir):
+        if other.startswith(prefix) and other.endswith(".png") and other != file_name:
+            try:
+                os.remove(os.path.join(cache_dir, other))
+            except OSError:
+                pass
+
+
+def _render(payload, png_path, dpi):
+    """
+    Render a JSON payload to PNG, replacing the older versions of the image.
+
+    Handles Plotly figures, dictionaries of Plotly figures (one panel each)
+    and Prophet forecast records.
+    """
+    if isinstance(payload, list):
+        panels = [payload]
+    elif "data" in payload:
+        panels = [payload]
+    else:
+        panels = list(payload.values())
+
+    # No pyplot: figures are private to the thread rendering them
+    fig = Figure(figsize=(14, 6 * len(panels)))
+    axes = fig.subplots(len(panels), 1)
+    for ax, panel in zip(np.atleast_1d(axes), panels):
+        if isinstance(panel, list):
+            _draw_records(ax, panel)
+        else:
+            _draw_figure(ax, panel)
+    fig.tight_layout()
+
+    os.makedirs(os.path.dirname(png_path), exist_ok=True)
+    tmp_path = f"{png_path}.{os.getpid()}.{threading.get_ident()}.tmp.png"
+    fig.savefig(tmp_path, dpi=dpi)
+    os.replace(tmp_path, png_path)
+    _evict_older(png_path)
+    return png_path
+
+
+def render_figure_png(figure, name, version, dpi=PNG_DPI, cache_dir=PNG_CACHE_DIR):
+    """
+    Render a JSON payload to PNG, reusing the cached image of the same version.
+
+    Parameters:
+    - figure: JSON payload (see `render_png`)
+    - name: Name of the figure, e.g. '<vehicle>_<model>_<days>d'; only the
+      latest version of each name is kept
+    - version: Version of the figure's contents, e.g. the data version
+    - dpi: Resolution of the PNG
+    - cache_dir: Directory of the rendered PNGs
+
+    Returns:
+    - Path of the PNG
+    """
+    png_path = _png_path(name, version, dpi, cache_dir)
+    if os.path.exists(png_path):
+        return png_path
+    return _render(figure, png_path, dpi)
+
+
+def render_png(json_path, dpi=PNG_DPI, cache_dir=PNG_CACHE_DIR):
+    """
+    Render a saved JSON payload to PNG, reusing the cached image if any.
+
+    Handles Plotly figures, dictionaries of Plotly figures (one panel each)
+    and Prophet forecast records. Only the image of the file's current
+    contents is kept.
+
+    Parameters:
+    - json_path: Path of the JSON payload
+    - dpi: Resolution of the PNG
+    - cache_dir: Directory of the rendered PNGs
+
+    Returns:
+    - Path of the PNG
+    """
+    json_path = os.path.abspath(json_path)
+    stat = os.stat(json_path)
+    path_digest = hashlib.sha256(json_path.encode("utf-8")).hexdigest()[:8]
+    name = f"{os.path.splitext(os.path.basename(json_path))[0]}-{path_digest}"
+    png_path = _png_path(name, f"{stat.st_mtime_ns}|{stat.st_size}", dpi, cache_dir)
+    if os.path.exists(png_path):
+        return png_path
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    return _render(payload, png_path, dpi)
+
+
+def render_all(json_dir=JSON_DIR, vehicle_ids=None, dpi=PNG_DPI):
+    """
+    Render every saved JSON payload (or those of some vehicles) to PNG.
+
+    Parameters:
+    - json_dir: Directory of the JSON payloads
+    - vehicle_ids: Optional list of vehicle IDs to render
+    - dpi: Resolution of the PNGs
+
+    Returns:
+    - List of PNG paths
+    """
+    roots = (
+        [os.path.join(json_dir, v) for v in vehicle_ids] if vehicle_ids else [json_dir]
+    )
+    png_paths = []
+    for root in roots:
+        for dir_path, _, file_names in os.walk(root):
+            for file_name in sorted(file_names):
+                if not file_name.endswith(".json"):
+                    continue
+                json_path = os.path.join(dir_path, file_name)
+                try:
+                    png_paths.append(render_png(json_path, dpi))
+                except Exception as e:
+                    print(f"Error rendering {json_path}: {e}")
+    print(f"Rendered {len(png_paths)} PNGs into {PNG_CACHE_DIR}")
+    return png_paths
+
+
+if __name__ == "__main__":
+    """main function"""
+    render_all(vehicle_ids=sys.argv[1:] or None)